@@ -0,0 +1,244 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .config import settings
+
+READ = "read"
+WRITE = "write"
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+EXEMPT_PATH_PREFIXES = ("/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+OVERLOADED_DETAIL = "Server is overloaded, retry later"
+RATE_LIMITED_DETAIL = "Too many requests, slow down"
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    if method == "OPTIONS" or path.startswith(EXEMPT_PATH_PREFIXES):
+        return None
+    return WRITE if method in WRITE_METHODS else READ
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._waiters: deque[asyncio.Future] = deque()
+        self.active = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.max_queue_wait_seconds = 0.0
+
+    async def acquire(self) -> bool:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.rejected_queue_full += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled():
+                # The slot was handed over while the wait was being abandoned.
+                self.release()
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            self.rejected_timeout += 1
+            return False
+        finally:
+            self.max_queue_wait_seconds = max(self.max_queue_wait_seconds, time.perf_counter() - started)
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight to the next waiter; `active` stays the same.
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "queue_timeout_seconds": self.queue_timeout,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "max_queue_wait_seconds": self.max_queue_wait_seconds,
+        }
+
+
+class TokenBucketLimiter:
+    def __init__(
+        self,
+        rate_per_second: float,
+        burst: int,
+        max_clients: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_second > 0
+
+    def take(self, client: str) -> float:
+        if not self.enabled:
+            return 0.0
+        now = self._clock()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(client, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated_at) * self.rate_per_second)
+            if tokens >= 1.0:
+                tokens -= 1.0
+                wait = 0.0
+            else:
+                wait = (1.0 - tokens) / self.rate_per_second
+                self.limited += 1
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self.limited = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            clients = len(self._buckets)
+        return {
+            "rate_per_second": self.rate_per_second,
+            "burst": self.burst,
+            "clients": clients,
+            "limited": self.limited,
+        }
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        limiters: dict[str, ConcurrencyLimiter],
+        rate_limiter: TokenBucketLimiter,
+        retry_after_seconds: int = 1,
+        client_header: Optional[str] = None,
+        enabled: bool = True,
+    ):
+        self.limiters = limiters
+        self.rate_limiter = rate_limiter
+        self.retry_after_seconds = retry_after_seconds
+        self.client_header = client_header.lower() if client_header else None
+        self.enabled = enabled
+
+    def client_id(self, scope: Scope) -> str:
+        # Proxies append to forwarding headers, so only the last entry is not under the client's control.
+        forwarded = None
+        if self.client_header is not None:
+            for name, value in scope["headers"]:
+                if name.decode("latin-1") == self.client_header:
+                    forwarded = value.decode("latin-1").rsplit(",", 1)[-1].strip()
+        if forwarded:
+            return forwarded
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def reset(self) -> None:
+        for limiter in self.limiters.values():
+            limiter.reset()
+        self.rate_limiter.reset()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "retry_after_seconds": self.retry_after_seconds,
+            "route_classes": {name: limiter.stats() for name, limiter in self.limiters.items()},
+            "rate_limit": self.rate_limiter.stats(),
+        }
+
+
+def _rejection(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, app: ASGIApp, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        controller = self.controller
+        name = route_class(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if name is None or not controller.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        wait = controller.rate_limiter.take(controller.client_id(scope))
+        if wait > 0:
+            await _rejection(429, RATE_LIMITED_DETAIL, wait)(scope, receive, send)
+            return
+
+        limiter = controller.limiters[name]
+        if not await limiter.acquire():
+            await _rejection(503, OVERLOADED_DETAIL, controller.retry_after_seconds)(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+admission_controller = AdmissionController(
+    {
+        WRITE: ConcurrencyLimiter(
+            settings.admission_write_concurrency,
+            settings.admission_queue_size,
+            settings.admission_queue_timeout_seconds,
+        ),
+        READ: ConcurrencyLimiter(
+            settings.admission_read_concurrency,
+            settings.admission_queue_size,
+            settings.admission_queue_timeout_seconds,
+        ),
+    },
+    TokenBucketLimiter(settings.rate_limit_per_second, settings.rate_limit_burst),
+    retry_after_seconds=settings.admission_retry_after_seconds,
+    client_header=settings.rate_limit_client_header,
+    enabled=settings.admission_control_enabled,
+)
@@ -0,0 +1,183 @@
+import copy
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Optional, TypeVar
+
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from .config import settings
+from .database import is_replica_session
+
+ModelT = TypeVar("ModelT")
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class LRUCache(CacheBackend):
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        expires_at = self._clock() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class InMemorySharedBackend(CacheBackend):
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._entries: dict[str, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._entries[key]
+                return None
+            return copy.deepcopy(entry[1])
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl_seconds, copy.deepcopy(value))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class EntityCache:
+    def __init__(self, local: LRUCache, shared: Optional[CacheBackend] = None, enabled: bool = True):
+        self.local = local
+        self.shared = shared
+        self.enabled = enabled
+
+    @staticmethod
+    def key(model: type, entity_id: int) -> str:
+        return f"{model.__tablename__}:{entity_id}"
+
+    def load(self, db: Session, model: type[ModelT], entity_id: int) -> Optional[ModelT]:
+        if not self.enabled:
+            return None
+        key = self.key(model, entity_id)
+        snapshot = self.local.get(key)
+        if snapshot is None and self.shared is not None:
+            snapshot = self.shared.get(key)
+            if snapshot is not None:
+                self.local.set(key, snapshot)
+        if snapshot is None:
+            return None
+        instance = model(**snapshot)
+        make_transient_to_detached(instance)
+        return db.merge(instance, load=False)
+
+    def store(self, instance: Any) -> None:
+        session = object_session(instance)
+        # Rows read from a lagging replica must not be served later by primary-routed lookups.
+        if not self.enabled or (session is not None and is_replica_session(session)):
+            return
+        snapshot = {column.key: getattr(instance, column.key) for column in instance.__table__.columns}
+        key = self.key(type(instance), snapshot["id"])
+        self.local.set(key, snapshot)
+        if self.shared is not None:
+            self.shared.set(key, snapshot, self.local.ttl_seconds)
+
+    def invalidate(self, model: type, *entity_ids: int) -> None:
+        for entity_id in entity_ids:
+            key = self.key(model, entity_id)
+            self.local.delete(key)
+            if self.shared is not None:
+                self.shared.delete(key)
+
+    def clear(self) -> None:
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "shared_backend": type(self.shared).__name__ if self.shared is not None else None,
+            **self.local.stats(),
+        }
+
+
+entity_cache = EntityCache(
+    LRUCache(max_entries=settings.cache_max_entries, ttl_seconds=settings.cache_ttl_seconds),
+    enabled=settings.cache_enabled,
+)
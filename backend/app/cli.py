@@ -0,0 +1,112 @@
+import argparse
+import time
+from typing import Optional
+
+from .database import SessionLocal, get_engine
+from .idempotency import purge_expired_keys
+from .models import create_schema
+from .services import archive_service, hold_service, loan_service, notification_service, overdue_service
+
+
+def bootstrap_db(args: argparse.Namespace) -> None:
+    create_schema(get_engine())
+    print("Database schema is up to date")
+
+
+def refresh_overdue_counts(args: argparse.Namespace) -> None:
+    with SessionLocal(bind=get_engine()) as db:
+        as_of = overdue_service.refresh_overdue_counts(db, rebuild=args.rebuild)
+    print(f"Member overdue counts are current as of {as_of.isoformat()}")
+
+
+def reconcile_loan_counts(args: argparse.Namespace) -> None:
+    with SessionLocal(bind=get_engine()) as db:
+        repaired = loan_service.reconcile_member_counters(db, batch_size=args.batch_size)
+    print(
+        f"Repaired {repaired['active_loan_count']} active and "
+        f"{repaired['overdue_loan_count']} overdue member loan counts"
+    )
+
+
+def expire_holds(args: argparse.Namespace) -> None:
+    with SessionLocal(bind=get_engine()) as db:
+        expired = hold_service.expire_ready_holds(db, batch_size=args.batch_size)
+    print(f"Expired {expired} uncollected ready holds")
+
+
+def scan_loan_notifications(args: argparse.Namespace) -> None:
+    while True:
+        with SessionLocal(bind=get_engine()) as db:
+            as_of = overdue_service.refresh_overdue_counts(db)
+            expired = hold_service.expire_ready_holds(db, batch_size=args.batch_size)
+            created = notification_service.scan_loan_notifications(db, batch_size=args.batch_size)
+        print(f"Member overdue counts are current as of {as_of.isoformat()}", flush=True)
+        print(f"Expired {expired} uncollected ready holds", flush=True)
+        print(f"Queued {created['due_soon']} due-soon and {created['overdue']} overdue loan notifications", flush=True)
+        if args.interval is None:
+            return
+        time.sleep(args.interval)
+
+
+def archive_loans(args: argparse.Namespace) -> None:
+    with SessionLocal(bind=get_engine()) as db:
+        archived = archive_service.archive_returned_loans(
+            db, older_than_months=args.older_than_months, batch_size=args.batch_size
+        )
+    print(f"Archived {archived} returned loans into loan_history")
+
+
+def purge_idempotency_keys(args: argparse.Namespace) -> None:
+    with SessionLocal(bind=get_engine()) as db:
+        purged = purge_expired_keys(db, batch_size=args.batch_size)
+    print(f"Purged {purged} expired idempotency keys")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Library maintenance jobs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bootstrap = commands.add_parser("bootstrap-db", help="Create missing tables and indexes")
+    bootstrap.set_defaults(handler=bootstrap_db)
+
+    refresh = commands.add_parser("refresh-overdue-counts", help="Roll member overdue counts forward to today")
+    refresh.add_argument("--rebuild", action="store_true", help="Recompute every count from the loans table")
+    refresh.set_defaults(handler=refresh_overdue_counts)
+
+    reconcile = commands.add_parser("reconcile-loan-counts", help="Repair drifted member loan counters in bulk")
+    reconcile.add_argument("--batch-size", type=int, default=1000, help="Members updated per transaction")
+    reconcile.set_defaults(handler=reconcile_loan_counts)
+
+    notify = commands.add_parser(
+        "scan-loan-notifications",
+        help="Roll overdue counts forward, expire uncollected holds and queue reminders in the outbox",
+    )
+    notify.add_argument("--batch-size", type=int, default=1000, help="Loans scanned per transaction")
+    notify.add_argument("--interval", type=float, help="Keep running and rescan every INTERVAL seconds")
+    notify.set_defaults(handler=scan_loan_notifications)
+
+    expire = commands.add_parser(
+        "expire-holds", help="Release ready holds not collected within HOLD_PICKUP_DAYS to the next member"
+    )
+    expire.add_argument("--batch-size", type=int, default=1000, help="Holds expired per transaction")
+    expire.set_defaults(handler=expire_holds)
+
+    archive = commands.add_parser("archive-loans", help="Move old returned loans into the loan_history table")
+    archive.add_argument("--older-than-months", type=int, help="Archive loans returned more than N months ago")
+    archive.add_argument("--batch-size", type=int, default=1000, help="Loans moved per transaction")
+    archive.set_defaults(handler=archive_loans)
+
+    purge = commands.add_parser("purge-idempotency-keys", help="Delete stored responses whose TTL has passed")
+    purge.add_argument("--batch-size", type=int, default=1000, help="Keys deleted per transaction")
+    purge.set_defaults(handler=purge_idempotency_keys)
+
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
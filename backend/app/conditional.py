@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+CACHE_CONTROL = "no-cache"
+
+
+@dataclass(frozen=True)
+class CollectionVersion:
+    last_modified: Optional[datetime]
+    last_id: Optional[int]
+
+    def etag(self, name: str) -> str:
+        return entity_tag(name, self.last_id or 0, self.last_modified)
+
+
+def collection_version(db: Session, model: Any) -> CollectionVersion:
+    last_modified, last_id = db.execute(select(func.max(model.updated_at), func.max(model.id))).one()
+    return CollectionVersion(last_modified=last_modified, last_id=last_id)
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def entity_tag(name: str, entity_id: int, updated_at: Optional[datetime]) -> str:
+    version = int(_as_utc(updated_at).timestamp() * 1_000_000) if updated_at is not None else 0
+    return f'W/"{name}-{entity_id}-{version:x}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+
+
+def conditional_get(
+    request: Request, response: Response, etag: str, last_modified: Optional[datetime]
+) -> Optional[Response]:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        unchanged = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        unchanged = (
+            if_modified_since is not None
+            and last_modified is not None
+            and _not_modified_since(if_modified_since, last_modified)
+        )
+    if not unchanged:
+        return None
+    return Response(status_code=304, headers=dict(response.headers))
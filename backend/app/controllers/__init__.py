@@ -1,3 +1,3 @@
-from . import books, loans, members
+from . import books, export, loans, members, metrics
 
-__all__ = ["books", "members", "loans"]
+__all__ = ["books", "members", "loans", "metrics", "export"]
@@ -1,32 +1,91 @@
-from fastapi import APIRouter, Depends, Query, status
-from sqlalchemy.orm import Session
+import io
+from tempfile import SpooledTemporaryFile
+from typing import Optional
 
-from ..database import get_db
-from ..schemas import BookCreate, BookResponse, BookUpdate
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+
+from ..conditional import collection_version, conditional_get, entity_tag
+from ..database import DbSession, get_db, get_read_db, run_db
+from ..models import Book
+from ..pagination import set_next_cursor
+from ..projection import parse_fields
+from ..responses import fast_list, sparse_response
+from ..schemas import BookCreate, BookImportReport, BookResponse, BookSearchResult, BookUpdate, RecordFormat
 from ..services import book_service
 
 router = APIRouter(tags=["books"])
 
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
 
 @router.post("/books", response_model=BookResponse, status_code=status.HTTP_201_CREATED)
-def create_book(payload: BookCreate, db: Session = Depends(get_db)):
-    return book_service.create_book(db, payload)
+async def create_book(payload: BookCreate, db: DbSession = Depends(get_db)):
+    return await run_db(db, book_service.create_book, payload)
+
+
+@router.post("/books/import", response_model=BookImportReport)
+async def import_books(
+    request: Request,
+    format: Optional[RecordFormat] = Query(default=None),
+    db: DbSession = Depends(get_db),
+):
+    if format is None:
+        format = RecordFormat.csv if "csv" in request.headers.get("content-type", "") else RecordFormat.ndjson
+    with SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        source = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        return await run_db(db, book_service.import_books, source, format)
 
 
 @router.get("/books", response_model=list[BookResponse])
-def list_books(
+async def list_books(
+    request: Request,
+    response: Response,
     offset: int = Query(default=0, ge=0),
     limit: int = Query(default=20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    after: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+    db: DbSession = Depends(get_read_db),
+):
+    selected = parse_fields(fields, BookResponse)
+    version = await run_db(db, collection_version, Book)
+    not_modified = conditional_get(request, response, version.etag("books"), version.last_modified)
+    if not_modified is not None:
+        return not_modified
+    books = await run_db(
+        db,
+        book_service.list_books,
+        offset=offset,
+        limit=limit,
+        after=after,
+        fields=selected or book_service.BOOK_RESPONSE_FIELDS,
+    )
+    set_next_cursor(response, books, limit, "id")
+    return fast_list(books, response) if selected is None else sparse_response(books, response)
+
+
+@router.get("/books/search", response_model=list[BookSearchResult])
+async def search_books(
+    response: Response,
+    q: str = Query(min_length=1, max_length=255),
+    limit: int = Query(default=20, ge=1, le=100),
+    after: Optional[str] = Query(default=None),
+    db: DbSession = Depends(get_read_db),
 ):
-    return book_service.list_books(db, offset=offset, limit=limit)
+    results = await run_db(db, book_service.search_books, q, limit=limit, after=after)
+    set_next_cursor(response, results, limit, "score", "id")
+    return fast_list(results, response)
 
 
 @router.get("/books/{book_id}", response_model=BookResponse)
-def get_book(book_id: int, db: Session = Depends(get_db)):
-    return book_service.get_book_or_404(db, book_id)
+async def get_book(book_id: int, request: Request, response: Response, db: DbSession = Depends(get_db)):
+    book = await run_db(db, book_service.get_book_or_404, book_id)
+    not_modified = conditional_get(request, response, entity_tag("book", book.id, book.updated_at), book.updated_at)
+    return not_modified or book
 
 
 @router.put("/books/{book_id}", response_model=BookResponse)
-def update_book(book_id: int, payload: BookUpdate, db: Session = Depends(get_db)):
-    return book_service.update_book(db, book_id, payload)
+async def update_book(book_id: int, payload: BookUpdate, db: DbSession = Depends(get_db)):
+    return await run_db(db, book_service.update_book, book_id, payload)
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import DbSession, get_read_db
+from ..schemas import ExportEntity, RecordFormat
+from ..services import export_service
+
+router = APIRouter(tags=["export"])
+
+
+@router.get("/export/{entity}", response_class=StreamingResponse)
+async def export_entity(
+    entity: ExportEntity,
+    format: RecordFormat = Query(default=RecordFormat.ndjson),
+    db: DbSession = Depends(get_read_db),
+):
+    # The request session is closed before the body is streamed, so the export
+    # checks out its own connection from the same engine for the whole response.
+    if isinstance(db, AsyncSession):
+        body = export_service.astream_export(db.bind, entity, format)
+    else:
+        body = export_service.stream_export(db.get_bind(), entity, format)
+    return StreamingResponse(
+        body,
+        media_type=export_service.EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{entity.value}.{format.value}"'},
+    )
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, status
+
+from ..database import DbSession, get_db, run_db, stick_to_primary
+from ..schemas import HoldCreate, HoldResponse
+from ..services import hold_service
+
+router = APIRouter(tags=["holds"])
+
+
+@router.post(
+    "/books/{book_id}/holds",
+    response_model=HoldResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(stick_to_primary)],
+)
+async def create_hold(book_id: int, payload: HoldCreate, db: DbSession = Depends(get_db)):
+    return await run_db(db, hold_service.create_hold, book_id, payload)
+
+
+@router.delete("/holds/{hold_id}", response_model=HoldResponse, dependencies=[Depends(stick_to_primary)])
+async def cancel_hold(hold_id: int, db: DbSession = Depends(get_db)):
+    return await run_db(db, hold_service.cancel_hold, hold_id)
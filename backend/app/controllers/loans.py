@@ -1,52 +1,122 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, Query, Request, Response, status
 
-from ..database import get_db
-from ..schemas import BorrowRequest, LoanListResponse, LoanResponse, ReturnResponse
+from ..database import DbSession, get_db, get_read_db, run_db, stick_to_primary
+from ..idempotency import IDEMPOTENCY_HEADER, run_idempotent
+from ..pagination import set_next_cursor
+from ..responses import fast_list
+from ..schemas import (
+    BatchBorrowRequest,
+    BatchBorrowResult,
+    BatchReturnRequest,
+    BatchReturnResult,
+    BorrowRequest,
+    LoanListResponse,
+    LoanResponse,
+    ReturnResponse,
+)
 from ..services import loan_service
 
 router = APIRouter(tags=["loans"])
 
 
-@router.post("/loans/borrow", response_model=LoanResponse, status_code=status.HTTP_201_CREATED)
-def borrow_book(payload: BorrowRequest, db: Session = Depends(get_db)):
-    return loan_service.borrow_book(db, payload)
+@router.post(
+    "/loans/borrow",
+    response_model=LoanResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(stick_to_primary)],
+)
+async def borrow_book(
+    payload: BorrowRequest,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_HEADER, max_length=255),
+    db: DbSession = Depends(get_db),
+):
+    return await run_idempotent(
+        request, response, db, idempotency_key, status.HTTP_201_CREATED, loan_service.borrow_book, payload
+    )
+
+
+@router.post(
+    "/loans/borrow/batch",
+    response_model=list[BatchBorrowResult],
+    dependencies=[Depends(stick_to_primary)],
+)
+async def borrow_books_batch(payload: BatchBorrowRequest, response: Response, db: DbSession = Depends(get_db)):
+    results = await run_db(db, loan_service.borrow_books_batch, payload.items)
+    return fast_list(results, response)
 
 
-@router.post("/loans/{loan_id}/return", response_model=ReturnResponse)
-def return_book(loan_id: int, db: Session = Depends(get_db)):
-    return loan_service.return_book(db, loan_id)
+@router.post(
+    "/loans/return/batch",
+    response_model=list[BatchReturnResult],
+    dependencies=[Depends(stick_to_primary)],
+)
+async def return_books_batch(payload: BatchReturnRequest, response: Response, db: DbSession = Depends(get_db)):
+    results = await run_db(db, loan_service.return_books_batch, payload.loan_ids)
+    return fast_list(results, response)
+
+
+@router.post(
+    "/loans/{loan_id}/return",
+    response_model=ReturnResponse,
+    dependencies=[Depends(stick_to_primary)],
+)
+async def return_book(
+    loan_id: int,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_HEADER, max_length=255),
+    db: DbSession = Depends(get_db),
+):
+    return await run_idempotent(
+        request, response, db, idempotency_key, status.HTTP_200_OK, loan_service.return_book, loan_id
+    )
 
 
 @router.get("/loans", response_model=list[LoanListResponse])
-def list_loans(
+async def list_loans(
+    response: Response,
     member_id: Optional[int] = Query(default=None),
     active_only: bool = Query(default=False),
     offset: int = Query(default=0, ge=0),
     limit: int = Query(default=20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    after: Optional[str] = Query(default=None),
+    include_history: bool = Query(default=False),
+    db: DbSession = Depends(get_read_db),
 ):
-    return loan_service.list_loans_with_details(
+    loans = await run_db(
         db,
+        loan_service.list_loans_with_details,
         member_id=member_id,
         active_only=active_only,
         offset=offset,
         limit=limit,
+        after=after,
+        include_history=include_history,
     )
+    set_next_cursor(response, loans, limit, "borrowed_at", "id")
+    return fast_list(loans, response)
 
 
 @router.get("/loans/overdue", response_model=list[LoanListResponse])
-def list_overdue_loans(
+async def list_overdue_loans(
+    response: Response,
     member_id: Optional[int] = Query(default=None),
     offset: int = Query(default=0, ge=0),
     limit: int = Query(default=20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    after: Optional[str] = Query(default=None),
+    db: DbSession = Depends(get_read_db),
 ):
-    return loan_service.list_overdue_loans_with_details(
+    loans = await run_db(
         db,
+        loan_service.list_overdue_loans_with_details,
         member_id=member_id,
         offset=offset,
         limit=limit,
+        after=after,
     )
+    set_next_cursor(response, loans, limit, "due_date", "id")
+    return fast_list(loans, response)
@@ -1,49 +1,102 @@
-from fastapi import APIRouter, Depends, Query, status
-from sqlalchemy.orm import Session
+from typing import Optional
 
-from ..database import get_db
-from ..schemas import BorrowedBookView, MemberCreate, MemberResponse, MemberUpdate
-from ..services import member_service
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+
+from ..conditional import collection_version, conditional_get, entity_tag
+from ..database import DbSession, get_db, get_read_db, run_db
+from ..models import Member
+from ..pagination import set_next_cursor
+from ..projection import parse_fields, parse_include
+from ..responses import fast_list, sparse_response
+from ..schemas import (
+    BorrowedBookView,
+    MemberCreate,
+    MemberDetailResponse,
+    MemberOverdueCountResponse,
+    MemberResponse,
+    MemberUpdate,
+)
+from ..services import member_service, overdue_service
 
 router = APIRouter(tags=["members"])
 
+MEMBER_INCLUDES = ("active_loans",)
+
 
 @router.post("/members", response_model=MemberResponse, status_code=status.HTTP_201_CREATED)
-def create_member(payload: MemberCreate, db: Session = Depends(get_db)):
-    return member_service.create_member(db, payload)
+async def create_member(payload: MemberCreate, db: DbSession = Depends(get_db)):
+    return await run_db(db, member_service.create_member, payload)
 
 
 @router.get("/members", response_model=list[MemberResponse])
-def list_members(
+async def list_members(
+    request: Request,
+    response: Response,
     offset: int = Query(default=0, ge=0),
     limit: int = Query(default=20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    after: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+    db: DbSession = Depends(get_read_db),
 ):
-    return member_service.list_members(db, offset=offset, limit=limit)
+    selected = parse_fields(fields, MemberResponse)
+    version = await run_db(db, collection_version, Member)
+    not_modified = conditional_get(request, response, version.etag("members"), version.last_modified)
+    if not_modified is not None:
+        return not_modified
+    members = await run_db(
+        db,
+        member_service.list_members,
+        offset=offset,
+        limit=limit,
+        after=after,
+        fields=selected or member_service.MEMBER_RESPONSE_FIELDS,
+    )
+    set_next_cursor(response, members, limit, "id")
+    return fast_list(members, response) if selected is None else sparse_response(members, response)
 
 
-@router.get("/members/{member_id}", response_model=MemberResponse)
-def get_member(member_id: int, db: Session = Depends(get_db)):
-    return member_service.get_member_or_404(db, member_id)
+@router.get("/members/{member_id}", response_model=MemberDetailResponse, response_model_exclude_unset=True)
+async def get_member(
+    member_id: int,
+    request: Request,
+    response: Response,
+    include: Optional[str] = Query(default=None),
+    db: DbSession = Depends(get_db),
+):
+    includes = parse_include(include, MEMBER_INCLUDES)
+    member = await run_db(db, member_service.get_member_detail, member_id, include=includes)
+    if includes:
+        return member
+    etag = entity_tag("member", member.id, member.updated_at)
+    not_modified = conditional_get(request, response, etag, member.updated_at)
+    return not_modified or member
 
 
 @router.put("/members/{member_id}", response_model=MemberResponse)
-def update_member(member_id: int, payload: MemberUpdate, db: Session = Depends(get_db)):
-    return member_service.update_member(db, member_id, payload)
+async def update_member(member_id: int, payload: MemberUpdate, db: DbSession = Depends(get_db)):
+    return await run_db(db, member_service.update_member, member_id, payload)
 
 
 @router.get("/members/{member_id}/borrowed-books", response_model=list[BorrowedBookView])
-def member_borrowed_books(
+async def member_borrowed_books(
+    response: Response,
     member_id: int,
     active_only: bool = Query(default=True),
     offset: int = Query(default=0, ge=0),
     limit: int = Query(default=20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_read_db),
 ):
-    return member_service.member_borrowed_books(
+    books = await run_db(
         db,
+        member_service.member_borrowed_books,
         member_id,
         active_only=active_only,
         offset=offset,
         limit=limit,
     )
+    return fast_list(books, response)
+
+
+@router.get("/members/{member_id}/overdue-count", response_model=MemberOverdueCountResponse)
+async def member_overdue_count(member_id: int, db: DbSession = Depends(get_db)):
+    return await run_db(db, overdue_service.get_member_overdue_count, member_id)
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from ..admission import admission_controller
+from ..cache import entity_cache
+from ..database import DbSession, active_pool, get_db, run_db
+from ..metrics import domain_metrics, pool_metrics, render_prometheus, request_metrics
+from ..schemas import AdmissionMetricsResponse, CacheMetricsResponse, PoolMetricsResponse
+from ..services import metrics_service
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics(db: DbSession = Depends(get_db)):
+    gauges = await run_db(db, metrics_service.domain_gauges)
+    body = render_prometheus(
+        request_metrics.snapshot(),
+        domain_metrics.borrows,
+        domain_metrics.returns,
+        gauges,
+        pool_metrics.snapshot(active_pool()),
+        entity_cache.stats(),
+        admission_controller.stats(),
+    )
+    return PlainTextResponse(body, media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/metrics/pool", response_model=PoolMetricsResponse)
+def pool_stats():
+    return pool_metrics.snapshot(active_pool())
+
+
+@router.get("/metrics/cache", response_model=CacheMetricsResponse)
+def cache_stats():
+    return entity_cache.stats()
+
+
+@router.get("/metrics/admission", response_model=AdmissionMetricsResponse)
+def admission_stats():
+    return admission_controller.stats()
@@ -1,16 +1,200 @@
+import itertools
+import threading
+import time
+from typing import Any, Callable, Optional, TypeVar, Union
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
 
 from .config import settings
+from .metrics import pool_metrics
+
+T = TypeVar("T")
+
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+DbSession = Union[Session, AsyncSession]
+
+PRIMARY_READS_COOKIE = "library_primary_reads_until"
+REPLICA_SESSION_INFO = "replica"
+
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r} databases")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+class _InstrumentedPoolMixin:
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            pool_metrics.observe_timeout(time.perf_counter() - started)
+            raise
+        pool_metrics.observe_checkout(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def engine_options(url: str, is_async: bool = False) -> dict[str, Any]:
+    options: dict[str, Any] = {"pool_pre_ping": settings.db_pool_pre_ping}
+    if make_url(url).get_backend_name() == "sqlite":
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_recycle=settings.db_pool_recycle,
+        pool_timeout=settings.db_pool_timeout,
+    )
+    return options
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_replica_engines: Optional[list[Engine]] = None
+_async_replica_engines: Optional[list[AsyncEngine]] = None
+_engine_lock = threading.Lock()
+_replica_turn = itertools.count()
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(settings.database_url, **engine_options(settings.database_url))
+    return _engine
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                url = settings.async_database_url or async_database_url(settings.database_url)
+                _async_engine = create_async_engine(url, **engine_options(url, is_async=True))
+    return _async_engine
+
+
+def get_replica_engines() -> list[Engine]:
+    global _replica_engines
+    if _replica_engines is None:
+        with _engine_lock:
+            if _replica_engines is None:
+                _replica_engines = [create_engine(url, **engine_options(url)) for url in settings.read_replica_urls]
+    return _replica_engines
+
+
+def get_async_replica_engines() -> list[AsyncEngine]:
+    global _async_replica_engines
+    if _async_replica_engines is None:
+        with _engine_lock:
+            if _async_replica_engines is None:
+                urls = [async_database_url(url) for url in settings.read_replica_urls]
+                _async_replica_engines = [create_async_engine(url, **engine_options(url, is_async=True)) for url in urls]
+    return _async_replica_engines
+
+
+async def dispose_engines() -> None:
+    global _engine, _async_engine, _replica_engines, _async_replica_engines
+    for async_engine in [_async_engine, *(_async_replica_engines or [])]:
+        if async_engine is not None:
+            await async_engine.dispose()
+    for engine in [_engine, *(_replica_engines or [])]:
+        if engine is not None:
+            engine.dispose()
+    _engine = _async_engine = _replica_engines = _async_replica_engines = None
+
+
+def active_pool() -> Pool:
+    return (get_async_engine().sync_engine if settings.async_mode else get_engine()).pool
 
-def get_db():
-    db = SessionLocal()
+
+def get_sync_db():
+    db = SessionLocal(bind=get_engine())
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal(bind=get_async_engine()) as db:
+        yield db
+
+
+get_db = get_async_db if settings.async_mode else get_sync_db
+
+
+def reads_from_primary(request: Request) -> bool:
+    until = request.cookies.get(PRIMARY_READS_COOKIE)
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+
+def _pick_replica(replicas: list[T]) -> T:
+    return replicas[next(_replica_turn) % len(replicas)]
+
+
+def is_replica_session(db: Session) -> bool:
+    return bool(db.info.get(REPLICA_SESSION_INFO))
+
+
+def get_sync_read_db(request: Request):
+    replicas = get_replica_engines()
+    on_replica = bool(replicas) and not reads_from_primary(request)
+    bind = _pick_replica(replicas) if on_replica else get_engine()
+    db = SessionLocal(bind=bind, info={REPLICA_SESSION_INFO: on_replica})
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_read_db(request: Request):
+    replicas = get_async_replica_engines()
+    on_replica = bool(replicas) and not reads_from_primary(request)
+    bind = _pick_replica(replicas) if on_replica else get_async_engine()
+    async with AsyncSessionLocal(bind=bind, info={REPLICA_SESSION_INFO: on_replica}) as db:
+        yield db
+
+
+get_read_db = get_async_read_db if settings.async_mode else get_sync_read_db
+
+
+def stick_to_primary(response: Response) -> None:
+    seconds = settings.read_your_writes_seconds
+    if settings.read_replica_urls and seconds > 0:
+        until = f"{time.time() + seconds:.3f}"
+        response.set_cookie(PRIMARY_READS_COOKIE, until, max_age=int(seconds) + 1, httponly=True, samesite="lax")
+
+
+async def run_db(db: DbSession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
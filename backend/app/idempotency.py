@@ -0,0 +1,225 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, Request, Response
+from pydantic import BaseModel
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .cache import LRUCache
+from .config import settings
+from .database import DbSession, run_db
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+KEY_REUSED_DETAIL = "Idempotency-Key was already used for a different request"
+IN_PROGRESS_DETAIL = "A request with this Idempotency-Key is still in progress"
+IDEMPOTENCY_SESSION_INFO = "idempotency_key"
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status_code: Optional[int]
+    body: Optional[bytes]
+    expires_at: datetime
+
+
+@dataclass
+class PendingKey:
+    key: str
+    status_code: int
+    body: Optional[bytes] = None
+
+
+idempotency_cache = LRUCache(
+    max_entries=settings.idempotency_cache_entries, ttl_seconds=settings.idempotency_ttl_seconds
+)
+
+
+def request_fingerprint(method: str, path: str, body: bytes) -> str:
+    digest = hashlib.sha256(f"{method} {path}\n".encode("utf-8"))
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _stored(row: IdempotencyKey) -> StoredResponse:
+    return StoredResponse(row.fingerprint, row.status_code, row.response_body, _naive_utc(row.expires_at))
+
+
+def _take_over_abandoned_claim(db: Session, key: str, fingerprint: str, now: datetime) -> bool:
+    # A claim that was never completed within the lock timeout belongs to a worker that died mid-request.
+    stale_before = now - timedelta(seconds=settings.idempotency_lock_timeout_seconds)
+    taken = db.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.key == key,
+            IdempotencyKey.fingerprint == fingerprint,
+            IdempotencyKey.status_code.is_(None),
+            IdempotencyKey.claimed_at <= stale_before,
+        )
+        .values(claimed_at=now),
+        execution_options={"synchronize_session": False},
+    )
+    return taken.rowcount == 1
+
+
+def claim_key(db: Session, key: str, fingerprint: str, now: Optional[datetime] = None) -> Optional[StoredResponse]:
+    now = now or datetime.utcnow()
+    try:
+        existing = db.get(IdempotencyKey, key)
+        if existing is not None and _naive_utc(existing.expires_at) <= now:
+            db.delete(existing)
+            db.flush()
+            existing = None
+        if existing is None:
+            expires_at = now + timedelta(seconds=settings.idempotency_ttl_seconds)
+            db.add(
+                IdempotencyKey(key=key, fingerprint=fingerprint, created_at=now, claimed_at=now, expires_at=expires_at)
+            )
+        elif existing.status_code is None and _take_over_abandoned_claim(db, key, fingerprint, now):
+            existing = None
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = db.get(IdempotencyKey, key)
+    except Exception:
+        db.rollback()
+        raise
+    return None if existing is None else _stored(existing)
+
+
+def complete_key(db: Session, key: str, status_code: int, body: bytes) -> None:
+    try:
+        db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key == key)
+            .values(status_code=status_code, response_body=body),
+            execution_options={"synchronize_session": False},
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def record_response(db: Session, result: BaseModel) -> None:
+    # Called by services right before they commit, so the stored response and the write land together.
+    pending = db.info.get(IDEMPOTENCY_SESSION_INFO)
+    if pending is None:
+        return
+    pending.body = result.model_dump_json().encode("utf-8")
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == pending.key)
+        .values(status_code=pending.status_code, response_body=pending.body),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def release_key(db: Session, key: str) -> None:
+    try:
+        db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None)),
+            execution_options={"synchronize_session": False},
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def purge_expired_keys(db: Session, now: Optional[datetime] = None, batch_size: int = 1000) -> int:
+    now = now or datetime.utcnow()
+    purged = 0
+    while True:
+        expired = select(IdempotencyKey.key).where(IdempotencyKey.expires_at <= now).limit(batch_size)
+        try:
+            deleted = db.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.key.in_(expired)),
+                execution_options={"synchronize_session": False},
+            ).rowcount
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        purged += deleted
+        if deleted < batch_size:
+            return purged
+
+
+def _replay(stored: StoredResponse, response: Response) -> Response:
+    # Failed writes do not pin reads to the primary, so only successful replays keep the endpoint's headers.
+    headers = dict(response.headers) if stored.status_code < 400 else {}
+    headers[REPLAYED_HEADER] = "true"
+    return Response(stored.body, status_code=stored.status_code, media_type="application/json", headers=headers)
+
+
+def _expires_at() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=settings.idempotency_ttl_seconds)
+
+
+def _remember(key: str, stored: StoredResponse) -> None:
+    ttl_seconds = (stored.expires_at - datetime.utcnow()).total_seconds()
+    if ttl_seconds > 0:
+        idempotency_cache.set(key, stored, ttl_seconds)
+
+
+async def run_idempotent(
+    request: Request,
+    response: Response,
+    db: DbSession,
+    key: Optional[str],
+    status_code: int,
+    fn: Callable[..., BaseModel],
+    *args: Any,
+) -> Any:
+    if key is None:
+        return await run_db(db, fn, *args)
+
+    fingerprint = request_fingerprint(request.method, request.url.path, await request.body())
+    previous = idempotency_cache.get(key)
+    if previous is None:
+        previous = await run_db(db, claim_key, key, fingerprint)
+        if previous is not None and previous.status_code is not None:
+            _remember(key, previous)
+    if previous is not None:
+        if previous.fingerprint != fingerprint:
+            raise HTTPException(status_code=422, detail=KEY_REUSED_DETAIL)
+        if previous.status_code is None:
+            raise HTTPException(status_code=409, detail=IN_PROGRESS_DETAIL)
+        return _replay(previous, response)
+
+    pending = PendingKey(key, status_code)
+    db.info[IDEMPOTENCY_SESSION_INFO] = pending
+    try:
+        result = await run_db(db, fn, *args)
+    except HTTPException as exc:
+        # Failed services roll back, so the error response is stored on its own.
+        body = json.dumps({"detail": exc.detail}, separators=(",", ":")).encode("utf-8")
+        await run_db(db, complete_key, key, exc.status_code, body)
+        _remember(key, StoredResponse(fingerprint, exc.status_code, body, _expires_at()))
+        raise
+    except Exception:
+        await run_db(db, release_key, key)
+        raise
+    finally:
+        db.info.pop(IDEMPOTENCY_SESSION_INFO, None)
+
+    body = pending.body
+    if body is None:
+        body = result.model_dump_json().encode("utf-8")
+        await run_db(db, complete_key, key, status_code, body)
+    _remember(key, StoredResponse(fingerprint, status_code, body, _expires_at()))
+    return Response(body, status_code=status_code, media_type="application/json", headers=dict(response.headers))
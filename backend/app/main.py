@@ -1,13 +1,39 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 
+from .admission import AdmissionControlMiddleware
 from .config import settings
-from .controllers import books, loans, members
-from .database import Base, engine
-
-Base.metadata.create_all(bind=engine)
+from .controllers import books, export, holds, loans, members, metrics
+from .database import dispose_engines, get_engine
+from .idempotency import REPLAYED_HEADER
+from .instrumentation import QueryInstrumentationMiddleware, RequestMetricsMiddleware
+from .models import create_schema
+from .pagination import NEXT_CURSOR_HEADER
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if settings.create_schema_on_startup:
+        await run_in_threadpool(create_schema, get_engine())
+    yield
+    await dispose_engines()
+
+
+app = FastAPI(
+    title=settings.app_name,
+    version=settings.app_version,
+    default_response_class=ORJSONResponse if settings.fast_json else JSONResponse,
+    lifespan=lifespan,
+)
 
-app = FastAPI(title=settings.app_name, version=settings.app_version)
+app.add_middleware(QueryInstrumentationMiddleware)
+app.add_middleware(AdmissionControlMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,6 +41,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REPLAYED_HEADER, "Server-Timing", "ETag", "Last-Modified"],
 )
 
 
@@ -26,3 +53,6 @@ def health_check():
 app.include_router(books.router)
 app.include_router(members.router)
 app.include_router(loans.router)
+app.include_router(holds.router)
+app.include_router(metrics.router)
+app.include_router(export.router)
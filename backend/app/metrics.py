@@ -0,0 +1,276 @@
+import threading
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from typing import Any, Optional
+
+from sqlalchemy.pool import Pool, QueuePool
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total, observed_sum = self.count, self.sum
+        cumulative = 0
+        buckets: dict[str, int] = {}
+        for bound, bucket_count in zip([*map(str, self.buckets), "+Inf"], counts):
+            cumulative += bucket_count
+            buckets[bound] = cumulative
+        return {"buckets": buckets, "count": total, "sum": observed_sum}
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkout_latency = Histogram()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.max_wait_seconds = 0.0
+        self.checkout_latency.reset()
+
+    def observe_checkout(self, seconds: float) -> None:
+        self.checkout_latency.observe(seconds)
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def observe_timeout(self, seconds: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.wait_seconds_total += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def snapshot(self, pool: Pool) -> dict[str, Any]:
+        is_queue_pool = isinstance(pool, QueuePool)
+        with self._lock:
+            counters = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_seconds_total,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+        return {
+            "pool_class": type(pool).__name__,
+            "pool_size": pool.size() if is_queue_pool else None,
+            "checked_out": pool.checkedout() if is_queue_pool else None,
+            "checked_in": pool.checkedin() if is_queue_pool else None,
+            "overflow": max(pool.overflow(), 0) if is_queue_pool else None,
+            **counters,
+            "checkout_latency_seconds": self.checkout_latency.snapshot(),
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class RequestMetrics:
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.in_flight = 0
+            self.requests: Counter[tuple[str, str, int]] = Counter()
+            self.latency: dict[tuple[str, str], Histogram] = {}
+
+    def start(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def finish(self, method: str, route: str, status_code: int, seconds: float) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[(method, route, status_code)] += 1
+            histogram = self.latency.get((method, route))
+            if histogram is None:
+                histogram = self.latency[(method, route)] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            requests = dict(self.requests)
+            latency = dict(self.latency)
+            in_flight = self.in_flight
+        return {
+            "in_flight": in_flight,
+            "requests": requests,
+            "latency": {key: histogram.snapshot() for key, histogram in latency.items()},
+        }
+
+
+class DomainMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.borrows = 0
+            self.returns = 0
+
+    def record_borrows(self, count: int = 1) -> None:
+        with self._lock:
+            self.borrows += count
+
+    def record_returns(self, count: int = 1) -> None:
+        with self._lock:
+            self.returns += count
+
+
+request_metrics = RequestMetrics()
+domain_metrics = DomainMetrics()
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: Optional[float]) -> str:
+    if value is None:
+        return "NaN"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value)
+
+
+class PrometheusWriter:
+    def __init__(self):
+        self._lines: list[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str, samples: Iterable[tuple[dict[str, Any], Any]]) -> None:
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self._lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name: str, help_text: str, series: Iterable[tuple[dict[str, Any], dict[str, Any]]]) -> None:
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} histogram")
+        for labels, snapshot in series:
+            for bound, count in snapshot["buckets"].items():
+                self._lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {count}")
+            self._lines.append(f"{name}_sum{_labels(labels)} {_number(snapshot['sum'])}")
+            self._lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+def render_prometheus(
+    requests: dict[str, Any],
+    borrows: int,
+    returns: int,
+    domain_gauges: dict[str, int],
+    pool: dict[str, Any],
+    cache: dict[str, Any],
+    admission: dict[str, Any],
+) -> str:
+    writer = PrometheusWriter()
+    writer.metric(
+        "library_http_requests_total",
+        "counter",
+        "HTTP requests by method, route template and status code.",
+        (
+            ({"method": method, "route": route, "status": status}, count)
+            for (method, route, status), count in sorted(requests["requests"].items())
+        ),
+    )
+    writer.metric(
+        "library_http_request_errors_total",
+        "counter",
+        "HTTP responses with a 4xx or 5xx status by method, route template and status code.",
+        (
+            ({"method": method, "route": route, "status": status}, count)
+            for (method, route, status), count in sorted(requests["requests"].items())
+            if status >= 400
+        ),
+    )
+    writer.histogram(
+        "library_http_request_duration_seconds",
+        "HTTP request latency by method and route template.",
+        (
+            ({"method": method, "route": route}, snapshot)
+            for (method, route), snapshot in sorted(requests["latency"].items())
+        ),
+    )
+    scalars = (
+        ("library_http_requests_in_flight", "gauge", "HTTP requests currently being served.", requests["in_flight"]),
+        ("library_borrows_total", "counter", "Books borrowed through this worker.", borrows),
+        ("library_returns_total", "counter", "Books returned through this worker.", returns),
+        ("library_overdue_loans", "gauge", "Active loans past their due date.", domain_gauges["overdue_loans"]),
+        ("library_active_loans", "gauge", "Loans that have not been returned.", domain_gauges["active_loans"]),
+        ("library_available_copies", "gauge", "Copies on the shelf across books.", domain_gauges["available_copies"]),
+        ("library_total_copies", "gauge", "Copies owned across all books.", domain_gauges["total_copies"]),
+        ("library_db_pool_checkouts_total", "counter", "Connection pool checkouts.", pool["checkouts"]),
+        ("library_db_pool_timeouts_total", "counter", "Connection pool checkout timeouts.", pool["timeouts"]),
+        ("library_db_pool_checked_out", "gauge", "Connections currently checked out.", pool["checked_out"]),
+        ("library_cache_hits_total", "counter", "Entity cache hits.", cache["hits"]),
+        ("library_cache_misses_total", "counter", "Entity cache misses.", cache["misses"]),
+    )
+    for name, kind, help_text, value in scalars:
+        writer.metric(name, kind, help_text, [({}, value)])
+    route_classes = sorted(admission["route_classes"].items())
+    writer.metric(
+        "library_admission_active",
+        "gauge",
+        "Requests holding an admission slot by route class.",
+        (({"route_class": name}, stats["active"]) for name, stats in route_classes),
+    )
+    writer.metric(
+        "library_admission_waiting",
+        "gauge",
+        "Requests queued for an admission slot by route class.",
+        (({"route_class": name}, stats["waiting"]) for name, stats in route_classes),
+    )
+    writer.metric(
+        "library_admission_rejected_total",
+        "counter",
+        "Requests shed with 503 by route class and reason.",
+        (
+            ({"route_class": name, "reason": reason}, stats[f"rejected_{reason}"])
+            for name, stats in route_classes
+            for reason in ("queue_full", "timeout")
+        ),
+    )
+    writer.metric(
+        "library_rate_limited_total",
+        "counter",
+        "Requests rejected with 429 by the per-client rate limit.",
+        [({}, admission["rate_limit"]["limited"])],
+    )
+    return writer.render()
@@ -1,7 +1,21 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, CheckConstraint, Date, DateTime, ForeignKey, Index, Integer, String, text
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    CheckConstraint,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    event,
+    text,
+)
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
@@ -19,9 +33,11 @@ class Book(Base):
     available_copies: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
     active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True
+    )
 
-    loans: Mapped[list["Loan"]] = relationship("Loan", back_populates="book")
+    loans: Mapped[list["Loan"]] = relationship("Loan", back_populates="book", lazy="raise_on_sql")
 
     __table_args__ = (
         CheckConstraint("total_copies >= 0", name="books_total_copies_nonnegative"),
@@ -30,6 +46,32 @@ class Book(Base):
     )
 
 
+BOOK_SEARCH_DOCUMENT = "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(author, ''))"
+
+BOOK_SEARCH_POSTGRES_DDL = (
+    f"CREATE INDEX IF NOT EXISTS ix_books_search ON books USING gin ({BOOK_SEARCH_DOCUMENT})",
+    "CREATE INDEX IF NOT EXISTS ix_books_isbn_prefix ON books (isbn varchar_pattern_ops)",
+)
+
+BOOK_SEARCH_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5("
+    "title, author, content='books', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN "
+    "INSERT INTO books_fts(rowid, title, author) VALUES (new.id, new.title, new.author); END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN "
+    "INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author); END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author ON books BEGIN "
+    "INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author); "
+    "INSERT INTO books_fts(rowid, title, author) VALUES (new.id, new.title, new.author); END",
+)
+
+for statement in BOOK_SEARCH_POSTGRES_DDL:
+    event.listen(Book.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in BOOK_SEARCH_SQLITE_DDL:
+    event.listen(Book.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Book.__table__, "before_drop", DDL("DROP TABLE IF EXISTS books_fts").execute_if(dialect="sqlite"))
+
+
 class Member(Base):
     __tablename__ = "members"
 
@@ -39,10 +81,19 @@ class Member(Base):
     phone: Mapped[Optional[str]] = mapped_column(String(32))
     address: Mapped[Optional[str]] = mapped_column(String(255))
     active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    active_loan_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    overdue_loan_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True
+    )
+
+    loans: Mapped[list["Loan"]] = relationship("Loan", back_populates="member", lazy="raise_on_sql")
 
-    loans: Mapped[list["Loan"]] = relationship("Loan", back_populates="member")
+    __table_args__ = (
+        CheckConstraint("active_loan_count >= 0", name="members_active_loan_count_nonnegative"),
+        CheckConstraint("overdue_loan_count >= 0", name="members_overdue_loan_count_nonnegative"),
+    )
 
 
 class Loan(Base):
@@ -55,8 +106,8 @@ class Loan(Base):
     due_date: Mapped[Date] = mapped_column(Date, nullable=False)
     returned_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
 
-    member: Mapped["Member"] = relationship("Member", back_populates="loans")
-    book: Mapped["Book"] = relationship("Book", back_populates="loans")
+    member: Mapped["Member"] = relationship("Member", back_populates="loans", lazy="raise_on_sql")
+    book: Mapped["Book"] = relationship("Book", back_populates="loans", lazy="raise_on_sql")
 
     __table_args__ = (
         Index(
@@ -67,4 +118,122 @@ class Loan(Base):
             postgresql_where=text("returned_at IS NULL"),
             sqlite_where=text("returned_at IS NULL"),
         ),
+        Index("ix_loans_borrowed_at_id", "borrowed_at", "id"),
+        Index(
+            "ix_loans_open_due_date_id",
+            "due_date",
+            "id",
+            postgresql_where=text("returned_at IS NULL"),
+            sqlite_where=text("returned_at IS NULL"),
+        ),
+    )
+
+
+class LoanHistory(Base):
+    __tablename__ = "loan_history"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    borrowed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    member_id: Mapped[int] = mapped_column(ForeignKey("members.id", ondelete="RESTRICT"), nullable=False)
+    book_id: Mapped[int] = mapped_column(ForeignKey("books.id", ondelete="RESTRICT"), nullable=False)
+    due_date: Mapped[date] = mapped_column(Date, nullable=False)
+    returned_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_loan_history_borrowed_at_id", "borrowed_at", "id"),
+        Index("ix_loan_history_member_borrowed_at", "member_id", "borrowed_at"),
+        {"postgresql_partition_by": "RANGE (borrowed_at)"},
+    )
+
+
+event.listen(
+    LoanHistory.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS loan_history_default PARTITION OF loan_history DEFAULT").execute_if(
+        dialect="postgresql"
+    ),
+)
+
+
+class JobWatermark(Base):
+    __tablename__ = "job_watermarks"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    as_of: Mapped[Optional[date]] = mapped_column(Date)
+    position: Mapped[Optional[str]] = mapped_column(String(64))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class Hold(Base):
+    __tablename__ = "holds"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    book_id: Mapped[int] = mapped_column(ForeignKey("books.id", ondelete="RESTRICT"), nullable=False)
+    member_id: Mapped[int] = mapped_column(ForeignKey("members.id", ondelete="RESTRICT"), nullable=False, index=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="waiting")
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    ready_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    fulfilled_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index(
+            "ix_holds_waiting_queue",
+            "book_id",
+            "created_at",
+            "id",
+            postgresql_where=text("status = 'waiting'"),
+            sqlite_where=text("status = 'waiting'"),
+        ),
+        Index(
+            "ix_holds_ready_at",
+            "ready_at",
+            postgresql_where=text("status = 'ready'"),
+            sqlite_where=text("status = 'ready'"),
+        ),
+        Index(
+            "uq_holds_open_member_book",
+            "member_id",
+            "book_id",
+            unique=True,
+            postgresql_where=text("status IN ('waiting', 'ready')"),
+            sqlite_where=text("status IN ('waiting', 'ready')"),
+        ),
     )
+
+
+class LoanNotification(Base):
+    __tablename__ = "loan_notifications"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    loan_id: Mapped[int] = mapped_column(ForeignKey("loans.id", ondelete="RESTRICT"), nullable=False)
+    member_id: Mapped[int] = mapped_column(ForeignKey("members.id", ondelete="RESTRICT"), nullable=False, index=True)
+    kind: Mapped[str] = mapped_column(String(16), nullable=False)
+    due_date: Mapped[date] = mapped_column(Date, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    dispatched_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("uq_loan_notifications_loan_kind", "loan_id", "kind", unique=True),
+        Index(
+            "ix_loan_notifications_pending",
+            "id",
+            postgresql_where=text("dispatched_at IS NULL"),
+            sqlite_where=text("dispatched_at IS NULL"),
+        ),
+    )
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[Optional[int]] = mapped_column(Integer)
+    response_body: Mapped[Optional[bytes]] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    claimed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+
+
+def create_schema(engine: Engine) -> None:
+    Base.metadata.create_all(bind=engine)
@@ -0,0 +1,29 @@
+from collections.abc import Sequence
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+
+def parse_fields(fields: Optional[str], model: type[BaseModel], always: Sequence[str] = ("id",)) -> Optional[list[str]]:
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(model.model_fields))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return [name for name in model.model_fields if name in requested or name in always]
+
+
+def parse_include(include: Optional[str], allowed: Sequence[str]) -> set[str]:
+    if include is None:
+        return set()
+    requested = {name.strip() for name in include.split(",") if name.strip()}
+    unknown = sorted(requested - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(unknown)}")
+    return requested
+
+
+def columns_of(entity: Any, fields: Sequence[str]) -> list[Any]:
+    return [getattr(entity, name) for name in fields]
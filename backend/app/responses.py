@@ -0,0 +1,32 @@
+from collections.abc import Sequence
+from typing import Any, Union
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel, SerializeAsAny, TypeAdapter
+from sqlalchemy.engine import Row
+
+from .config import settings
+
+_model_list = TypeAdapter(list[SerializeAsAny[BaseModel]])
+
+
+def _row_dicts(rows: Sequence[Row]) -> list[dict[str, Any]]:
+    return [row._asdict() for row in rows]
+
+
+def fast_list(items: Sequence[Any], response: Response) -> Union[Sequence[Any], Response]:
+    if not settings.fast_json:
+        return items
+    headers = dict(response.headers)
+    if items and isinstance(items[0], Row):
+        return ORJSONResponse(_row_dicts(items), headers=headers)
+    return Response(_model_list.dump_json(list(items)), media_type="application/json", headers=headers)
+
+
+def sparse_response(rows: Sequence[Row], response: Response) -> JSONResponse:
+    headers = dict(response.headers)
+    if settings.fast_json:
+        return ORJSONResponse(_row_dicts(rows), headers=headers)
+    return JSONResponse(jsonable_encoder(_row_dicts(rows)), headers=headers)
@@ -1,4 +1,5 @@
 from datetime import date, datetime
+from enum import Enum
 from typing import Optional
 
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
@@ -38,6 +39,26 @@ class BookResponse(BaseModel):
     active: bool
 
 
+class BookSearchResult(BookResponse):
+    score: float
+
+
+class BookImportError(BaseModel):
+    row: int
+    isbn: Optional[str] = None
+    detail: str
+
+
+class BookImportReport(BaseModel):
+    received: int
+    imported: int
+    failed: int
+    errors: list[BookImportError]
+    errors_truncated: bool
+    elapsed_seconds: float
+    rows_per_second: float
+
+
 class MemberBase(BaseModel):
     name: str = Field(min_length=1, max_length=255)
     email: EmailStr
@@ -66,6 +87,13 @@ class MemberResponse(BaseModel):
     phone: Optional[str]
     address: Optional[str]
     active: bool
+    active_loan_count: int
+    overdue_loan_count: int
+
+
+class MemberOverdueCountResponse(BaseModel):
+    member_id: int
+    overdue_count: int
 
 
 class BorrowRequest(BaseModel):
@@ -74,6 +102,38 @@ class BorrowRequest(BaseModel):
     due_date: Optional[date] = None
 
 
+class HoldStatus(str, Enum):
+    waiting = "waiting"
+    ready = "ready"
+    fulfilled = "fulfilled"
+    cancelled = "cancelled"
+    expired = "expired"
+
+
+class HoldCreate(BaseModel):
+    member_id: int
+
+
+class HoldResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    book_id: int
+    member_id: int
+    status: HoldStatus
+    created_at: datetime
+    ready_at: Optional[datetime]
+    queue_position: Optional[int] = None
+
+
+class BatchBorrowRequest(BaseModel):
+    items: list[BorrowRequest] = Field(min_length=1, max_length=50)
+
+
+class BatchReturnRequest(BaseModel):
+    loan_ids: list[int] = Field(min_length=1, max_length=50)
+
+
 class ReturnResponse(BaseModel):
     loan_id: int
     returned_at: datetime
@@ -90,6 +150,29 @@ class LoanResponse(BaseModel):
     returned_at: Optional[datetime]
 
 
+class MemberLoanResponse(LoanResponse):
+    book: BookResponse
+
+
+class MemberDetailResponse(MemberResponse):
+    active_loans: Optional[list[MemberLoanResponse]] = None
+
+
+class BatchBorrowResult(BaseModel):
+    index: int
+    status_code: int
+    detail: Optional[str] = None
+    loan: Optional[LoanResponse] = None
+
+
+class BatchReturnResult(BaseModel):
+    index: int
+    loan_id: int
+    status_code: int
+    detail: Optional[str] = None
+    returned_at: Optional[datetime] = None
+
+
 class LoanListResponse(LoanResponse):
     member_name: str
     book_title: str
@@ -103,3 +186,72 @@ class BorrowedBookView(BaseModel):
     borrowed_at: datetime
     due_date: date
     is_overdue: bool
+
+
+class ExportEntity(str, Enum):
+    books = "books"
+    members = "members"
+    loans = "loans"
+
+
+class RecordFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class HistogramSnapshot(BaseModel):
+    buckets: dict[str, int]
+    count: int
+    sum: float
+
+
+class PoolMetricsResponse(BaseModel):
+    pool_class: str
+    pool_size: Optional[int]
+    checked_out: Optional[int]
+    checked_in: Optional[int]
+    overflow: Optional[int]
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    max_wait_seconds: float
+    checkout_latency_seconds: HistogramSnapshot
+
+
+class AdmissionClassStats(BaseModel):
+    limit: int
+    queue_size: int
+    queue_timeout_seconds: float
+    active: int
+    waiting: int
+    admitted: int
+    queued: int
+    rejected_queue_full: int
+    rejected_timeout: int
+    max_queue_wait_seconds: float
+
+
+class RateLimitStats(BaseModel):
+    rate_per_second: float
+    burst: int
+    clients: int
+    limited: int
+
+
+class AdmissionMetricsResponse(BaseModel):
+    enabled: bool
+    retry_after_seconds: int
+    route_classes: dict[str, AdmissionClassStats]
+    rate_limit: RateLimitStats
+
+
+class CacheMetricsResponse(BaseModel):
+    enabled: bool
+    shared_backend: Optional[str]
+    entries: int
+    max_entries: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
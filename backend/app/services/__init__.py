@@ -1,3 +1,3 @@
-from . import book_service, loan_service, member_service
+from . import book_service, export_service, loan_service, member_service, metrics_service, overdue_service
 
-__all__ = ["book_service", "member_service", "loan_service"]
+__all__ = ["book_service", "member_service", "loan_service", "overdue_service", "export_service", "metrics_service"]
@@ -0,0 +1,84 @@
+import calendar
+from collections.abc import Iterable
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Loan, LoanHistory, LoanNotification
+
+HISTORY_COLUMNS = ("id", "borrowed_at", "member_id", "book_id", "due_date", "returned_at")
+
+
+def archive_cutoff(now: datetime, months: int) -> datetime:
+    year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+    day = min(now.day, calendar.monthrange(year, month + 1)[1])
+    return now.replace(year=year, month=month + 1, day=day)
+
+
+def _ensure_history_partitions(db: Session, years: Iterable[int]) -> None:
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for year in sorted(years):
+        db.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS loan_history_{year:04d} PARTITION OF loan_history "
+                f"FOR VALUES FROM ('{year:04d}-01-01') TO ('{year + 1:04d}-01-01')"
+            )
+        )
+
+
+def archive_returned_loans(
+    db: Session,
+    older_than_months: Optional[int] = None,
+    batch_size: int = 1000,
+    max_batches: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> int:
+    months = settings.loan_archive_after_months if older_than_months is None else older_than_months
+    cutoff = archive_cutoff(now or datetime.utcnow(), months)
+    archived = 0
+    batches = 0
+    retried = False
+    while max_batches is None or batches < max_batches:
+        batches += 1
+        try:
+            candidates = select(Loan.id, Loan.borrowed_at).where(Loan.returned_at < cutoff).limit(batch_size)
+            rows = db.execute(candidates).all()
+            if not rows:
+                db.rollback()
+                break
+            loan_ids = [row.id for row in rows]
+            _ensure_history_partitions(db, {row.borrowed_at.year for row in rows})
+            db.execute(
+                insert(LoanHistory).from_select(
+                    HISTORY_COLUMNS,
+                    select(*(getattr(Loan, column) for column in HISTORY_COLUMNS)).where(Loan.id.in_(loan_ids)),
+                )
+            )
+            db.execute(
+                delete(LoanNotification).where(LoanNotification.loan_id.in_(loan_ids)),
+                execution_options={"synchronize_session": False},
+            )
+            db.execute(delete(Loan).where(Loan.id.in_(loan_ids)), execution_options={"synchronize_session": False})
+            db.commit()
+        except IntegrityError:
+            # A concurrent run may have archived part of the batch, so pick fresh candidates once.
+            # Failing again means the conflict is not going away, e.g. a history row left behind.
+            db.rollback()
+            if retried:
+                raise
+            retried = True
+            continue
+        except Exception:
+            db.rollback()
+            raise
+
+        retried = False
+        archived += len(loan_ids)
+        if len(loan_ids) < batch_size:
+            break
+    return archived
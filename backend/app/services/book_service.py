@@ -1,8 +1,56 @@
+import csv
+import io
+import json
+import re
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from datetime import datetime
+from itertools import islice
+from typing import Any, Optional, TextIO
+
 from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import Integer, and_, cast, column, func, insert, literal, literal_column, or_, select, table, union_all
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from ..cache import entity_cache
+from ..models import BOOK_SEARCH_DOCUMENT, Book
+from ..pagination import decode_id_cursor, decode_score_cursor
+from ..projection import columns_of
+from ..schemas import (
+    BookCreate,
+    BookImportError,
+    BookImportReport,
+    BookResponse,
+    BookSearchResult,
+    BookUpdate,
+    RecordFormat,
+)
+from . import hold_service
+
+ISBN_PREFIX_SCORE = 1.0
+TITLE_MATCH_SCORE = 0.5
 
-from ..models import Book
-from ..schemas import BookCreate, BookUpdate
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_MAX_REPORTED_ERRORS = 1000
+IMPORT_COLUMNS = (
+    "title",
+    "author",
+    "isbn",
+    "publication_year",
+    "total_copies",
+    "available_copies",
+    "active",
+    "created_at",
+    "updated_at",
+)
+
+BOOK_RESPONSE_FIELDS = tuple(BookResponse.model_fields)
+
+books_fts = table("books_fts", column("rowid"))
 
 
 def create_book(db: Session, payload: BookCreate) -> Book:
@@ -28,19 +76,35 @@ def create_book(db: Session, payload: BookCreate) -> Book:
         raise
 
 
-def list_books(db: Session, offset: int = 0, limit: int = 20) -> list[Book]:
-    return db.query(Book).order_by(Book.id.asc()).offset(offset).limit(limit).all()
+def list_books(
+    db: Session,
+    offset: int = 0,
+    limit: int = 20,
+    after: Optional[str] = None,
+    fields: Sequence[str] = BOOK_RESPONSE_FIELDS,
+) -> list[Row]:
+    query = select(*columns_of(Book, fields))
+    if after is not None:
+        query = query.where(Book.id > decode_id_cursor(after))
+    return db.execute(query.order_by(Book.id.asc()).offset(offset).limit(limit)).all()
+
 
+def get_book_or_404(db: Session, book_id: int, use_cache: bool = True) -> Book:
+    if use_cache:
+        cached = entity_cache.load(db, Book, book_id)
+        if cached is not None:
+            return cached
 
-def get_book_or_404(db: Session, book_id: int) -> Book:
     book = db.query(Book).filter(Book.id == book_id).first()
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
+    if use_cache:
+        entity_cache.store(book)
     return book
 
 
 def update_book(db: Session, book_id: int, payload: BookUpdate) -> Book:
-    book = get_book_or_404(db, book_id)
+    book = get_book_or_404(db, book_id, use_cache=False)
 
     if payload.isbn and payload.isbn != book.isbn:
         duplicate = db.query(Book).filter(Book.isbn == payload.isbn).first()
@@ -58,13 +122,224 @@ def update_book(db: Session, book_id: int, payload: BookUpdate) -> Book:
             )
         updates["available_copies"] = new_total - checked_out
 
+    added_copies = updates.get("available_copies", book.available_copies) - book.available_copies
     for field, value in updates.items():
         setattr(book, field, value)
 
     try:
+        if added_copies > 0:
+            # New copies serve the hold queue first, like returned ones.
+            assigned = hold_service.assign_waiting_holds(db, book_id, added_copies, datetime.utcnow())
+            book.available_copies -= len(assigned)
         db.commit()
+        entity_cache.invalidate(Book, book_id)
         db.refresh(book)
         return book
     except Exception:
         db.rollback()
         raise
+
+
+def _isbn_prefix(query: str) -> Optional[str]:
+    prefix = re.sub(r"[\s-]", "", query).upper()
+    return prefix if len(prefix) >= 3 and prefix.isalnum() else None
+
+
+def _postgres_text_hits(terms: list[str]) -> Select:
+    tsquery = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms))
+    document = literal_column(BOOK_SEARCH_DOCUMENT)
+    title_document = func.to_tsvector(literal_column("'simple'"), func.coalesce(Book.title, ""))
+    rank = func.ts_rank(document, tsquery) + cast(title_document.op("@@")(tsquery), Integer) * TITLE_MATCH_SCORE
+    return select(Book.id.label("book_id"), rank.label("score")).where(document.op("@@")(tsquery))
+
+
+def _sqlite_text_hits(terms: list[str]) -> Select:
+    match = " ".join(f'"{term}"*' for term in terms)
+    rank = -func.bm25(literal_column("books_fts"), 2.0, 1.0)
+    return select(books_fts.c.rowid.label("book_id"), rank.label("score")).where(
+        literal_column("books_fts").op("MATCH")(match)
+    )
+
+
+def search_books(db: Session, q: str, limit: int = 20, after: Optional[str] = None) -> list[BookSearchResult]:
+    terms = re.findall(r"[^\W_]+", q.lower())
+    isbn_prefix = _isbn_prefix(q)
+    dialect = db.get_bind().dialect.name
+
+    hits: list[Select] = []
+    if terms:
+        hits.append(_postgres_text_hits(terms) if dialect == "postgresql" else _sqlite_text_hits(terms))
+    if isbn_prefix:
+        isbn_match = Book.isbn.startswith(isbn_prefix, autoescape=True)
+        if dialect == "sqlite":
+            isbn_match = and_(isbn_match, Book.isbn >= isbn_prefix, Book.isbn < isbn_prefix + "\uffff")
+        hits.append(select(Book.id.label("book_id"), literal(ISBN_PREFIX_SCORE).label("score")).where(isbn_match))
+    if not hits:
+        return []
+
+    combined = union_all(*hits).subquery()
+    scored = (
+        select(combined.c.book_id, func.sum(combined.c.score).label("score"))
+        .group_by(combined.c.book_id)
+        .subquery()
+    )
+    query = select(Book, scored.c.score).join(scored, scored.c.book_id == Book.id)
+    if after is not None:
+        last_score, last_id = decode_score_cursor(after)
+        query = query.where(
+            or_(scored.c.score < last_score, and_(scored.c.score == last_score, Book.id > last_id))
+        )
+    rows = db.execute(query.order_by(scored.c.score.desc(), Book.id.asc()).limit(limit)).all()
+    return [
+        BookSearchResult(**BookResponse.model_validate(book).model_dump(), score=score) for book, score in rows
+    ]
+
+
+def _read_import_records(source: TextIO, record_format: RecordFormat) -> Iterator[tuple[int, Any, Optional[str]]]:
+    if record_format is RecordFormat.csv:
+        for row_number, record in enumerate(csv.DictReader(source), start=1):
+            values = {key: value for key, value in record.items() if key is not None and value not in ("", None)}
+            yield row_number, values, None
+        return
+
+    for row_number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line), None
+        except ValueError:
+            yield row_number, None, "Invalid JSON"
+
+
+def _chunked(records: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    iterator = iter(records)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, error['loc'])) or 'row'}: {error['msg']}" for error in exc.errors())
+
+
+def _existing_isbns(db: Session, isbns: list[str]) -> set[str]:
+    if not isbns:
+        return set()
+    return set(db.scalars(select(Book.isbn).where(Book.isbn.in_(isbns))))
+
+
+def _copy_books(db: Session, rows: list[dict[str, Any]]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([row[name] for name in IMPORT_COLUMNS] for row in rows)
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY books ({', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def _insert_books(db: Session, payloads: list[BookCreate]) -> None:
+    if not payloads:
+        return
+    now = datetime.utcnow()
+    rows = [
+        {
+            **payload.model_dump(),
+            "available_copies": payload.total_copies,
+            "active": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for payload in payloads
+    ]
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg2":
+        _copy_books(db, rows)
+    else:
+        db.execute(insert(Book), rows)
+
+
+def _insert_each_book(db: Session, payloads: list[BookCreate]) -> list[BookCreate]:
+    inserted = []
+    for payload in payloads:
+        try:
+            with db.begin_nested():
+                _insert_books(db, [payload])
+        except IntegrityError:
+            continue
+        inserted.append(payload)
+    return inserted
+
+
+def import_books(db: Session, source: TextIO, record_format: RecordFormat) -> BookImportReport:
+    started = time.perf_counter()
+    received = imported = failed = 0
+    errors: list[BookImportError] = []
+    seen_isbns: set[str] = set()
+
+    try:
+        for chunk in _chunked(_read_import_records(source, record_format), IMPORT_CHUNK_SIZE):
+            received += len(chunk)
+            rejected: list[tuple[int, Any, str]] = []
+            candidates: list[tuple[int, BookCreate]] = []
+            for row_number, record, parse_error in chunk:
+                isbn = record.get("isbn") if isinstance(record, dict) else None
+                if parse_error is not None:
+                    rejected.append((row_number, isbn, parse_error))
+                    continue
+                try:
+                    payload = BookCreate.model_validate(record)
+                except ValidationError as exc:
+                    rejected.append((row_number, isbn, _validation_detail(exc)))
+                    continue
+                if payload.isbn in seen_isbns:
+                    rejected.append((row_number, payload.isbn, "Duplicate ISBN in import"))
+                    continue
+                seen_isbns.add(payload.isbn)
+                candidates.append((row_number, payload))
+
+            isbns = [payload.isbn for _, payload in candidates]
+            existing = _existing_isbns(db, isbns)
+            new_books = [payload for _, payload in candidates if payload.isbn not in existing]
+            try:
+                _insert_books(db, new_books)
+                db.commit()
+            except IntegrityError:
+                # Another writer created one of the ISBNs after the lookup; fall back to one row at a time.
+                db.rollback()
+                existing = _existing_isbns(db, isbns)
+                new_books = _insert_each_book(
+                    db, [payload for _, payload in candidates if payload.isbn not in existing]
+                )
+                db.commit()
+
+            inserted_isbns = {payload.isbn for payload in new_books}
+            rejected.extend(
+                (row_number, payload.isbn, "Book with this ISBN already exists")
+                for row_number, payload in candidates
+                if payload.isbn not in inserted_isbns
+            )
+            imported += len(new_books)
+            failed += len(rejected)
+            for row_number, isbn, detail in sorted(rejected, key=lambda item: item[0]):
+                if len(errors) >= IMPORT_MAX_REPORTED_ERRORS:
+                    break
+                errors.append(BookImportError(row=row_number, isbn=None if isbn is None else str(isbn), detail=detail))
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Import body must be UTF-8 encoded")
+    except Exception:
+        db.rollback()
+        raise
+
+    elapsed = time.perf_counter() - started
+    return BookImportReport(
+        received=received,
+        imported=imported,
+        failed=failed,
+        errors=errors,
+        errors_truncated=failed > len(errors),
+        elapsed_seconds=elapsed,
+        rows_per_second=received / elapsed if elapsed > 0 else 0.0,
+    )
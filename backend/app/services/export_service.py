@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Iterator, Sequence
+from datetime import date, datetime
+from typing import Any
+
+from sqlalchemy import Select, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..models import Book, Loan, Member
+from ..schemas import ExportEntity, RecordFormat
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    RecordFormat.ndjson: "application/x-ndjson",
+    RecordFormat.csv: "text/csv; charset=utf-8",
+}
+
+
+def export_statement(entity: ExportEntity) -> Select:
+    if entity is ExportEntity.books:
+        return select(
+            Book.id,
+            Book.title,
+            Book.author,
+            Book.isbn,
+            Book.publication_year,
+            Book.total_copies,
+            Book.available_copies,
+            Book.active,
+        ).order_by(Book.id)
+    if entity is ExportEntity.members:
+        return select(Member.id, Member.name, Member.email, Member.phone, Member.address, Member.active).order_by(
+            Member.id
+        )
+    return (
+        select(
+            Loan.id,
+            Loan.member_id,
+            Loan.book_id,
+            Loan.borrowed_at,
+            Loan.due_date,
+            Loan.returned_at,
+            Member.name.label("member_name"),
+            Book.title.label("book_title"),
+        )
+        .join(Member, Member.id == Loan.member_id)
+        .join(Book, Book.id == Loan.book_id)
+        .order_by(Loan.id)
+    )
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def encode_rows(export_format: RecordFormat, columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> bytes:
+    if export_format is RecordFormat.ndjson:
+        lines = [json.dumps(dict(zip(columns, map(_plain, row))), separators=(",", ":")) for row in rows]
+        return ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _header(export_format: RecordFormat, columns: Sequence[str]) -> bytes:
+    if export_format is RecordFormat.csv:
+        return encode_rows(export_format, columns, [columns])
+    return b""
+
+
+def stream_export(
+    engine: Engine,
+    entity: ExportEntity,
+    export_format: RecordFormat,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[bytes]:
+    with engine.connect() as connection:
+        result = connection.execute(export_statement(entity), execution_options={"yield_per": batch_size})
+        columns = list(result.keys())
+        yield _header(export_format, columns)
+        for partition in result.partitions():
+            yield encode_rows(export_format, columns, partition)
+
+
+async def astream_export(
+    engine: AsyncEngine,
+    entity: ExportEntity,
+    export_format: RecordFormat,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    async with engine.connect() as connection:
+        result = await connection.stream(export_statement(entity), execution_options={"yield_per": batch_size})
+        columns = list(result.keys())
+        yield _header(export_format, columns)
+        async for partition in result.partitions():
+            yield encode_rows(export_format, columns, partition)
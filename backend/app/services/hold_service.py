@@ -0,0 +1,206 @@
+from collections import Counter
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import case, exists, func, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..cache import entity_cache
+from ..config import settings
+from ..models import Book, Hold, Loan, Member
+from ..schemas import HoldCreate, HoldResponse, HoldStatus
+
+DUPLICATE_HOLD_DETAIL = "Member already has a hold on this book"
+HOLD_CLOSED_DETAIL = "Hold is already closed"
+OPEN_HOLD_STATUSES = (HoldStatus.waiting.value, HoldStatus.ready.value)
+
+
+def _held_by_active_member():
+    return exists().where(Member.id == Hold.member_id, Member.active.is_(True))
+
+
+def _queued(book_id: int) -> list:
+    # Holds of deactivated members stay in the table but are never served.
+    return [Hold.book_id == book_id, Hold.status == HoldStatus.waiting.value, _held_by_active_member()]
+
+
+def ready_hold_exists(member_id: int, book_id: int):
+    return exists().where(
+        Hold.member_id == member_id, Hold.book_id == book_id, Hold.status == HoldStatus.ready.value
+    )
+
+
+def waiting_hold_exists(book_id: int):
+    return exists().where(*_queued(book_id))
+
+
+def book_lock(book_ids: Iterable[int]):
+    return select(Book.id).where(Book.id.in_(sorted(book_ids))).order_by(Book.id).with_for_update()
+
+
+def lock_books(db: Session, book_ids: Iterable[int]) -> None:
+    # Hold placement and returns check the queue under the same row lock, so neither misses the other.
+    db.execute(book_lock(book_ids)).all()
+
+
+def books_with_waiting_holds(db: Session, book_ids: Iterable[int]) -> list[int]:
+    return db.scalars(
+        select(Hold.book_id)
+        .where(Hold.book_id.in_(list(book_ids)), Hold.status == HoldStatus.waiting.value, _held_by_active_member())
+        .distinct()
+    ).all()
+
+
+def assign_waiting_holds(db: Session, book_id: int, copies: int, ready_at: datetime) -> list[tuple[int, int]]:
+    next_in_line = (
+        select(Hold.id)
+        .where(*_queued(book_id))
+        .order_by(Hold.created_at, Hold.id)
+        .limit(copies)
+        .with_for_update(skip_locked=True)
+    )
+    assigned = db.execute(
+        update(Hold)
+        .where(Hold.id.in_(next_in_line), Hold.status == HoldStatus.waiting.value)
+        .values(status=HoldStatus.ready.value, ready_at=ready_at)
+        .returning(Hold.id, Hold.member_id),
+        execution_options={"synchronize_session": False},
+    )
+    return [tuple(row) for row in assigned]
+
+
+def _queue_position(db: Session, hold: Hold) -> int:
+    ahead = db.scalar(
+        select(func.count(Hold.id)).where(
+            *_queued(hold.book_id),
+            tuple_(Hold.created_at, Hold.id) < tuple_(hold.created_at, hold.id),
+        )
+    )
+    return ahead + 1
+
+
+def create_hold(db: Session, book_id: int, payload: HoldCreate) -> HoldResponse:
+    member_active = exists().where(Member.id == payload.member_id, Member.active.is_(True))
+    book_active = exists().where(Book.id == book_id, Book.active.is_(True))
+    already_open = exists().where(
+        Loan.member_id == payload.member_id, Loan.book_id == book_id, Loan.returned_at.is_(None)
+    )
+    has_member, has_book, is_open = db.execute(select(member_active, book_active, already_open)).one()
+    if not has_member:
+        raise HTTPException(status_code=404, detail="Active member not found")
+    if not has_book:
+        raise HTTPException(status_code=404, detail="Active book not found")
+    if is_open:
+        raise HTTPException(status_code=409, detail="Member already has this book checked out")
+
+    try:
+        lock_books(db, [book_id])
+        # A free copy only goes to the new hold when nobody is already waiting for one.
+        reserved = db.execute(
+            update(Book)
+            .where(Book.id == book_id, Book.available_copies > 0, ~waiting_hold_exists(book_id))
+            .values(available_copies=Book.available_copies - 1)
+            .returning(Book.id),
+            execution_options={"synchronize_session": False},
+        ).first()
+        hold = Hold(book_id=book_id, member_id=payload.member_id, status=HoldStatus.waiting.value)
+        if reserved is not None:
+            hold.status = HoldStatus.ready.value
+            hold.ready_at = datetime.utcnow()
+        db.add(hold)
+        db.flush()
+        response = HoldResponse.model_validate(hold)
+        if reserved is None:
+            response.queue_position = _queue_position(db, hold)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=DUPLICATE_HOLD_DETAIL)
+    except Exception:
+        db.rollback()
+        raise
+    if reserved is not None:
+        entity_cache.invalidate(Book, book_id)
+    return response
+
+
+def release_reserved_copies(db: Session, copies: Counter, now: datetime) -> None:
+    # Returned copies and copies freed by closed ready holds go to the next waiting hold, or back on the shelf.
+    restocked = Counter(copies)
+    for book_id in books_with_waiting_holds(db, copies):
+        restocked[book_id] -= len(assign_waiting_holds(db, book_id, copies[book_id], now))
+    restocked = +restocked
+    if restocked:
+        db.execute(
+            update(Book)
+            .where(Book.id.in_(restocked))
+            .values(available_copies=Book.available_copies + case(restocked, value=Book.id)),
+            execution_options={"synchronize_session": False},
+        )
+
+
+def cancel_hold(db: Session, hold_id: int) -> HoldResponse:
+    hold = db.get(Hold, hold_id)
+    if hold is None:
+        raise HTTPException(status_code=404, detail="Hold not found")
+    if hold.status not in OPEN_HOLD_STATUSES:
+        raise HTTPException(status_code=409, detail=HOLD_CLOSED_DETAIL)
+
+    book_id, was_ready = hold.book_id, hold.status == HoldStatus.ready.value
+    try:
+        lock_books(db, [book_id])
+        cancelled = db.execute(
+            update(Hold)
+            .where(Hold.id == hold_id, Hold.status == hold.status)
+            .values(status=HoldStatus.cancelled.value),
+            execution_options={"synchronize_session": False},
+        )
+        if cancelled.rowcount == 0:
+            raise HTTPException(status_code=409, detail=HOLD_CLOSED_DETAIL)
+        if was_ready:
+            release_reserved_copies(db, Counter({book_id: 1}), datetime.utcnow())
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if was_ready:
+        entity_cache.invalidate(Book, book_id)
+    db.refresh(hold)
+    return HoldResponse.model_validate(hold)
+
+
+def expire_ready_holds(db: Session, now: Optional[datetime] = None, batch_size: int = 1000) -> int:
+    now = now or datetime.utcnow()
+    uncollected = or_(Hold.ready_at <= now - timedelta(days=settings.hold_pickup_days), ~_held_by_active_member())
+    expired = 0
+    while True:
+        candidates = db.execute(
+            select(Hold.id, Hold.book_id)
+            .where(Hold.status == HoldStatus.ready.value, uncollected)
+            .order_by(Hold.ready_at, Hold.id)
+            .limit(batch_size)
+        ).all()
+        if not candidates:
+            return expired
+        try:
+            lock_books(db, {row.book_id for row in candidates})
+            closed = db.execute(
+                update(Hold)
+                .where(Hold.id.in_([row.id for row in candidates]), Hold.status == HoldStatus.ready.value)
+                .values(status=HoldStatus.expired.value)
+                .returning(Hold.book_id),
+                execution_options={"synchronize_session": False},
+            ).all()
+            copies = Counter(row.book_id for row in closed)
+            release_reserved_copies(db, copies, now)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        entity_cache.invalidate(Book, *copies)
+        expired += len(closed)
+        if len(candidates) < batch_size:
+            return expired
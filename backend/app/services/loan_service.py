@@ -1,24 +1,66 @@
+from collections import Counter
 from datetime import date, datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Optional
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import case, exists, func, insert, literal, select, tuple_, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, Session
 
+from ..cache import entity_cache
 from ..config import settings
-from ..models import Book, Loan, Member
-from ..schemas import BorrowRequest, LoanListResponse, ReturnResponse
+from ..idempotency import record_response
+from ..metrics import domain_metrics
+from ..models import Book, Hold, Loan, LoanHistory, Member
+from ..pagination import decode_date_cursor, decode_timestamp_cursor
+from ..projection import columns_of
+from ..schemas import (
+    BatchBorrowResult,
+    BatchReturnResult,
+    BorrowRequest,
+    HoldStatus,
+    LoanListResponse,
+    LoanResponse,
+    ReturnResponse,
+)
+from . import hold_service, overdue_service
 
+LOAN_LIMIT_DETAIL = "Member has reached the maximum number of active loans"
+LOAN_RESPONSE_FIELDS = tuple(LoanResponse.model_fields)
 
-def borrow_book(db: Session, payload: BorrowRequest) -> Loan:
+
+def _clamped(expression):
+    return case((expression > 0, expression), else_=0)
+
+
+def _update_member_counters(db: Session, active_changes: Counter, overdue_changes: Counter, enforce_limit: bool) -> int:
+    active_delta = case(dict(active_changes), value=Member.id, else_=0)
+    statement = update(Member).where(Member.id.in_(active_changes))
+    if overdue_changes:
+        overdue_delta = case(dict(overdue_changes), value=Member.id, else_=0)
+        statement = statement.values(overdue_loan_count=_clamped(Member.overdue_loan_count + overdue_delta))
+    if enforce_limit:
+        statement = statement.where(Member.active_loan_count + active_delta <= settings.max_active_loans)
+    updated = db.execute(
+        statement.values(active_loan_count=_clamped(Member.active_loan_count + active_delta)),
+        execution_options={"synchronize_session": False},
+    )
+    return updated.rowcount
+
+
+def borrow_book_stepwise(db: Session, payload: BorrowRequest) -> Loan:
     member = db.query(Member).filter(Member.id == payload.member_id, Member.active.is_(True)).first()
     if not member:
         raise HTTPException(status_code=404, detail="Active member not found")
+    if member.active_loan_count >= settings.max_active_loans:
+        raise HTTPException(status_code=409, detail=LOAN_LIMIT_DETAIL)
 
     book = db.query(Book).filter(Book.id == payload.book_id, Book.active.is_(True)).first()
     if not book:
         raise HTTPException(status_code=404, detail="Active book not found")
 
-    if book.available_copies <= 0:
+    reserved = db.scalar(select(hold_service.ready_hold_exists(payload.member_id, payload.book_id)))
+    if not reserved and book.available_copies <= 0:
         raise HTTPException(status_code=409, detail="No available copies for this book")
 
     already_open = (
@@ -36,41 +78,440 @@ def borrow_book(db: Session, payload: BorrowRequest) -> Loan:
     due_date = payload.due_date or (date.today() + timedelta(days=settings.default_loan_days))
 
     loan = Loan(member_id=payload.member_id, book_id=payload.book_id, due_date=due_date)
-    book.available_copies -= 1
 
     try:
+        if reserved:
+            taken = db.execute(_claim_ready_hold(payload, datetime.utcnow())).first()
+        else:
+            taken = db.execute(
+                update(Book)
+                .where(
+                    Book.id == payload.book_id,
+                    Book.available_copies > 0,
+                    ~hold_service.waiting_hold_exists(payload.book_id),
+                )
+                .values(available_copies=Book.available_copies - 1)
+                .returning(Book.available_copies),
+                execution_options={"synchronize_session": False},
+            ).first()
+        if taken is None:
+            raise HTTPException(status_code=409, detail="No available copies for this book")
+        overdue_changes = overdue_service.overdue_deltas(db, [(payload.member_id, due_date, 1)])
+        if not _update_member_counters(db, Counter({payload.member_id: 1}), overdue_changes, enforce_limit=True):
+            raise HTTPException(status_code=409, detail=LOAN_LIMIT_DETAIL)
         db.add(loan)
+        db.flush()
+        record_response(db, LoanResponse.model_validate(loan))
         db.commit()
+        entity_cache.invalidate(Book, payload.book_id)
+        entity_cache.invalidate(Member, payload.member_id)
+        domain_metrics.record_borrows()
         db.refresh(loan)
         return loan
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Member already has this book checked out")
     except Exception:
         db.rollback()
         raise
 
 
+def _borrow_failure(db: Session, payload: BorrowRequest) -> HTTPException:
+    member_loans = (
+        select(Member.active_loan_count)
+        .where(Member.id == payload.member_id, Member.active.is_(True))
+        .scalar_subquery()
+    )
+    book_available = (
+        select(Book.available_copies).where(Book.id == payload.book_id, Book.active.is_(True)).scalar_subquery()
+    )
+    already_open = exists().where(
+        Loan.member_id == payload.member_id, Loan.book_id == payload.book_id, Loan.returned_at.is_(None)
+    )
+    active_loans, available, is_open = db.execute(select(member_loans, book_available, already_open)).one()
+    if active_loans is None:
+        return HTTPException(status_code=404, detail="Active member not found")
+    if active_loans >= settings.max_active_loans:
+        return HTTPException(status_code=409, detail=LOAN_LIMIT_DETAIL)
+    if available is None:
+        return HTTPException(status_code=404, detail="Active book not found")
+    if is_open and available > 0:
+        return HTTPException(status_code=409, detail="Member already has this book checked out")
+    return HTTPException(status_code=409, detail="No available copies for this book")
+
+
+def _borrow_statements(payload: BorrowRequest, due_date: date, borrowed_at: datetime):
+    eligible_member = exists().where(
+        Member.id == payload.member_id,
+        Member.active.is_(True),
+        Member.active_loan_count < settings.max_active_loans,
+    )
+    already_open = exists().where(
+        Loan.member_id == payload.member_id, Loan.book_id == payload.book_id, Loan.returned_at.is_(None)
+    )
+    decrement = (
+        update(Book)
+        .where(
+            Book.id == payload.book_id,
+            Book.active.is_(True),
+            Book.available_copies > 0,
+            eligible_member,
+            ~already_open,
+            ~hold_service.ready_hold_exists(payload.member_id, payload.book_id),
+            ~hold_service.waiting_hold_exists(payload.book_id),
+        )
+        .values(available_copies=Book.available_copies - 1, updated_at=borrowed_at)
+        .returning(Book.id)
+    )
+    count = (
+        update(Member)
+        .where(Member.id == payload.member_id, Member.active_loan_count < settings.max_active_loans)
+        .values(active_loan_count=Member.active_loan_count + 1, updated_at=borrowed_at)
+        .returning(Member.id)
+    )
+    loan_values = select(
+        literal(payload.member_id), literal(payload.book_id), literal(due_date), literal(borrowed_at)
+    )
+    return decrement, count, loan_values
+
+
+def borrow_cte(payload: BorrowRequest, due_date: date, borrowed_at: datetime):
+    decrement, count, loan_values = _borrow_statements(payload, due_date, borrowed_at)
+    decremented = decrement.cte("decremented")
+    counted = count.where(exists(select(decremented.c.id))).cte("counted")
+    loan_columns = ["member_id", "book_id", "due_date", "borrowed_at"]
+    created = (
+        insert(Loan)
+        .from_select(loan_columns, loan_values.where(exists(select(counted.c.id))))
+        .returning(Loan.id)
+        .cte("created")
+    )
+    return select(select(created.c.id).scalar_subquery())
+
+
+def _borrow_in_one_statement(db: Session, payload: BorrowRequest, due_date: date, borrowed_at: datetime):
+    return db.execute(borrow_cte(payload, due_date, borrowed_at)).scalar()
+
+
+def _borrow_in_steps(db: Session, payload: BorrowRequest, due_date: date, borrowed_at: datetime):
+    decrement, count, loan_values = _borrow_statements(payload, due_date, borrowed_at)
+    if db.execute(decrement).first() is None or db.execute(count).first() is None:
+        return None
+    create = insert(Loan).from_select(["member_id", "book_id", "due_date", "borrowed_at"], loan_values)
+    return db.execute(create.returning(Loan.id)).scalar()
+
+
+def _claim_ready_hold(payload: BorrowRequest, borrowed_at: datetime):
+    return (
+        update(Hold)
+        .where(
+            Hold.member_id == payload.member_id,
+            Hold.book_id == payload.book_id,
+            Hold.status == HoldStatus.ready.value,
+            exists().where(Member.id == payload.member_id, Member.active.is_(True)),
+        )
+        .values(status=HoldStatus.fulfilled.value, fulfilled_at=borrowed_at)
+        .returning(Hold.id)
+    )
+
+
+def _borrow_reserved_copy(db: Session, payload: BorrowRequest, due_date: date, borrowed_at: datetime):
+    _, count, loan_values = _borrow_statements(payload, due_date, borrowed_at)
+    if db.execute(_claim_ready_hold(payload, borrowed_at)).first() is None or db.execute(count).first() is None:
+        return None
+    create = insert(Loan).from_select(["member_id", "book_id", "due_date", "borrowed_at"], loan_values)
+    return db.execute(create.returning(Loan.id)).scalar()
+
+
+def borrow_book(db: Session, payload: BorrowRequest) -> LoanResponse:
+    due_date = payload.due_date or (date.today() + timedelta(days=settings.default_loan_days))
+    if due_date < date.today():
+        # Past-due loans also move the member's overdue counter, which depends on the watermark.
+        return LoanResponse.model_validate(borrow_book_stepwise(db, payload))
+
+    borrowed_at = datetime.utcnow()
+    borrow = _borrow_in_one_statement if db.get_bind().dialect.name == "postgresql" else _borrow_in_steps
+    try:
+        loan_id = borrow(db, payload, due_date, borrowed_at)
+        if loan_id is None:
+            db.rollback()
+            loan_id = _borrow_reserved_copy(db, payload, due_date, borrowed_at)
+        if loan_id is None:
+            db.rollback()
+            raise _borrow_failure(db, payload)
+        loan = LoanResponse(
+            id=loan_id,
+            member_id=payload.member_id,
+            book_id=payload.book_id,
+            borrowed_at=borrowed_at,
+            due_date=due_date,
+            returned_at=None,
+        )
+        record_response(db, loan)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Member already has this book checked out")
+    except Exception:
+        db.rollback()
+        raise
+    entity_cache.invalidate(Book, payload.book_id)
+    entity_cache.invalidate(Member, payload.member_id)
+    domain_metrics.record_borrows()
+    return loan
+
+
 def return_book(db: Session, loan_id: int) -> ReturnResponse:
-    loan = db.query(Loan).filter(Loan.id == loan_id).first()
+    # Locks the book row like hold_service.lock_books, without spending an extra query on it.
+    loan = (
+        db.query(Loan)
+        .join(Book, Book.id == Loan.book_id)
+        .filter(Loan.id == loan_id)
+        .with_for_update(of=Book)
+        .first()
+    )
     if not loan:
         raise HTTPException(status_code=404, detail="Loan not found")
 
     if loan.returned_at is not None:
         raise HTTPException(status_code=409, detail="Loan is already closed")
 
-    book = db.query(Book).filter(Book.id == loan.book_id).first()
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found for this loan")
+    book_id, member_id, due_date = loan.book_id, loan.member_id, loan.due_date
+    returned_at = datetime.now(timezone.utc)
 
-    loan.returned_at = datetime.now(timezone.utc)
-    book.available_copies += 1
+    try:
+        closed = db.execute(
+            update(Loan)
+            .where(Loan.id == loan_id, Loan.returned_at.is_(None))
+            .values(returned_at=returned_at),
+            execution_options={"synchronize_session": False},
+        )
+        if closed.rowcount == 0:
+            raise HTTPException(status_code=409, detail="Loan is already closed")
+        restock = (
+            update(Book)
+            .where(Book.id == book_id)
+            .values(available_copies=Book.available_copies + 1)
+            .returning(Book.available_copies)
+        )
+        # Waiting holds get the copy first; restock anyway if every waiting hold is locked by another return.
+        restored = db.execute(
+            restock.where(~hold_service.waiting_hold_exists(book_id)),
+            execution_options={"synchronize_session": False},
+        ).first()
+        if restored is None and not hold_service.assign_waiting_holds(db, book_id, 1, returned_at):
+            restored = db.execute(restock, execution_options={"synchronize_session": False}).first()
+            if restored is None:
+                raise HTTPException(status_code=404, detail="Book not found for this loan")
+        overdue_changes = overdue_service.overdue_deltas(db, [(member_id, due_date, -1)])
+        _update_member_counters(db, Counter({member_id: -1}), overdue_changes, enforce_limit=False)
+        returned = ReturnResponse(loan_id=loan_id, returned_at=returned_at)
+        record_response(db, returned)
+        db.commit()
+        entity_cache.invalidate(Book, book_id)
+        entity_cache.invalidate(Member, member_id)
+        domain_metrics.record_returns()
+        return returned
+    except Exception:
+        db.rollback()
+        raise
+
+
+def borrow_books_batch(db: Session, items: list[BorrowRequest]) -> list[BatchBorrowResult]:
+    member_ids = {item.member_id for item in items}
+    book_ids = {item.book_id for item in items}
+
+    active_loan_counts = dict(
+        db.query(Member.id, Member.active_loan_count).filter(Member.id.in_(member_ids), Member.active.is_(True)).all()
+    )
+    available = dict(
+        db.query(Book.id, Book.available_copies).filter(Book.id.in_(book_ids), Book.active.is_(True)).all()
+    )
+    open_pairs = set(
+        db.query(Loan.member_id, Loan.book_id)
+        .filter(Loan.member_id.in_(member_ids), Loan.book_id.in_(book_ids), Loan.returned_at.is_(None))
+        .all()
+    )
+    ready_pairs = set(
+        db.query(Hold.member_id, Hold.book_id)
+        .filter(Hold.member_id.in_(member_ids), Hold.book_id.in_(book_ids), Hold.status == HoldStatus.ready.value)
+        .all()
+    )
+    queued_books = set(hold_service.books_with_waiting_holds(db, book_ids))
+
+    results: list[BatchBorrowResult] = []
+    accepted: dict[tuple[int, int], int] = {}
+    reserved: set[tuple[int, int]] = set()
+    default_due_date = date.today() + timedelta(days=settings.default_loan_days)
+    for index, item in enumerate(items):
+        pair = (item.member_id, item.book_id)
+        if item.member_id not in active_loan_counts:
+            results.append(BatchBorrowResult(index=index, status_code=404, detail="Active member not found"))
+        elif active_loan_counts[item.member_id] >= settings.max_active_loans:
+            results.append(BatchBorrowResult(index=index, status_code=409, detail=LOAN_LIMIT_DETAIL))
+        elif item.book_id not in available:
+            results.append(BatchBorrowResult(index=index, status_code=404, detail="Active book not found"))
+        elif pair in ready_pairs and pair not in open_pairs:
+            active_loan_counts[item.member_id] += 1
+            open_pairs.add(pair)
+            reserved.add(pair)
+            accepted[pair] = index
+            results.append(BatchBorrowResult(index=index, status_code=201))
+        elif available[item.book_id] <= 0 or item.book_id in queued_books:
+            results.append(
+                BatchBorrowResult(index=index, status_code=409, detail="No available copies for this book")
+            )
+        elif pair in open_pairs:
+            results.append(
+                BatchBorrowResult(index=index, status_code=409, detail="Member already has this book checked out")
+            )
+        else:
+            available[item.book_id] -= 1
+            active_loan_counts[item.member_id] += 1
+            open_pairs.add(pair)
+            accepted[pair] = index
+            results.append(BatchBorrowResult(index=index, status_code=201))
+
+    if not accepted:
+        return results
+
+    new_loans = [
+        {
+            "member_id": item.member_id,
+            "book_id": item.book_id,
+            "due_date": item.due_date or default_due_date,
+        }
+        for item in (items[index] for index in accepted.values())
+    ]
+    decrements = Counter(book_id for _, book_id in accepted.keys() - reserved)
+    try:
+        inserted = db.execute(insert(Loan).returning(*Loan.__table__.columns), new_loans)
+        for row in inserted.mappings():
+            results[accepted[(row["member_id"], row["book_id"])]].loan = LoanResponse.model_validate(row)
+        if reserved:
+            claimed = db.execute(
+                update(Hold)
+                .where(tuple_(Hold.member_id, Hold.book_id).in_(reserved), Hold.status == HoldStatus.ready.value)
+                .values(status=HoldStatus.fulfilled.value, fulfilled_at=datetime.utcnow()),
+                execution_options={"synchronize_session": False},
+            )
+            if claimed.rowcount != len(reserved):
+                raise HTTPException(status_code=409, detail="Holds changed during the batch; retry")
+        if decrements:
+            updated = db.execute(
+                update(Book)
+                .where(
+                    Book.id.in_(decrements),
+                    Book.available_copies >= case(decrements, value=Book.id),
+                    ~hold_service.waiting_hold_exists(Book.id),
+                )
+                .values(available_copies=Book.available_copies - case(decrements, value=Book.id)),
+                execution_options={"synchronize_session": False},
+            )
+            if updated.rowcount != len(decrements):
+                raise HTTPException(status_code=409, detail="Available copies changed during the batch; retry")
+        borrowed = Counter(loan["member_id"] for loan in new_loans)
+        overdue_changes = overdue_service.overdue_deltas(
+            db, [(loan["member_id"], loan["due_date"], 1) for loan in new_loans]
+        )
+        if _update_member_counters(db, borrowed, overdue_changes, enforce_limit=True) != len(borrowed):
+            raise HTTPException(status_code=409, detail="Active loan counts changed during the batch; retry")
+        db.commit()
+        entity_cache.invalidate(Book, *decrements)
+        entity_cache.invalidate(Member, *borrowed)
+        domain_metrics.record_borrows(len(new_loans))
+        return results
+    except Exception:
+        db.rollback()
+        raise
+
+
+def return_books_batch(db: Session, loan_ids: list[int]) -> list[BatchReturnResult]:
+    loans = {loan.id: loan for loan in db.query(Loan).filter(Loan.id.in_(set(loan_ids))).all()}
+
+    results: list[BatchReturnResult] = []
+    closing: dict[int, Loan] = {}
+    returned_at = datetime.now(timezone.utc)
+    for index, loan_id in enumerate(loan_ids):
+        loan = loans.get(loan_id)
+        if loan is None:
+            results.append(BatchReturnResult(index=index, loan_id=loan_id, status_code=404, detail="Loan not found"))
+        elif loan.returned_at is not None or loan_id in closing:
+            results.append(
+                BatchReturnResult(index=index, loan_id=loan_id, status_code=409, detail="Loan is already closed")
+            )
+        else:
+            closing[loan_id] = loan
+            results.append(
+                BatchReturnResult(index=index, loan_id=loan_id, status_code=200, returned_at=returned_at)
+            )
+
+    if not closing:
+        return results
 
+    increments = Counter(loan.book_id for loan in closing.values())
     try:
+        hold_service.lock_books(db, increments)
+        closed = db.execute(
+            update(Loan)
+            .where(Loan.id.in_(closing), Loan.returned_at.is_(None))
+            .values(returned_at=returned_at),
+            execution_options={"synchronize_session": False},
+        )
+        if closed.rowcount != len(closing):
+            raise HTTPException(status_code=409, detail="Loans changed during the batch; retry")
+        hold_service.release_reserved_copies(db, increments, returned_at)
+        returned: Counter = Counter()
+        for loan in closing.values():
+            returned[loan.member_id] -= 1
+        overdue_changes = overdue_service.overdue_deltas(
+            db, [(loan.member_id, loan.due_date, -1) for loan in closing.values()]
+        )
+        _update_member_counters(db, returned, overdue_changes, enforce_limit=False)
         db.commit()
-        return ReturnResponse(loan_id=loan.id, returned_at=loan.returned_at)
+        entity_cache.invalidate(Book, *increments)
+        entity_cache.invalidate(Member, *returned)
+        domain_metrics.record_returns(len(closing))
+        return results
     except Exception:
         db.rollback()
         raise
 
 
+def reconcile_member_counters(db: Session, batch_size: int = 1000) -> dict[str, int]:
+    overdue_service.refresh_overdue_counts(db)
+    last_id = db.scalar(select(func.max(Member.id))) or 0
+    open_loans = (
+        select(func.count(Loan.id))
+        .where(Loan.member_id == Member.id, Loan.returned_at.is_(None))
+        .correlate(Member)
+        .scalar_subquery()
+    )
+
+    repaired = {"active_loan_count": 0, "overdue_loan_count": 0}
+    for first_id in range(1, last_id + 1, batch_size):
+        last_in_batch = first_id + batch_size - 1
+        try:
+            active = db.execute(
+                update(Member)
+                .where(Member.id.between(first_id, last_in_batch), Member.active_loan_count != open_loans)
+                .values(active_loan_count=open_loans),
+                execution_options={"synchronize_session": False},
+            )
+            repaired["active_loan_count"] += active.rowcount
+            as_of = overdue_service.overdue_counts_as_of(db, lock=True)
+            if as_of is not None:
+                repaired["overdue_loan_count"] += overdue_service.rebuild_overdue_counts(
+                    db, as_of, first_id, last_in_batch
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    entity_cache.clear()
+    return repaired
+
+
 def list_loans(
     db: Session,
     member_id: Optional[int] = None,
@@ -95,7 +536,47 @@ def list_overdue_loans(
     query = db.query(Loan).filter(Loan.returned_at.is_(None), Loan.due_date < date.today())
     if member_id is not None:
         query = query.filter(Loan.member_id == member_id)
-    return query.order_by(Loan.borrowed_at.desc()).offset(offset).limit(limit).all()
+    return query.order_by(Loan.due_date, Loan.id).offset(offset).limit(limit).all()
+
+
+def _loan_list_query(db: Session, entity: Any = Loan) -> Query:
+    return (
+        db.query(
+            *columns_of(entity, LOAN_RESPONSE_FIELDS),
+            Member.name.label("member_name"),
+            Book.title.label("book_title"),
+        )
+        .join(Member, Member.id == entity.member_id)
+        .join(Book, Book.id == entity.book_id)
+    )
+
+
+def _before_cursor(query: Query, entity: Any, after: Optional[str]) -> Query:
+    if after is None:
+        return query
+    borrowed_at, loan_id = decode_timestamp_cursor(after)
+    return query.filter(tuple_(entity.borrowed_at, entity.id) < tuple_(borrowed_at, loan_id))
+
+
+def _page_by_borrowed_at(query: Query, offset: int, limit: int, after: Optional[str]) -> list:
+    query = _before_cursor(query, Loan, after)
+    return query.order_by(Loan.borrowed_at.desc(), Loan.id.desc()).offset(offset).limit(limit).all()
+
+
+def _page_with_history(
+    db: Session, current: Query, history: Query, offset: int, limit: int, after: Optional[str]
+) -> list:
+    # Each table contributes at most offset + limit rows from its own (borrowed_at, id) index.
+    branches = [
+        _before_cursor(query, entity, after)
+        .order_by(entity.borrowed_at.desc(), entity.id.desc())
+        .limit(offset + limit)
+        .subquery()
+        for query, entity in ((current, Loan), (history, LoanHistory))
+    ]
+    combined = union_all(*(select(branch) for branch in branches)).subquery()
+    page = select(combined).order_by(combined.c.borrowed_at.desc(), combined.c.id.desc()).offset(offset).limit(limit)
+    return db.execute(page).all()
 
 
 def list_loans_with_details(
@@ -104,31 +585,23 @@ def list_loans_with_details(
     active_only: bool = False,
     offset: int = 0,
     limit: int = 20,
+    after: Optional[str] = None,
+    include_history: bool = False,
 ) -> list[LoanListResponse]:
-    query = (
-        db.query(Loan, Member.name, Book.title)
-        .join(Member, Member.id == Loan.member_id)
-        .join(Book, Book.id == Loan.book_id)
-    )
+    query = _loan_list_query(db)
     if member_id is not None:
         query = query.filter(Loan.member_id == member_id)
     if active_only:
         query = query.filter(Loan.returned_at.is_(None))
 
-    rows = query.order_by(Loan.borrowed_at.desc()).offset(offset).limit(limit).all()
-    return [
-        LoanListResponse(
-            id=loan.id,
-            member_id=loan.member_id,
-            book_id=loan.book_id,
-            borrowed_at=loan.borrowed_at,
-            due_date=loan.due_date,
-            returned_at=loan.returned_at,
-            member_name=member_name,
-            book_title=book_title,
-        )
-        for loan, member_name, book_title in rows
-    ]
+    if include_history and not active_only:
+        history = _loan_list_query(db, LoanHistory)
+        if member_id is not None:
+            history = history.filter(LoanHistory.member_id == member_id)
+        rows = _page_with_history(db, query, history, offset, limit, after)
+    else:
+        rows = _page_by_borrowed_at(query, offset, limit, after)
+    return [LoanListResponse(**row._mapping) for row in rows]
 
 
 def list_overdue_loans_with_details(
@@ -136,27 +609,17 @@ def list_overdue_loans_with_details(
     member_id: Optional[int] = None,
     offset: int = 0,
     limit: int = 20,
+    after: Optional[str] = None,
 ) -> list[LoanListResponse]:
-    query = (
-        db.query(Loan, Member.name, Book.title)
-        .join(Member, Member.id == Loan.member_id)
-        .join(Book, Book.id == Loan.book_id)
-        .filter(Loan.returned_at.is_(None), Loan.due_date < date.today())
-    )
+    query = _loan_list_query(db).filter(Loan.returned_at.is_(None), Loan.due_date < date.today())
     if member_id is not None:
+        if overdue_service.member_overdue_count(db, member_id) == 0:
+            return []
         query = query.filter(Loan.member_id == member_id)
+    if after is not None:
+        due_date, loan_id = decode_date_cursor(after)
+        query = query.filter(tuple_(Loan.due_date, Loan.id) > tuple_(due_date, loan_id))
 
-    rows = query.order_by(Loan.borrowed_at.desc()).offset(offset).limit(limit).all()
-    return [
-        LoanListResponse(
-            id=loan.id,
-            member_id=loan.member_id,
-            book_id=loan.book_id,
-            borrowed_at=loan.borrowed_at,
-            due_date=loan.due_date,
-            returned_at=loan.returned_at,
-            member_name=member_name,
-            book_title=book_title,
-        )
-        for loan, member_name, book_title in rows
-    ]
+    # Longest overdue first, the same order as the partial (due_date, id) index on open loans.
+    rows = query.order_by(Loan.due_date, Loan.id).offset(offset).limit(limit).all()
+    return [LoanListResponse(**row._mapping) for row in rows]
@@ -1,10 +1,26 @@
+from collections.abc import Collection, Sequence
 from datetime import date
+from typing import Optional, Union
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, selectinload
 
+from ..cache import entity_cache
 from ..models import Book, Loan, Member
-from ..schemas import BorrowedBookView, MemberCreate, MemberUpdate
+from ..pagination import decode_id_cursor
+from ..projection import columns_of
+from ..schemas import (
+    BorrowedBookView,
+    MemberCreate,
+    MemberDetailResponse,
+    MemberLoanResponse,
+    MemberResponse,
+    MemberUpdate,
+)
+
+MEMBER_RESPONSE_FIELDS = tuple(MemberResponse.model_fields)
 
 
 def create_member(db: Session, payload: MemberCreate) -> Member:
@@ -23,19 +39,54 @@ def create_member(db: Session, payload: MemberCreate) -> Member:
         raise
 
 
-def list_members(db: Session, offset: int = 0, limit: int = 20) -> list[Member]:
-    return db.query(Member).order_by(Member.id.asc()).offset(offset).limit(limit).all()
+def list_members(
+    db: Session,
+    offset: int = 0,
+    limit: int = 20,
+    after: Optional[str] = None,
+    fields: Sequence[str] = MEMBER_RESPONSE_FIELDS,
+) -> list[Row]:
+    query = select(*columns_of(Member, fields))
+    if after is not None:
+        query = query.where(Member.id > decode_id_cursor(after))
+    return db.execute(query.order_by(Member.id.asc()).offset(offset).limit(limit)).all()
+
 
+def get_member_or_404(db: Session, member_id: int, use_cache: bool = True) -> Member:
+    if use_cache:
+        cached = entity_cache.load(db, Member, member_id)
+        if cached is not None:
+            return cached
 
-def get_member_or_404(db: Session, member_id: int) -> Member:
     member = db.query(Member).filter(Member.id == member_id).first()
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
+    if use_cache:
+        entity_cache.store(member)
     return member
 
 
+def get_member_detail(db: Session, member_id: int, include: Collection[str] = ()) -> Union[Member, MemberDetailResponse]:
+    if "active_loans" not in include:
+        return get_member_or_404(db, member_id)
+
+    member = (
+        db.query(Member)
+        .options(selectinload(Member.loans.and_(Loan.returned_at.is_(None))).selectinload(Loan.book))
+        .filter(Member.id == member_id)
+        .first()
+    )
+    if not member:
+        raise HTTPException(status_code=404, detail="Member not found")
+    active_loans = sorted(member.loans, key=lambda loan: (loan.borrowed_at, loan.id), reverse=True)
+    return MemberDetailResponse(
+        **MemberResponse.model_validate(member).model_dump(),
+        active_loans=[MemberLoanResponse.model_validate(loan) for loan in active_loans],
+    )
+
+
 def update_member(db: Session, member_id: int, payload: MemberUpdate) -> Member:
-    member = get_member_or_404(db, member_id)
+    member = get_member_or_404(db, member_id, use_cache=False)
 
     if payload.email and payload.email != member.email:
         duplicate = db.query(Member).filter(Member.email == payload.email).first()
@@ -48,6 +99,7 @@ def update_member(db: Session, member_id: int, payload: MemberUpdate) -> Member:
 
     try:
         db.commit()
+        entity_cache.invalidate(Member, member_id)
         db.refresh(member)
         return member
     except Exception:
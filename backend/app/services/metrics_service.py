@@ -0,0 +1,38 @@
+from datetime import date
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..cache import LRUCache
+from ..config import settings
+from ..models import Book, Member
+from . import overdue_service
+
+GAUGES_CACHE_KEY = "domain_gauges"
+
+gauge_cache = LRUCache(max_entries=1, ttl_seconds=settings.metrics_gauge_ttl_seconds)
+
+
+def domain_gauges(db: Session) -> dict[str, int]:
+    gauges = gauge_cache.get(GAUGES_CACHE_KEY)
+    if gauges is not None:
+        return gauges
+    # Loan gauges come from the per-member counters, so a scrape only reads loans that fell due since
+    # the overdue watermark, through the open due-date index.
+    as_of = overdue_service.overdue_counts_as_of(db)
+    active_loans, overdue_loans, available_copies, total_copies = db.execute(
+        select(
+            select(func.coalesce(func.sum(Member.active_loan_count), 0)).scalar_subquery(),
+            overdue_service.total_overdue_count(as_of, date.today()),
+            select(func.coalesce(func.sum(Book.available_copies), 0)).scalar_subquery(),
+            select(func.coalesce(func.sum(Book.total_copies), 0)).scalar_subquery(),
+        )
+    ).one()
+    gauges = {
+        "active_loans": active_loans,
+        "overdue_loans": overdue_loans,
+        "available_copies": available_copies,
+        "total_copies": total_copies,
+    }
+    gauge_cache.set(GAUGES_CACHE_KEY, gauges)
+    return gauges
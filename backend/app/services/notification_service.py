@@ -0,0 +1,103 @@
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import exists, insert, literal, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import JobWatermark, Loan, LoanNotification
+
+DUE_SOON = "due_soon"
+OVERDUE = "overdue"
+NOTIFICATION_KINDS = (DUE_SOON, OVERDUE)
+
+
+def watermark_name(kind: str) -> str:
+    return f"loan_notifications.{kind}"
+
+
+def _scan_window(kind: str, previous: Optional[date], today: date) -> tuple[Optional[date], date]:
+    if kind == OVERDUE:
+        return previous, today
+    return today, today + timedelta(days=settings.reminder_days_before_due + 1)
+
+
+def _encode_position(due_date: date, loan_id: int) -> str:
+    return f"{due_date.isoformat()}/{loan_id}"
+
+
+def _decode_position(position: str) -> tuple[date, int]:
+    due_date, loan_id = position.split("/")
+    return date.fromisoformat(due_date), int(loan_id)
+
+
+def _insert_notifications(db: Session, kind: str, loan_ids: list[int]) -> int:
+    already_sent = exists().where(LoanNotification.loan_id == Loan.id, LoanNotification.kind == kind)
+    pending = select(Loan.id, Loan.member_id, literal(kind), Loan.due_date, literal(datetime.utcnow())).where(
+        Loan.id.in_(loan_ids), ~already_sent
+    )
+    created = db.execute(
+        insert(LoanNotification).from_select(
+            ["loan_id", "member_id", "kind", "due_date", "created_at"],
+            pending,
+        )
+    )
+    return created.rowcount
+
+
+def scan_notifications(
+    db: Session,
+    kind: str,
+    today: Optional[date] = None,
+    batch_size: int = 1000,
+    max_batches: Optional[int] = None,
+) -> int:
+    today = today or date.today()
+    name = watermark_name(kind)
+    created = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batches += 1
+        try:
+            watermark = db.execute(
+                select(JobWatermark).where(JobWatermark.name == name).with_for_update()
+            ).scalar_one_or_none()
+            if watermark is None:
+                watermark = JobWatermark(name=name)
+                db.add(watermark)
+            elif watermark.as_of is not None and watermark.as_of >= today:
+                db.rollback()
+                break
+
+            start, end = _scan_window(kind, watermark.as_of, today)
+            query = select(Loan.id, Loan.due_date).where(Loan.returned_at.is_(None), Loan.due_date < end)
+            if start is not None:
+                query = query.where(Loan.due_date >= start)
+            if watermark.position is not None:
+                query = query.where(tuple_(Loan.due_date, Loan.id) > tuple_(*_decode_position(watermark.position)))
+            rows = db.execute(query.order_by(Loan.due_date, Loan.id).limit(batch_size)).all()
+
+            chunk_created = _insert_notifications(db, kind, [row.id for row in rows]) if rows else 0
+            finished = len(rows) < batch_size
+            if finished:
+                watermark.as_of = today
+                watermark.position = None
+            else:
+                watermark.position = _encode_position(rows[-1].due_date, rows[-1].id)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            continue
+        except Exception:
+            db.rollback()
+            raise
+
+        created += chunk_created
+        if finished:
+            break
+    return created
+
+
+def scan_loan_notifications(db: Session, today: Optional[date] = None, batch_size: int = 1000) -> dict[str, int]:
+    return {kind: scan_notifications(db, kind, today=today, batch_size=batch_size) for kind in NOTIFICATION_KINDS}
@@ -0,0 +1,153 @@
+from collections import Counter
+from collections.abc import Iterable
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..cache import entity_cache
+from ..models import JobWatermark, Loan, Member
+from ..schemas import MemberOverdueCountResponse
+from .member_service import get_member_or_404
+
+OVERDUE_COUNTS_WATERMARK = "member_overdue_loan_counts"
+
+
+def _overdue_filter(start: Optional[date], end: date) -> list:
+    criteria = [Loan.returned_at.is_(None), Loan.due_date < end]
+    if start is not None:
+        criteria.append(Loan.due_date >= start)
+    return criteria
+
+
+def _overdue_count(start: Optional[date], end: date):
+    return (
+        select(func.count(Loan.id))
+        .where(Loan.member_id == Member.id, *_overdue_filter(start, end))
+        .correlate(Member)
+        .scalar_subquery()
+    )
+
+
+def rebuild_overdue_counts(
+    db: Session, as_of: date, first_id: Optional[int] = None, last_id: Optional[int] = None
+) -> int:
+    overdue = _overdue_count(None, as_of)
+    statement = update(Member).where(Member.overdue_loan_count != overdue)
+    if first_id is not None:
+        statement = statement.where(Member.id >= first_id)
+    if last_id is not None:
+        statement = statement.where(Member.id <= last_id)
+    repaired = db.execute(
+        statement.values(overdue_loan_count=overdue),
+        execution_options={"synchronize_session": False},
+    )
+    return repaired.rowcount
+
+
+def _add_overdue_between(db: Session, start: date, end: date) -> None:
+    members = select(Loan.member_id).where(*_overdue_filter(start, end))
+    db.execute(
+        update(Member)
+        .where(Member.id.in_(members))
+        .values(overdue_loan_count=Member.overdue_loan_count + _overdue_count(start, end)),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def overdue_counts_as_of(db: Session, lock: bool = False) -> Optional[date]:
+    query = select(JobWatermark.as_of).where(JobWatermark.name == OVERDUE_COUNTS_WATERMARK)
+    if lock:
+        query = query.with_for_update(read=True)
+    return db.execute(query).scalar_one_or_none()
+
+
+def refresh_overdue_counts(db: Session, today: Optional[date] = None, rebuild: bool = False) -> date:
+    today = today or date.today()
+    if not rebuild:
+        as_of = overdue_counts_as_of(db)
+        if as_of is not None and as_of >= today:
+            return as_of
+
+    try:
+        watermark = db.execute(
+            select(JobWatermark).where(JobWatermark.name == OVERDUE_COUNTS_WATERMARK).with_for_update()
+        ).scalar_one_or_none()
+        previous = watermark.as_of if watermark is not None else None
+        if previous is not None and previous >= today and not rebuild:
+            db.rollback()
+            return previous
+
+        if previous is None or rebuild:
+            rebuild_overdue_counts(db, today)
+        else:
+            _add_overdue_between(db, previous, today)
+
+        if watermark is None:
+            db.add(JobWatermark(name=OVERDUE_COUNTS_WATERMARK, as_of=today))
+        else:
+            advanced = db.execute(
+                update(JobWatermark)
+                .where(JobWatermark.name == OVERDUE_COUNTS_WATERMARK, JobWatermark.as_of.is_not_distinct_from(previous))
+                .values(as_of=today),
+                execution_options={"synchronize_session": False},
+            )
+            if advanced.rowcount == 0:
+                db.rollback()
+                return today
+        db.commit()
+        entity_cache.clear()
+        return today
+    except IntegrityError:
+        db.rollback()
+        return today
+    except Exception:
+        db.rollback()
+        raise
+
+
+def overdue_deltas(db: Session, changes: Iterable[tuple[int, date, int]]) -> Counter:
+    today = date.today()
+    candidates = [(member_id, due_date, delta) for member_id, due_date, delta in changes if due_date < today]
+    deltas: Counter = Counter()
+    if not candidates:
+        return deltas
+
+    as_of = overdue_counts_as_of(db, lock=True)
+    if as_of is None:
+        return deltas
+
+    for member_id, due_date, delta in candidates:
+        if due_date < as_of:
+            deltas[member_id] += delta
+    return deltas
+
+
+def member_overdue_count(db: Session, member_id: int, today: Optional[date] = None) -> int:
+    # Read-only, so it is safe on replicas: loans that fell due since the watermark are counted from loans.
+    today = today or date.today()
+    as_of = overdue_counts_as_of(db)
+    if as_of is None:
+        overdue = _overdue_count(None, today)
+    elif as_of >= today:
+        overdue = Member.overdue_loan_count
+    else:
+        overdue = Member.overdue_loan_count + _overdue_count(as_of, today)
+    count = db.scalar(select(overdue).where(Member.id == member_id))
+    return count or 0
+
+
+def total_overdue_count(as_of: Optional[date], today: date):
+    # Library-wide version of member_overdue_count, for callers that already read the watermark.
+    recent = select(func.count(Loan.id)).where(*_overdue_filter(as_of, today)).scalar_subquery()
+    if as_of is None:
+        return recent
+    counted = select(func.coalesce(func.sum(Member.overdue_loan_count), 0)).scalar_subquery()
+    return counted if as_of >= today else counted + recent
+
+
+def get_member_overdue_count(db: Session, member_id: int) -> MemberOverdueCountResponse:
+    get_member_or_404(db, member_id)
+    return MemberOverdueCountResponse(member_id=member_id, overdue_count=member_overdue_count(db, member_id))
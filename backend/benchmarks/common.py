@@ -0,0 +1,202 @@
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+import httpx
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.controllers import books, loans, members
+from app.database import async_database_url, get_db, get_read_db
+from app.models import Base, Book, Loan, Member
+
+
+TITLE_WORDS = (
+    "silent", "river", "garden", "shadow", "empire", "winter", "code", "clean", "history", "ocean",
+    "night", "machine", "secret", "city", "forest", "light", "stone", "glass", "theory", "journey",
+    "north", "memory", "kingdom", "signal", "fire", "architecture", "design", "patterns", "island", "letters",
+)
+AUTHOR_NAMES = (
+    "Martin", "Evans", "Fowler", "Beck", "Knuth", "Austen", "Morrison", "Tolkien", "Le Guin", "Okafor",
+    "Hughes", "Ishiguro", "Murakami", "Adichie", "Borges", "Calvino", "Atwood", "Orwell", "Woolf", "Achebe",
+)
+
+
+def synthetic_title(idx: int) -> str:
+    words = len(TITLE_WORDS)
+    return f"{TITLE_WORDS[idx % words].title()} {TITLE_WORDS[(idx // words) % words]} {TITLE_WORDS[(idx * 7) % words]} {idx}"
+
+
+def synthetic_author(idx: int) -> str:
+    names = len(AUTHOR_NAMES)
+    return f"{AUTHOR_NAMES[idx % names]} {AUTHOR_NAMES[(idx // names) % names]}"
+
+
+def engine_options(database_url: str) -> dict:
+    if database_url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+    return {"pool_size": 20, "max_overflow": 40}
+
+
+def create_sync_engine(database_url: str) -> Engine:
+    return create_engine(database_url, **engine_options(database_url))
+
+
+def seed(engine: Engine, books_count: int, members_count: int, loans_count: int, chunk_size: int = 10_000) -> None:
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for start in range(0, books_count, chunk_size):
+            conn.execute(
+                insert(Book),
+                [
+                    {
+                        "title": synthetic_title(idx),
+                        "author": synthetic_author(idx),
+                        "isbn": f"979{idx:010d}",
+                        "publication_year": 1950 + idx % 70,
+                        "total_copies": 5,
+                        "available_copies": 5,
+                        "active": True,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for idx in range(start, min(start + chunk_size, books_count))
+                ],
+            )
+        for start in range(0, members_count, chunk_size):
+            conn.execute(
+                insert(Member),
+                [
+                    {
+                        "name": f"Member {idx}",
+                        "email": f"member{idx}@example.com",
+                        "active": True,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for idx in range(start, min(start + chunk_size, members_count))
+                ],
+            )
+        for start in range(0, loans_count, chunk_size):
+            conn.execute(
+                insert(Loan),
+                [
+                    {
+                        "member_id": idx % members_count + 1,
+                        "book_id": idx % books_count + 1,
+                        "borrowed_at": now - timedelta(minutes=loans_count - idx),
+                        "due_date": date.today() + timedelta(days=idx % 28 - 14),
+                        "returned_at": now,
+                    }
+                    for idx in range(start, min(start + chunk_size, loans_count))
+                ],
+            )
+
+
+def build_app(
+    database_url: str,
+    async_mode: bool,
+    default_response_class: type[Response] = JSONResponse,
+) -> tuple[FastAPI, Callable[[], Awaitable[None]]]:
+    app = FastAPI(default_response_class=default_response_class)
+    app.include_router(books.router)
+    app.include_router(members.router)
+    app.include_router(loans.router)
+
+    if async_mode:
+        url = async_database_url(database_url)
+        engine = create_async_engine(url, **({} if url.startswith("sqlite") else engine_options(url)))
+        AsyncBenchSessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+        async def override_get_db():
+            async with AsyncBenchSessionLocal() as session:
+                yield session
+
+        dispose = engine.dispose
+    else:
+        sync_engine = create_sync_engine(database_url)
+        BenchSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+
+        def override_get_db():
+            session = BenchSessionLocal()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        async def dispose() -> None:
+            sync_engine.dispose()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    return app, dispose
+
+
+@dataclass
+class LatencyReport:
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def requests_per_second(self) -> float:
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, pct: float) -> float:
+        if not self.latencies:
+            return 0.0
+        if len(self.latencies) == 1:
+            return self.latencies[0]
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[int(pct) - 1]
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "rps": round(self.requests_per_second, 1),
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+        }
+
+    def row(self) -> str:
+        stats = self.as_dict()
+        return (
+            f"{self.name:<32} {stats['requests']:>8} {stats['errors']:>6} "
+            f"{stats['rps']:>10} {stats['p50_ms']:>10} {stats['p99_ms']:>10}"
+        )
+
+
+REPORT_HEADER = f"{'scenario':<32} {'requests':>8} {'errors':>6} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}"
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    name: str,
+    make_request: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]],
+    total_requests: int,
+    concurrency: int,
+) -> LatencyReport:
+    report = LatencyReport(name=name)
+    counter = iter(range(total_requests))
+
+    async def worker() -> None:
+        for sequence in counter:
+            started = time.perf_counter()
+            response = await make_request(client, sequence)
+            report.latencies.append(time.perf_counter() - started)
+            if response.status_code >= 500:
+                report.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    report.elapsed = time.perf_counter() - started
+    return report
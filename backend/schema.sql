@@ -19,6 +19,8 @@ CREATE TABLE IF NOT EXISTS members (
     phone VARCHAR(32),
     address VARCHAR(255),
     active BOOLEAN NOT NULL DEFAULT TRUE,
+    active_loan_count INT NOT NULL DEFAULT 0 CHECK (active_loan_count >= 0),
+    overdue_loan_count INT NOT NULL DEFAULT 0 CHECK (overdue_loan_count >= 0),
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
@@ -32,10 +34,99 @@ CREATE TABLE IF NOT EXISTS loans (
     returned_at TIMESTAMPTZ
 );
 
+ALTER TABLE members ADD COLUMN IF NOT EXISTS active_loan_count INT NOT NULL DEFAULT 0 CHECK (active_loan_count >= 0);
+ALTER TABLE members ADD COLUMN IF NOT EXISTS overdue_loan_count INT NOT NULL DEFAULT 0 CHECK (overdue_loan_count >= 0);
+UPDATE members
+SET active_loan_count = (
+    SELECT count(*) FROM loans WHERE loans.member_id = members.id AND loans.returned_at IS NULL
+)
+WHERE active_loan_count <> (
+    SELECT count(*) FROM loans WHERE loans.member_id = members.id AND loans.returned_at IS NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_books_search
+    ON books USING gin (to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(author, '')));
+CREATE INDEX IF NOT EXISTS ix_books_isbn_prefix ON books (isbn varchar_pattern_ops);
+CREATE INDEX IF NOT EXISTS ix_books_updated_at ON books(updated_at);
+CREATE INDEX IF NOT EXISTS ix_members_updated_at ON members(updated_at);
 CREATE INDEX IF NOT EXISTS idx_loans_member ON loans(member_id);
 CREATE INDEX IF NOT EXISTS idx_loans_book ON loans(book_id);
 CREATE INDEX IF NOT EXISTS idx_loans_active ON loans(returned_at);
+CREATE INDEX IF NOT EXISTS ix_loans_borrowed_at_id ON loans(borrowed_at, id);
 CREATE UNIQUE INDEX IF NOT EXISTS uq_loans_active_member_book
     ON loans(member_id, book_id)
     WHERE returned_at IS NULL;
 CREATE UNIQUE INDEX IF NOT EXISTS uq_members_email ON members(email);
+CREATE INDEX IF NOT EXISTS ix_loans_open_due_date_id
+    ON loans(due_date, id)
+    WHERE returned_at IS NULL;
+
+CREATE TABLE IF NOT EXISTS loan_history (
+    id INT NOT NULL,
+    borrowed_at TIMESTAMPTZ NOT NULL,
+    member_id INT NOT NULL REFERENCES members(id) ON DELETE RESTRICT,
+    book_id INT NOT NULL REFERENCES books(id) ON DELETE RESTRICT,
+    due_date DATE NOT NULL,
+    returned_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (id, borrowed_at)
+) PARTITION BY RANGE (borrowed_at);
+
+CREATE TABLE IF NOT EXISTS loan_history_default PARTITION OF loan_history DEFAULT;
+CREATE INDEX IF NOT EXISTS ix_loan_history_borrowed_at_id ON loan_history(borrowed_at, id);
+CREATE INDEX IF NOT EXISTS ix_loan_history_member_borrowed_at ON loan_history(member_id, borrowed_at);
+
+CREATE TABLE IF NOT EXISTS job_watermarks (
+    name VARCHAR(64) PRIMARY KEY,
+    as_of DATE,
+    position VARCHAR(64),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS holds (
+    id SERIAL PRIMARY KEY,
+    book_id INT NOT NULL REFERENCES books(id) ON DELETE RESTRICT,
+    member_id INT NOT NULL REFERENCES members(id) ON DELETE RESTRICT,
+    status VARCHAR(16) NOT NULL DEFAULT 'waiting',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ready_at TIMESTAMPTZ,
+    fulfilled_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS ix_holds_member_id ON holds(member_id);
+CREATE INDEX IF NOT EXISTS ix_holds_waiting_queue
+    ON holds(book_id, created_at, id)
+    WHERE status = 'waiting';
+CREATE INDEX IF NOT EXISTS ix_holds_ready_at
+    ON holds(ready_at)
+    WHERE status = 'ready';
+CREATE UNIQUE INDEX IF NOT EXISTS uq_holds_open_member_book
+    ON holds(member_id, book_id)
+    WHERE status IN ('waiting', 'ready');
+
+CREATE TABLE IF NOT EXISTS loan_notifications (
+    id SERIAL PRIMARY KEY,
+    loan_id INT NOT NULL REFERENCES loans(id) ON DELETE RESTRICT,
+    member_id INT NOT NULL REFERENCES members(id) ON DELETE RESTRICT,
+    kind VARCHAR(16) NOT NULL,
+    due_date DATE NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    dispatched_at TIMESTAMPTZ
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_loan_notifications_loan_kind ON loan_notifications(loan_id, kind);
+CREATE INDEX IF NOT EXISTS ix_loan_notifications_member_id ON loan_notifications(member_id);
+CREATE INDEX IF NOT EXISTS ix_loan_notifications_pending
+    ON loan_notifications(id)
+    WHERE dispatched_at IS NULL;
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key VARCHAR(255) PRIMARY KEY,
+    fingerprint VARCHAR(64) NOT NULL,
+    status_code INT,
+    response_body BYTEA,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    claimed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_expires_at ON idempotency_keys(expires_at);
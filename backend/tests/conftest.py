@@ -1,16 +1,49 @@
-from collections.abc import Generator
+import re
+from collections.abc import Callable, Generator
 
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 
-from app.controllers import books, loans, members
-from app.database import get_db
+from app.cache import entity_cache
+from app.controllers import books, export, holds, loans, members, metrics
+from app.database import async_database_url, get_db, get_read_db
+from app.idempotency import idempotency_cache
+from app.instrumentation import QueryInstrumentationMiddleware, RequestMetricsMiddleware
 from app.models import Base
 
 
+@pytest.fixture(autouse=True)
+def clear_entity_cache() -> Generator[None, None, None]:
+    entity_cache.clear()
+    yield
+    entity_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_idempotency_cache() -> Generator[None, None, None]:
+    idempotency_cache.clear()
+    yield
+    idempotency_cache.clear()
+
+
+@pytest.fixture
+def query_budget() -> Callable:
+    def assert_within_budget(response, max_queries: int) -> int:
+        match = re.search(r'desc="queries=(\d+)"', response.headers.get("server-timing", ""))
+        assert match, "response has no Server-Timing query count"
+        count = int(match.group(1))
+        request = response.request
+        assert count <= max_queries, f"{request.method} {request.url.path} ran {count} queries (budget {max_queries})"
+        return count
+
+    return assert_within_budget
+
+
 @pytest.fixture
 def db_session(tmp_path) -> Generator[Session, None, None]:
     db_file = tmp_path / "unit_tests.db"
@@ -27,17 +60,36 @@ def db_session(tmp_path) -> Generator[Session, None, None]:
         Base.metadata.drop_all(bind=engine)
 
 
-@pytest.fixture
-def client(db_session: Session) -> Generator[TestClient, None, None]:
+@pytest.fixture(params=["sync", "async"])
+def client(request, db_session: Session) -> Generator[TestClient, None, None]:
     app = FastAPI()
+    app.add_middleware(QueryInstrumentationMiddleware)
+    app.add_middleware(RequestMetricsMiddleware)
     app.include_router(books.router)
     app.include_router(members.router)
     app.include_router(loans.router)
+    app.include_router(holds.router)
+    app.include_router(metrics.router)
+    app.include_router(export.router)
+
+    if request.param == "async":
+        async_engine = create_async_engine(
+            async_database_url(str(db_session.get_bind().url)),
+            poolclass=NullPool,
+        )
+        AsyncTestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+        async def override_get_db():
+            async with AsyncTestingSessionLocal() as session:
+                yield session
+
+    else:
 
-    def override_get_db():
-        yield db_session
+        def override_get_db():
+            yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
 
     with TestClient(app) as test_client:
         yield test_client
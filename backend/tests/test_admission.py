@@ -0,0 +1,171 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.admission import (
+    OVERLOADED_DETAIL,
+    READ,
+    WRITE,
+    AdmissionControlMiddleware,
+    AdmissionController,
+    ConcurrencyLimiter,
+    TokenBucketLimiter,
+    route_class,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_route_class_separates_writes_reads_and_exempt_paths():
+    assert route_class("POST", "/loans/borrow") == WRITE
+    assert route_class("PUT", "/books/1") == WRITE
+    assert route_class("GET", "/loans") == READ
+    assert route_class("GET", "/health") is None
+    assert route_class("GET", "/metrics/admission") is None
+    assert route_class("OPTIONS", "/loans/borrow") is None
+
+
+def test_limiter_queues_hands_over_and_sheds():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, queue_size=1, queue_timeout=1.0)
+        assert await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        shed = await limiter.acquire()
+        limiter.release()
+        handed_over = await queued
+        return shed, handed_over, limiter.stats()
+
+    shed, handed_over, stats = asyncio.run(scenario())
+
+    assert (shed, handed_over) == (False, True)
+    assert (stats["active"], stats["waiting"], stats["admitted"], stats["queued"]) == (1, 0, 2, 1)
+    assert stats["rejected_queue_full"] == 1
+
+
+def test_limiter_rejects_after_queue_timeout_and_frees_the_queue():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, queue_size=1, queue_timeout=0.01)
+        await limiter.acquire()
+        timed_out = await limiter.acquire()
+        limiter.release()
+        return timed_out, await limiter.acquire(), limiter.stats()
+
+    timed_out, admitted, stats = asyncio.run(scenario())
+
+    assert (timed_out, admitted) == (False, True)
+    assert (stats["active"], stats["waiting"], stats["rejected_timeout"]) == (1, 0, 1)
+    assert stats["max_queue_wait_seconds"] >= 0.01
+
+
+def test_token_bucket_refills_per_client():
+    clock = FakeClock()
+    bucket = TokenBucketLimiter(rate_per_second=2, burst=2, max_clients=2, clock=clock)
+
+    assert [bucket.take("kiosk-a") for _ in range(3)] == [0.0, 0.0, pytest.approx(0.5)]
+    assert bucket.take("kiosk-b") == 0.0
+    clock.now += 0.5
+    assert bucket.take("kiosk-a") == 0.0
+    bucket.take("kiosk-c")
+
+    assert bucket.stats() == {"rate_per_second": 2, "burst": 2, "clients": 2, "limited": 1}
+
+
+def _app(controller: AdmissionController, release: asyncio.Event) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(AdmissionControlMiddleware, controller=controller)
+
+    @app.post("/slow")
+    async def slow_write():
+        await release.wait()
+        return {"status": "done"}
+
+    @app.get("/fast")
+    async def fast_read():
+        return {"status": "ok"}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def _controller(**rate_limit) -> AdmissionController:
+    return AdmissionController(
+        {
+            WRITE: ConcurrencyLimiter(limit=1, queue_size=0, queue_timeout=1.0),
+            READ: ConcurrencyLimiter(limit=4, queue_size=0, queue_timeout=1.0),
+        },
+        TokenBucketLimiter(rate_per_second=rate_limit.get("rate", 0), burst=rate_limit.get("burst", 1)),
+        retry_after_seconds=2,
+        client_header="X-Client-Id",
+    )
+
+
+def test_middleware_sheds_saturated_route_class_with_503():
+    async def scenario():
+        release = asyncio.Event()
+        controller = _controller()
+        transport = httpx.ASGITransport(app=_app(controller, release))
+        async with httpx.AsyncClient(transport=transport, base_url="http://admission") as client:
+            holding = asyncio.create_task(client.post("/slow"))
+            while controller.limiters[WRITE].active == 0:
+                await asyncio.sleep(0.001)
+            shed = await client.post("/slow")
+            read = await client.get("/fast")
+            release.set()
+            return shed, read, await holding, controller.stats()
+
+    shed, read, held, stats = asyncio.run(scenario())
+
+    assert shed.status_code == 503
+    assert shed.json() == {"detail": OVERLOADED_DETAIL}
+    assert shed.headers["Retry-After"] == "2"
+    assert (read.status_code, held.status_code) == (200, 200)
+    assert stats["route_classes"][WRITE]["rejected_queue_full"] == 1
+    assert stats["route_classes"][WRITE]["active"] == 0
+
+
+def test_middleware_rate_limits_each_client_with_429():
+    async def scenario():
+        controller = _controller(rate=1, burst=1)
+        transport = httpx.ASGITransport(app=_app(controller, asyncio.Event()))
+        async with httpx.AsyncClient(transport=transport, base_url="http://admission") as client:
+            return [
+                await client.get("/fast", headers={"X-Client-Id": client_id})
+                for client_id in ("kiosk-a", "kiosk-a", "kiosk-b")
+            ] + [await client.get("/health", headers={"X-Client-Id": "kiosk-a"})]
+
+    first, limited, other_client, health = asyncio.run(scenario())
+
+    assert [response.status_code for response in (first, limited, other_client, health)] == [200, 429, 200, 200]
+    assert limited.headers["Retry-After"] == "1"
+
+
+def test_client_id_uses_the_entry_added_by_the_proxy():
+    controller = _controller()
+
+    def scope(*values):
+        return {"headers": [(b"x-client-id", value.encode()) for value in values], "client": ("10.0.0.9", 1234)}
+
+    assert controller.client_id(scope("spoofed, 203.0.113.7")) == "203.0.113.7"
+    assert controller.client_id(scope("spoofed", "198.51.100.2")) == "198.51.100.2"
+    assert controller.client_id(scope()) == "10.0.0.9"
+
+
+def test_admission_stats_endpoint(client):
+    response = client.get("/metrics/admission")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body["route_classes"]) == {READ, WRITE}
+    assert body["rate_limit"]["rate_per_second"] == 0
@@ -0,0 +1,137 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateTable
+
+from app.models import Book, Loan, LoanHistory, LoanNotification, Member
+from app.pagination import encode_cursor
+from app.services import archive_service, loan_service
+
+NOW = datetime(2026, 3, 31, 12, 0)
+
+
+def _seed(db_session, loans):
+    members = [Member(name=f"Member {idx}", email=f"m{idx}@example.com") for idx in range(2)]
+    book = Book(title="Dune", author="Frank Herbert", isbn="9780441172719", total_copies=10, available_copies=10)
+    db_session.add_all([*members, book])
+    db_session.commit()
+    rows = [
+        Loan(
+            member_id=members[member].id,
+            book_id=book.id,
+            borrowed_at=borrowed_at,
+            due_date=borrowed_at.date() + timedelta(days=14),
+            returned_at=returned_at,
+        )
+        for member, borrowed_at, returned_at in loans
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return [loan.id for loan in rows]
+
+
+def _count(db_session, model):
+    return db_session.scalar(select(func.count()).select_from(model))
+
+
+def test_archive_cutoff_clamps_to_month_end():
+    assert archive_service.archive_cutoff(NOW, 1) == datetime(2026, 2, 28, 12, 0)
+    assert archive_service.archive_cutoff(NOW, 12) == datetime(2025, 3, 31, 12, 0)
+    assert archive_service.archive_cutoff(datetime(2026, 1, 15), 2) == datetime(2025, 11, 15)
+
+
+def test_archive_moves_only_old_returned_loans(db_session):
+    loan_ids = _seed(
+        db_session,
+        [
+            (0, datetime(2024, 1, 5), datetime(2024, 1, 20)),
+            (1, datetime(2024, 12, 1), datetime(2025, 1, 2)),
+            (0, datetime(2025, 6, 1), datetime(2025, 6, 10)),
+            (1, datetime(2024, 2, 1), None),
+        ],
+    )
+    db_session.add(LoanNotification(loan_id=loan_ids[0], member_id=1, kind="overdue", due_date=date(2024, 1, 19)))
+    db_session.commit()
+
+    archived = archive_service.archive_returned_loans(db_session, older_than_months=12, now=NOW)
+
+    assert archived == 2
+    assert db_session.scalars(select(Loan.id).order_by(Loan.id)).all() == loan_ids[2:]
+    history = db_session.execute(select(LoanHistory.id, LoanHistory.returned_at).order_by(LoanHistory.id)).all()
+    assert [tuple(row) for row in history] == [
+        (loan_ids[0], datetime(2024, 1, 20)),
+        (loan_ids[1], datetime(2025, 1, 2)),
+    ]
+    assert _count(db_session, LoanNotification) == 0
+    assert archive_service.archive_returned_loans(db_session, older_than_months=12, now=NOW) == 0
+
+
+def test_archive_runs_in_batches(db_session):
+    _seed(db_session, [(0, datetime(2024, 1, day), datetime(2024, 2, day)) for day in range(1, 6)])
+
+    first = archive_service.archive_returned_loans(
+        db_session, older_than_months=1, batch_size=2, max_batches=1, now=NOW
+    )
+    assert (first, _count(db_session, Loan), _count(db_session, LoanHistory)) == (2, 3, 2)
+
+    rest = archive_service.archive_returned_loans(db_session, older_than_months=1, batch_size=2, now=NOW)
+    assert (rest, _count(db_session, Loan), _count(db_session, LoanHistory)) == (3, 0, 5)
+
+
+def test_archive_gives_up_on_a_conflict_that_persists(db_session):
+    (loan_id,) = _seed(db_session, [(0, datetime(2024, 1, 5), datetime(2024, 1, 20))])
+    db_session.add(
+        LoanHistory(
+            id=loan_id,
+            member_id=1,
+            book_id=1,
+            borrowed_at=datetime(2024, 1, 5),
+            due_date=date(2024, 1, 19),
+            returned_at=datetime(2024, 1, 20),
+        )
+    )
+    db_session.commit()
+
+    with pytest.raises(IntegrityError):
+        archive_service.archive_returned_loans(db_session, older_than_months=12, now=NOW)
+
+    assert _count(db_session, Loan) == 1
+
+
+def test_loan_list_unions_history_only_when_requested(db_session):
+    loan_ids = _seed(
+        db_session,
+        [
+            (0, datetime(2024, 1, 1), datetime(2024, 1, 10)),
+            (1, datetime(2024, 3, 1), datetime(2024, 3, 10)),
+            (0, datetime(2026, 3, 1), None),
+            (0, datetime(2026, 3, 2), datetime(2026, 3, 20)),
+        ],
+    )
+    archive_service.archive_returned_loans(db_session, older_than_months=12, now=NOW)
+
+    def ids(**kwargs):
+        return [loan.id for loan in loan_service.list_loans_with_details(db_session, **kwargs)]
+
+    assert ids() == [loan_ids[3], loan_ids[2]]
+    assert ids(include_history=True) == [loan_ids[3], loan_ids[2], loan_ids[1], loan_ids[0]]
+    assert ids(include_history=True, member_id=1) == [loan_ids[3], loan_ids[2], loan_ids[0]]
+    assert ids(include_history=True, active_only=True) == [loan_ids[2]]
+    assert ids(include_history=True, offset=1, limit=2) == [loan_ids[2], loan_ids[1]]
+
+    after = encode_cursor(datetime(2026, 3, 1), loan_ids[2])
+    page = loan_service.list_loans_with_details(db_session, include_history=True, after=after)
+    assert [(loan.id, loan.member_name, loan.book_title) for loan in page] == [
+        (loan_ids[1], "Member 1", "Dune"),
+        (loan_ids[0], "Member 0", "Dune"),
+    ]
+
+
+def test_loan_history_is_range_partitioned_on_postgres():
+    ddl = str(CreateTable(LoanHistory.__table__).compile(dialect=postgresql.dialect()))
+
+    assert "PARTITION BY RANGE (borrowed_at)" in ddl
+    assert "PRIMARY KEY (id, borrowed_at)" in ddl
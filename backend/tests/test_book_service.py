@@ -1,8 +1,11 @@
+import io
+import json
+
 import pytest
 from fastapi import HTTPException
 
 from app.models import Book
-from app.schemas import BookCreate, BookUpdate
+from app.schemas import BookCreate, BookUpdate, RecordFormat
 from app.services import book_service
 
 
@@ -51,3 +54,77 @@ def test_update_book_rejects_total_copies_lower_than_checked_out(db_session):
         book_service.update_book(db_session, book.id, BookUpdate(total_copies=1))
 
     assert exc.value.status_code == 400
+
+
+def _add_catalog(db_session):
+    db_session.add_all(
+        [
+            Book(title="Clean Code", author="Robert C. Martin", isbn="9780132350884", total_copies=1, available_copies=1),
+            Book(title="Clean Architecture", author="Robert C. Martin", isbn="9780134494166", total_copies=1, available_copies=1),
+            Book(title="Code Complete", author="Steve McConnell", isbn="9780735619678", total_copies=1, available_copies=1),
+            Book(title="Refactoring", author="Martin Fowler", isbn="9780201485677", total_copies=1, available_copies=1),
+        ]
+    )
+    db_session.commit()
+
+
+def test_search_books_matches_title_and_author_prefixes(db_session):
+    _add_catalog(db_session)
+
+    by_title = book_service.search_books(db_session, "clea")
+    by_author = book_service.search_books(db_session, "fowler")
+    combined = book_service.search_books(db_session, "martin code")
+
+    assert {book.title for book in by_title} == {"Clean Code", "Clean Architecture"}
+    assert [book.title for book in by_author] == ["Refactoring"]
+    assert [book.title for book in combined] == ["Clean Code"]
+
+
+def test_search_books_matches_isbn_prefix_ignoring_hyphens(db_session):
+    _add_catalog(db_session)
+
+    results = book_service.search_books(db_session, "978-0-13")
+
+    assert {book.isbn for book in results} == {"9780132350884", "9780134494166"}
+
+
+def test_search_books_reflects_title_updates(db_session):
+    _add_catalog(db_session)
+    refactoring = db_session.query(Book).filter(Book.isbn == "9780201485677").one()
+
+    book_service.update_book(db_session, refactoring.id, BookUpdate(title="Refactoring Clean Code"))
+
+    assert "Refactoring Clean Code" in {book.title for book in book_service.search_books(db_session, "clean")}
+
+
+def test_import_books_commits_in_chunks_with_set_based_dedupe(db_session, monkeypatch):
+    monkeypatch.setattr(book_service, "IMPORT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(book_service, "IMPORT_MAX_REPORTED_ERRORS", 1)
+    lines = [
+        json.dumps({"title": f"Title {idx}", "author": "Author", "isbn": f"97900000000{idx % 4:02d}"})
+        for idx in range(7)
+    ]
+
+    report = book_service.import_books(db_session, io.StringIO("\n".join(lines)), RecordFormat.ndjson)
+
+    assert (report.received, report.imported, report.failed) == (7, 4, 3)
+    assert len(report.errors) == 1
+    assert report.errors_truncated is True
+    assert report.rows_per_second > 0
+    assert db_session.query(Book).count() == 4
+
+
+def test_import_reports_isbns_created_by_a_concurrent_writer(db_session, monkeypatch):
+    lines = [
+        json.dumps({"title": f"Title {idx}", "author": "Author", "isbn": f"97900000000{idx:02d}"}) for idx in range(3)
+    ]
+    # Another writer creates the second ISBN after every lookup of the import.
+    monkeypatch.setattr(book_service, "_existing_isbns", lambda db, isbns: set())
+    db_session.add(Book(title="Racer", author="Author", isbn="9790000000001", total_copies=1, available_copies=1))
+    db_session.commit()
+
+    report = book_service.import_books(db_session, io.StringIO("\n".join(lines)), RecordFormat.ndjson)
+
+    assert (report.received, report.imported, report.failed) == (3, 2, 1)
+    assert [(error.row, error.isbn) for error in report.errors] == [(2, "9790000000001")]
+    assert db_session.query(Book).count() == 3
@@ -72,3 +72,185 @@ def test_list_books_supports_offset_and_limit(client):
     data = response.json()
     assert len(data) == 1
     assert data[0]['title'] == 'Book 1'
+
+
+def test_list_books_cursor_pages_are_stable_across_inserts(client):
+    for idx in range(3):
+        client.post(
+            '/books',
+            json={
+                'title': f'Book {idx}',
+                'author': 'Author',
+                'isbn': f'978013235088{idx}',
+                'total_copies': 1,
+            },
+        )
+
+    first_page = client.get('/books?limit=2')
+    cursor = first_page.headers['X-Next-Cursor']
+    client.post(
+        '/books',
+        json={'title': 'Book 3', 'author': 'Author', 'isbn': '9780132350883', 'total_copies': 1},
+    )
+
+    second_page = client.get(f'/books?limit=2&after={cursor}')
+
+    assert [book['title'] for book in first_page.json()] == ['Book 0', 'Book 1']
+    assert [book['title'] for book in second_page.json()] == ['Book 2', 'Book 3']
+
+
+def test_list_books_rejects_invalid_cursor(client):
+    response = client.get('/books?after=not-a-cursor')
+
+    assert response.status_code == 400
+
+
+def test_list_books_returns_sparse_fieldsets_with_cursor(client):
+    for idx in range(3):
+        client.post(
+            '/books',
+            json={'title': f'Book {idx}', 'author': 'Author', 'isbn': f'978013235088{idx}', 'total_copies': 1},
+        )
+
+    first_page = client.get('/books?limit=2&fields=title,author')
+    second_page = client.get(f"/books?limit=2&fields=title&after={first_page.headers['X-Next-Cursor']}")
+
+    assert first_page.status_code == 200
+    assert first_page.json() == [
+        {'id': 1, 'title': 'Book 0', 'author': 'Author'},
+        {'id': 2, 'title': 'Book 1', 'author': 'Author'},
+    ]
+    assert second_page.json() == [{'id': 3, 'title': 'Book 2'}]
+    assert 'X-Next-Cursor' not in second_page.headers
+
+
+def test_list_books_rejects_unknown_fields(client):
+    response = client.get('/books?fields=title,secret')
+
+    assert response.status_code == 400
+    assert response.json()['detail'] == 'Unknown fields: secret'
+
+
+def test_search_books_pages_through_ranked_results(client):
+    for idx in range(3):
+        client.post(
+            '/books',
+            json={
+                'title': f'Clean Code Volume {idx}',
+                'author': 'Robert C. Martin',
+                'isbn': f'978013235088{idx}',
+                'total_copies': 1,
+            },
+        )
+    client.post(
+        '/books',
+        json={'title': 'Refactoring', 'author': 'Martin Fowler', 'isbn': '9780201485677', 'total_copies': 1},
+    )
+
+    first_page = client.get('/books/search?q=clean&limit=2')
+    second_page = client.get(f"/books/search?q=clean&limit=2&after={first_page.headers['X-Next-Cursor']}")
+
+    assert first_page.status_code == 200
+    titles = [book['title'] for book in first_page.json() + second_page.json()]
+    assert sorted(titles) == ['Clean Code Volume 0', 'Clean Code Volume 1', 'Clean Code Volume 2']
+    assert 'score' in first_page.json()[0]
+
+
+def test_search_books_requires_query(client):
+    response = client.get('/books/search')
+
+    assert response.status_code == 422
+
+
+def test_import_books_csv_reports_per_row_errors(client):
+    client.post(
+        '/books',
+        json={'title': 'Clean Code', 'author': 'Robert C. Martin', 'isbn': '9780132350884', 'total_copies': 1},
+    )
+    body = (
+        'title,author,isbn,publication_year,total_copies\n'
+        'Refactoring,Martin Fowler,9780201485677,1999,3\n'
+        'Clean Code,Robert C. Martin,9780132350884,2008,1\n'
+        'Refactoring Again,Martin Fowler,9780201485677,,1\n'
+        ',Nobody,9780000000001,,1\n'
+        'Domain-Driven Design,Eric Evans,9780321125217,,\n'
+    )
+
+    response = client.post('/books/import', content=body, headers={'Content-Type': 'text/csv'})
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report['received'] == 5
+    assert report['imported'] == 2
+    assert report['failed'] == 3
+    assert report['errors_truncated'] is False
+    assert [(error['row'], error['isbn']) for error in report['errors']] == [
+        (2, '9780132350884'),
+        (3, '9780201485677'),
+        (4, '9780000000001'),
+    ]
+    assert report['errors'][0]['detail'] == 'Book with this ISBN already exists'
+    assert report['errors'][1]['detail'] == 'Duplicate ISBN in import'
+    assert report['errors'][2]['detail'].startswith('title:')
+
+    books = {book['isbn']: book for book in client.get('/books').json()}
+    assert books['9780201485677']['available_copies'] == 3
+    assert books['9780201485677']['publication_year'] == 1999
+    assert books['9780321125217']['total_copies'] == 1
+
+
+def test_import_books_ndjson_skips_blank_lines_and_reports_invalid_json(client):
+    body = (
+        '{"title": "Refactoring", "author": "Martin Fowler", "isbn": "9780201485677"}\n'
+        '\n'
+        '{not json}\n'
+    )
+
+    response = client.post('/books/import?format=ndjson', content=body)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert (report['received'], report['imported'], report['failed']) == (2, 1, 1)
+    assert report['errors'] == [{'row': 3, 'isbn': None, 'detail': 'Invalid JSON'}]
+    assert client.get('/books/search?q=refactoring').json()[0]['isbn'] == '9780201485677'
+
+
+def test_get_book_revalidates_with_etag_and_last_modified(client):
+    book = client.post(
+        '/books',
+        json={'title': 'Clean Code', 'author': 'Robert C. Martin', 'isbn': '9780132350884', 'total_copies': 1},
+    ).json()
+
+    first = client.get(f"/books/{book['id']}")
+    etag, last_modified = first.headers['ETag'], first.headers['Last-Modified']
+    unchanged = client.get(f"/books/{book['id']}", headers={'If-None-Match': etag})
+    unchanged_since = client.get(f"/books/{book['id']}", headers={'If-Modified-Since': last_modified})
+    client.put(f"/books/{book['id']}", json={'title': 'Clean Code (2nd ed.)'})
+    changed = client.get(f"/books/{book['id']}", headers={'If-None-Match': etag})
+
+    assert etag.startswith('W/"book-')
+    assert (unchanged.status_code, unchanged.content) == (304, b'')
+    assert unchanged.headers['ETag'] == etag
+    assert unchanged_since.status_code == 304
+    assert changed.status_code == 200
+    assert changed.json()['title'] == 'Clean Code (2nd ed.)'
+    assert changed.headers['ETag'] != etag
+
+
+def test_list_books_collection_version_changes_with_any_book(client):
+    for idx in range(2):
+        client.post(
+            '/books',
+            json={'title': f'Book {idx}', 'author': 'Author', 'isbn': f'978013235088{idx}', 'total_copies': 1},
+        )
+    member = client.post('/members', json={'name': 'Jane Doe', 'email': 'jane@example.com'}).json()
+
+    page = client.get('/books?limit=1')
+    etag = page.headers['ETag']
+    unchanged = client.get('/books?limit=1', headers={'If-None-Match': f'"other", {etag}'})
+    client.post('/loans/borrow', json={'member_id': member['id'], 'book_id': 2})
+    changed = client.get('/books?limit=1', headers={'If-None-Match': etag})
+
+    assert unchanged.status_code == 304
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
@@ -0,0 +1,110 @@
+from sqlalchemy import event
+
+from app.cache import EntityCache, InMemorySharedBackend, LRUCache, entity_cache
+from app.models import Book, Member
+from app.schemas import BookUpdate, BorrowRequest
+from app.services import book_service, loan_service
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _count_queries(db_session):
+    statements = []
+    event.listen(db_session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_lru_cache_evicts_least_recently_used_entry():
+    cache = LRUCache(max_entries=2, ttl_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats()['evictions'] == 1
+
+
+def test_lru_cache_expires_entries_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(max_entries=10, ttl_seconds=5, clock=clock)
+    cache.set('a', 1)
+
+    clock.now = 4.9
+    assert cache.get('a') == 1
+    clock.now = 5.0
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_entity_cache_falls_back_to_shared_backend(db_session):
+    shared = InMemorySharedBackend()
+    writer = EntityCache(LRUCache(max_entries=10, ttl_seconds=60), shared=shared)
+    reader = EntityCache(LRUCache(max_entries=10, ttl_seconds=60), shared=shared)
+    writer.store(Member(id=7, name='Alex', email='alex@example.com', phone=None, address=None, active=True))
+
+    member = reader.load(db_session, Member, 7)
+
+    assert member.name == 'Alex'
+    assert reader.local.stats()['entries'] == 1
+
+    writer.invalidate(Member, 7)
+    assert shared.get('members:7') is None
+
+
+def test_get_book_or_404_serves_repeat_reads_from_cache(db_session):
+    book = Book(title='Refactoring', author='Martin Fowler', isbn='9780201485677', total_copies=1, available_copies=1)
+    db_session.add(book)
+    db_session.commit()
+    book_id = book.id
+    db_session.expunge_all()
+
+    book_service.get_book_or_404(db_session, book_id)
+    db_session.expunge_all()
+    statements = _count_queries(db_session)
+    cached = book_service.get_book_or_404(db_session, book_id)
+
+    assert cached.title == 'Refactoring'
+    assert statements == []
+    assert entity_cache.stats()['hits'] == 1
+
+
+def test_update_and_borrow_invalidate_cached_book(db_session):
+    member = Member(name='Alex', email='alex@example.com')
+    book = Book(title='Refactoring', author='Martin Fowler', isbn='9780201485677', total_copies=2, available_copies=2)
+    db_session.add_all([member, book])
+    db_session.commit()
+    book_id, member_id = book.id, member.id
+
+    book_service.get_book_or_404(db_session, book_id)
+    book_service.update_book(db_session, book_id, BookUpdate(title='Refactoring 2nd Edition'))
+    db_session.expunge_all()
+    assert book_service.get_book_or_404(db_session, book_id).title == 'Refactoring 2nd Edition'
+
+    loan_service.borrow_book(db_session, BorrowRequest(member_id=member_id, book_id=book_id))
+    db_session.expunge_all()
+    assert book_service.get_book_or_404(db_session, book_id).available_copies == 1
+
+
+def test_cache_metrics_endpoint_reports_counters(client):
+    book = client.post(
+        '/books',
+        json={'title': 'Clean Code', 'author': 'Robert C. Martin', 'isbn': '9780132350884', 'total_copies': 1},
+    ).json()
+    client.get(f"/books/{book['id']}")
+    client.get(f"/books/{book['id']}")
+
+    stats = client.get('/metrics/cache').json()
+
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['entries'] == 1
@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+from datetime import date, timedelta
+
+
+def _seed_loan(client):
+    book = client.post(
+        '/books',
+        json={'title': 'Clean Code', 'author': 'Robert C. Martin', 'isbn': '9780132350884', 'total_copies': 2},
+    ).json()
+    member = client.post(
+        '/members',
+        json={'name': 'Jane Doe', 'email': 'jane@example.com', 'phone': '1234567890'},
+    ).json()
+    due_date = (date.today() + timedelta(days=7)).isoformat()
+    loan = client.post(
+        '/loans/borrow',
+        json={'member_id': member['id'], 'book_id': book['id'], 'due_date': due_date},
+    ).json()
+    return book, member, loan
+
+
+def test_export_loans_streams_ndjson(client):
+    book, member, loan = _seed_loan(client)
+
+    response = client.get('/export/loans')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert 'loans.ndjson' in response.headers['content-disposition']
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 1
+    assert rows[0]['id'] == loan['id']
+    assert rows[0]['member_name'] == 'Jane Doe'
+    assert rows[0]['book_title'] == 'Clean Code'
+    assert rows[0]['due_date'] == loan['due_date']
+    assert rows[0]['returned_at'] is None
+
+
+def test_export_books_streams_csv_with_header(client):
+    _seed_loan(client)
+    client.post(
+        '/books',
+        json={'title': 'Refactoring', 'author': 'Martin Fowler', 'isbn': '9780201485677', 'total_copies': 1},
+    )
+
+    response = client.get('/export/books?format=csv')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row['title'] for row in rows] == ['Clean Code', 'Refactoring']
+    assert rows[0]['available_copies'] == '1'
+    assert rows[1]['publication_year'] == ''
+
+
+def test_export_members_returns_empty_body_for_empty_table(client):
+    response = client.get('/export/members')
+
+    assert response.status_code == 200
+    assert response.text == ''
+
+
+def test_export_rejects_unknown_entity_and_format(client):
+    assert client.get('/export/holds').status_code == 422
+    assert client.get('/export/books?format=xml').status_code == 422
@@ -0,0 +1,80 @@
+import json
+import os
+import tracemalloc
+
+import pytest
+from sqlalchemy import insert
+
+from app.models import Book, Member
+from app.schemas import ExportEntity, RecordFormat
+from app.services import export_service
+
+
+def _seed(db_session, model, count, make_row):
+    engine = db_session.get_bind()
+    with engine.begin() as connection:
+        for start in range(0, count, 50_000):
+            connection.execute(insert(model), [make_row(idx) for idx in range(start, min(start + 50_000, count))])
+    return engine
+
+
+def _book_row(idx):
+    return {
+        "title": f"Title {idx}",
+        "author": f"Author {idx % 1000}",
+        "isbn": f"979{idx:010d}",
+        "total_copies": 1,
+        "available_copies": 1,
+        "active": True,
+    }
+
+
+def _member_row(idx):
+    return {"name": f"Member {idx}", "email": f"member{idx}@example.com", "phone": f"{idx:010d}", "active": True}
+
+
+def _peak_export_memory(engine, entity, export_format):
+    exported_rows = 0
+    exported_bytes = 0
+    tracemalloc.start()
+    try:
+        for chunk in export_service.stream_export(engine, entity, export_format):
+            exported_rows += chunk.count(b"\n")
+            exported_bytes += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return exported_rows, exported_bytes, peak
+
+
+def test_stream_export_yields_rows_in_id_order_in_batches(db_session):
+    engine = _seed(db_session, Book, 2500, _book_row)
+
+    chunks = list(export_service.stream_export(engine, ExportEntity.books, RecordFormat.ndjson, batch_size=1000))
+
+    assert chunks[0] == b""
+    assert [chunk.count(b"\n") for chunk in chunks[1:]] == [1000, 1000, 500]
+    ids = [json.loads(line)["id"] for chunk in chunks for line in chunk.splitlines()]
+    assert ids == sorted(ids)
+    assert len(ids) == 2500
+
+
+def test_stream_export_peak_memory_stays_below_the_export_size(db_session):
+    engine = _seed(db_session, Member, 50_000, _member_row)
+
+    rows, exported_bytes, peak = _peak_export_memory(engine, ExportEntity.members, RecordFormat.csv)
+
+    assert rows == 50_001
+    assert peak < exported_bytes / 2
+    assert peak < 4 * 1024 * 1024
+
+
+@pytest.mark.skipif(not os.environ.get("LIBRARY_SLOW_TESTS"), reason="set LIBRARY_SLOW_TESTS=1 to run")
+def test_stream_export_peak_memory_stays_flat_for_500k_rows(db_session):
+    engine = _seed(db_session, Member, 500_000, _member_row)
+
+    rows, exported_bytes, peak = _peak_export_memory(engine, ExportEntity.members, RecordFormat.csv)
+
+    assert rows == 500_001
+    assert exported_bytes > 20 * 1024 * 1024
+    assert peak < 4 * 1024 * 1024
@@ -1,17 +1,27 @@
-import pytest
+import subprocess
+import sys
+from pathlib import Path
 
-try:
-    from fastapi.testclient import TestClient
-    from app.main import app
-except Exception as exc:  # pragma: no cover - environment dependent
-    pytest.skip(f"Skipping health test due to app startup dependency: {exc}", allow_module_level=True)
+from fastapi.testclient import TestClient
 
+from app.main import app
 
-client = TestClient(app)
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_importing_app_does_not_create_engines():
+    check = (
+        "import app.main\n"
+        "from app import database\n"
+        "assert database._engine is None and database._async_engine is None\n"
+    )
+
+    subprocess.run([sys.executable, "-c", check], cwd=BACKEND_DIR, check=True)
 
 
 def test_health_check():
-    response = client.get('/health')
+    with TestClient(app) as client:
+        response = client.get('/health')
 
     assert response.status_code == 200
     assert response.json() == {'status': 'ok'}
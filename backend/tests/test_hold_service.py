@@ -0,0 +1,327 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.models import Book, Hold, Loan, Member
+from app.schemas import BookUpdate, BorrowRequest, HoldCreate
+from app.services import book_service, hold_service, loan_service
+
+
+def _library(db_session, members_count, copies):
+    members = [Member(name=f"Member {idx}", email=f"m{idx}@example.com") for idx in range(members_count)]
+    book = Book(title="Dune", author="Frank Herbert", isbn="9780441172719", total_copies=copies, available_copies=copies)
+    db_session.add_all([*members, book])
+    db_session.commit()
+    return [member.id for member in members], book.id
+
+
+def _borrow(db_session, member_id, book_id):
+    return loan_service.borrow_book(db_session, BorrowRequest(member_id=member_id, book_id=book_id)).id
+
+
+def _hold_statuses(db_session, book_id):
+    db_session.expire_all()
+    holds = db_session.execute(select(Hold.member_id, Hold.status).where(Hold.book_id == book_id).order_by(Hold.id))
+    return [tuple(row) for row in holds]
+
+
+def _available(db_session, book_id):
+    db_session.expire_all()
+    return db_session.get(Book, book_id).available_copies
+
+
+def test_hold_on_available_copy_is_ready_immediately(db_session):
+    (member_id,), book_id = _library(db_session, 1, copies=1)
+
+    hold = hold_service.create_hold(db_session, book_id, HoldCreate(member_id=member_id))
+
+    assert (hold.status.value, hold.queue_position) == ("ready", None)
+    assert hold.ready_at is not None
+    assert _available(db_session, book_id) == 0
+
+
+def test_return_assigns_copy_to_first_waiting_member(db_session):
+    (reader, first, second), book_id = _library(db_session, 3, copies=1)
+    loan_id = _borrow(db_session, reader, book_id)
+
+    holds = [hold_service.create_hold(db_session, book_id, HoldCreate(member_id=member)) for member in (first, second)]
+    loan_service.return_book(db_session, loan_id)
+
+    assert [hold.queue_position for hold in holds] == [1, 2]
+    assert _hold_statuses(db_session, book_id) == [(first, "ready"), (second, "waiting")]
+    assert _available(db_session, book_id) == 0
+    with pytest.raises(HTTPException) as exc:
+        _borrow(db_session, second, book_id)
+    assert exc.value.detail == "No available copies for this book"
+
+    _borrow(db_session, first, book_id)
+
+    assert _hold_statuses(db_session, book_id) == [(first, "fulfilled"), (second, "waiting")]
+    assert _available(db_session, book_id) == 0
+    assert db_session.get(Member, first).active_loan_count == 1
+
+
+def test_ready_hold_is_claimed_before_a_free_copy(db_session):
+    (reader, other, waiting), book_id = _library(db_session, 3, copies=2)
+    first_loan = _borrow(db_session, reader, book_id)
+    second_loan = _borrow(db_session, other, book_id)
+    hold_service.create_hold(db_session, book_id, HoldCreate(member_id=waiting))
+    loan_service.return_book(db_session, first_loan)
+    loan_service.return_book(db_session, second_loan)
+    assert _available(db_session, book_id) == 1
+
+    _borrow(db_session, waiting, book_id)
+
+    assert _hold_statuses(db_session, book_id) == [(waiting, "fulfilled")]
+    assert _available(db_session, book_id) == 1
+
+
+def test_past_due_borrow_claims_the_ready_hold(db_session):
+    (reader, waiting), book_id = _library(db_session, 2, copies=1)
+    loan_id = _borrow(db_session, reader, book_id)
+    hold_service.create_hold(db_session, book_id, HoldCreate(member_id=waiting))
+    loan_service.return_book(db_session, loan_id)
+
+    loan = loan_service.borrow_book(
+        db_session, BorrowRequest(member_id=waiting, book_id=book_id, due_date=date.today() - timedelta(days=1))
+    )
+
+    assert loan.member_id == waiting
+    assert _hold_statuses(db_session, book_id) == [(waiting, "fulfilled")]
+    assert _available(db_session, book_id) == 0
+    assert db_session.get(Member, waiting).active_loan_count == 1
+
+
+def test_added_copies_go_to_waiting_holds_first(db_session):
+    (reader, first, second, late), book_id = _library(db_session, 4, copies=1)
+    _borrow(db_session, reader, book_id)
+    for member_id in (first, second):
+        hold_service.create_hold(db_session, book_id, HoldCreate(member_id=member_id))
+
+    book_service.update_book(db_session, book_id, BookUpdate(total_copies=4))
+    late_hold = hold_service.create_hold(db_session, book_id, HoldCreate(member_id=late))
+
+    assert _hold_statuses(db_session, book_id) == [(first, "ready"), (second, "ready"), (late, "ready")]
+    assert late_hold.queue_position is None
+    assert _available(db_session, book_id) == 0
+
+
+def test_free_copy_does_not_jump_the_hold_queue(db_session):
+    (reader, waiting, late, walk_in), book_id = _library(db_session, 4, copies=1)
+    _borrow(db_session, reader, book_id)
+    hold_service.create_hold(db_session, book_id, HoldCreate(member_id=waiting))
+    db_session.get(Book, book_id).available_copies = 1
+    db_session.commit()
+
+    late_hold = hold_service.create_hold(db_session, book_id, HoldCreate(member_id=late))
+    with pytest.raises(HTTPException) as exc:
+        _borrow(db_session, walk_in, book_id)
+
+    assert (late_hold.status.value, late_hold.queue_position) == ("waiting", 2)
+    assert exc.value.detail == "No available copies for this book"
+    assert _available(db_session, book_id) == 1
+
+
+def test_deactivated_member_cannot_claim_a_ready_hold(db_session):
+    (member_id,), book_id = _library(db_session, 1, copies=1)
+    hold_service.create_hold(db_session, book_id, HoldCreate(member_id=member_id))
+    db_session.get(Member, member_id).active = False
+    db_session.commit()
+
+    with pytest.raises(HTTPException) as exc:
+        _borrow(db_session, member_id, book_id)
+
+    assert (exc.value.status_code, exc.value.detail) == (404, "Active member not found")
+    assert _hold_statuses(db_session, book_id) == [(member_id, "ready")]
+    assert db_session.scalar(select(Loan.id)) is None
+
+
+def test_return_skips_waiting_holds_of_deactivated_members(db_session):
+    (reader, inactive, waiting), book_id = _library(db_session, 3, copies=1)
+    loan_id = _borrow(db_session, reader, book_id)
+    for member_id in (inactive, waiting):
+        hold_service.create_hold(db_session, book_id, HoldCreate(member_id=member_id))
+    db_session.get(Member, inactive).active = False
+    db_session.commit()
+
+    loan_service.return_book(db_session, loan_id)
+
+    assert _hold_statuses(db_session, book_id) == [(inactive, "waiting"), (waiting, "ready")]
+    assert _available(db_session, book_id) == 0
+
+
+def test_return_restocks_when_only_deactivated_members_wait(db_session):
+    (reader, inactive, walk_in), book_id = _library(db_session, 3, copies=1)
+    loan_id = _borrow(db_session, reader, book_id)
+    hold_service.create_hold(db_session, book_id, HoldCreate(member_id=inactive))
+    db_session.get(Member, inactive).active = False
+    db_session.commit()
+
+    loan_service.return_book(db_session, loan_id)
+    _borrow(db_session, walk_in, book_id)
+
+    assert _hold_statuses(db_session, book_id) == [(inactive, "waiting")]
+    assert _available(db_session, book_id) == 0
+
+
+def test_cancelling_a_ready_hold_passes_the_copy_on(db_session):
+    (first, second), book_id = _library(db_session, 2, copies=1)
+    ready = hold_service.create_hold(db_session, book_id, HoldCreate(member_id=first))
+    waiting = hold_service.create_hold(db_session, book_id, HoldCreate(member_id=second))
+
+    cancelled = hold_service.cancel_hold(db_session, ready.id)
+    hold_service.cancel_hold(db_session, waiting.id)
+    with pytest.raises(HTTPException) as exc:
+        hold_service.cancel_hold(db_session, ready.id)
+
+    assert cancelled.status.value == "cancelled"
+    assert (exc.value.status_code, exc.value.detail) == (409, hold_service.HOLD_CLOSED_DETAIL)
+    assert _hold_statuses(db_session, book_id) == [(first, "cancelled"), (second, "cancelled")]
+    assert _available(db_session, book_id) == 1
+
+
+def test_uncollected_and_orphaned_ready_holds_expire(db_session):
+    (first, second, third, inactive), book_id = _library(db_session, 4, copies=2)
+    for member_id in (first, inactive, second, third):
+        hold_service.create_hold(db_session, book_id, HoldCreate(member_id=member_id))
+    db_session.get(Member, inactive).active = False
+    db_session.commit()
+    now = datetime.utcnow()
+
+    assert hold_service.expire_ready_holds(db_session, now=now, batch_size=1) == 1
+    assert _hold_statuses(db_session, book_id) == [
+        (first, "ready"), (inactive, "expired"), (second, "ready"), (third, "waiting")
+    ]
+
+    later = now + timedelta(days=settings.hold_pickup_days, seconds=1)
+    assert hold_service.expire_ready_holds(db_session, now=later) == 2
+    assert _hold_statuses(db_session, book_id) == [
+        (first, "expired"), (inactive, "expired"), (second, "expired"), (third, "ready")
+    ]
+    assert _available(db_session, book_id) == 1
+
+
+def test_create_hold_rejects_duplicates_and_open_loans(db_session):
+    (reader, waiting), book_id = _library(db_session, 2, copies=1)
+    _borrow(db_session, reader, book_id)
+    hold_service.create_hold(db_session, book_id, HoldCreate(member_id=waiting))
+
+    outcomes = []
+    for member_id, target in ((waiting, book_id), (reader, book_id), (999, book_id), (waiting, 999)):
+        with pytest.raises(HTTPException) as exc:
+            hold_service.create_hold(db_session, target, HoldCreate(member_id=member_id))
+        outcomes.append((exc.value.status_code, exc.value.detail))
+
+    assert outcomes == [
+        (409, hold_service.DUPLICATE_HOLD_DETAIL),
+        (409, "Member already has this book checked out"),
+        (404, "Active member not found"),
+        (404, "Active book not found"),
+    ]
+
+
+def test_batch_return_fills_holds_then_restocks(db_session):
+    member_ids, book_id = _library(db_session, 5, copies=3)
+    loan_ids = [_borrow(db_session, member_id, book_id) for member_id in member_ids[:3]]
+    for member_id in member_ids[3:]:
+        hold_service.create_hold(db_session, book_id, HoldCreate(member_id=member_id))
+
+    results = loan_service.return_books_batch(db_session, loan_ids)
+
+    assert [result.status_code for result in results] == [200, 200, 200]
+    assert _hold_statuses(db_session, book_id) == [(member_ids[3], "ready"), (member_ids[4], "ready")]
+    assert _available(db_session, book_id) == 1
+
+
+def test_batch_borrow_claims_ready_holds_and_respects_the_queue(db_session):
+    (reader, ready, waiting, walk_in), book_id = _library(db_session, 4, copies=1)
+    loan_id = _borrow(db_session, reader, book_id)
+    for member_id in (ready, waiting):
+        hold_service.create_hold(db_session, book_id, HoldCreate(member_id=member_id))
+    loan_service.return_book(db_session, loan_id)
+    db_session.get(Book, book_id).available_copies = 1
+    db_session.commit()
+
+    results = loan_service.borrow_books_batch(
+        db_session, [BorrowRequest(member_id=member_id, book_id=book_id) for member_id in (ready, walk_in)]
+    )
+
+    assert [(result.status_code, result.detail) for result in results] == [
+        (201, None),
+        (409, "No available copies for this book"),
+    ]
+    assert _hold_statuses(db_session, book_id) == [(ready, "fulfilled"), (waiting, "waiting")]
+    assert _available(db_session, book_id) == 1
+
+
+def test_batch_borrow_decrement_is_guarded_by_the_queue(db_session, monkeypatch):
+    (reader, waiting, walk_in), book_id = _library(db_session, 3, copies=1)
+    _borrow(db_session, reader, book_id)
+    hold_service.create_hold(db_session, book_id, HoldCreate(member_id=waiting))
+    db_session.get(Book, book_id).available_copies = 1
+    db_session.commit()
+    # Simulates a hold placed between the batch's reads and its writes.
+    monkeypatch.setattr(hold_service, "books_with_waiting_holds", lambda db, book_ids: [])
+
+    with pytest.raises(HTTPException) as exc:
+        loan_service.borrow_books_batch(db_session, [BorrowRequest(member_id=walk_in, book_id=book_id)])
+
+    assert exc.value.status_code == 409
+    assert _available(db_session, book_id) == 1
+
+
+def _run_concurrently(db_session, calls):
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+    barrier = threading.Barrier(len(calls))
+
+    def run(call):
+        fn, args = call
+        with SessionLocal() as db:
+            barrier.wait()
+            return fn(db, *args)
+
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        return list(pool.map(run, calls))
+
+
+def test_simultaneous_returns_assign_each_hold_once(db_session):
+    member_ids, book_id = _library(db_session, 6, copies=4)
+    loan_ids = [_borrow(db_session, member_id, book_id) for member_id in member_ids[:4]]
+    for member_id in member_ids[4:]:
+        hold_service.create_hold(db_session, book_id, HoldCreate(member_id=member_id))
+
+    _run_concurrently(db_session, [(loan_service.return_book, (loan_id,)) for loan_id in loan_ids])
+
+    assert _hold_statuses(db_session, book_id) == [(member_ids[4], "ready"), (member_ids[5], "ready")]
+    assert _available(db_session, book_id) == 2
+    assert db_session.scalar(select(Loan.id).where(Loan.returned_at.is_(None))) is None
+
+
+def test_holds_and_returns_lock_the_book_row_on_postgres():
+    sql = str(hold_service.book_lock([3, 1]).compile(dialect=postgresql.psycopg2.dialect()))
+
+    assert sql.endswith("ORDER BY books.id FOR UPDATE")
+
+
+@pytest.mark.parametrize("attempt", range(3))
+def test_hold_placed_during_a_return_never_loses_the_copy(db_session, attempt):
+    (reader, waiting), book_id = _library(db_session, 2, copies=1)
+    loan_id = _borrow(db_session, reader, book_id)
+
+    _run_concurrently(
+        db_session,
+        [
+            (loan_service.return_book, (loan_id,)),
+            (hold_service.create_hold, (book_id, HoldCreate(member_id=waiting))),
+        ],
+    )
+
+    assert _hold_statuses(db_session, book_id) == [(waiting, "ready")]
+    assert _available(db_session, book_id) == 0
@@ -0,0 +1,40 @@
+def _setup(client):
+    reader = client.post('/members', json={'name': 'Reader', 'email': 'reader@example.com'}).json()
+    waiting = client.post('/members', json={'name': 'Waiting', 'email': 'waiting@example.com'}).json()
+    book = client.post('/books', json={'title': 'Dune', 'author': 'Frank Herbert', 'isbn': '9780441172719'}).json()
+    return reader, waiting, book
+
+
+def test_hold_is_reserved_on_return_and_borrowable(client):
+    reader, waiting, book = _setup(client)
+    loan = client.post('/loans/borrow', json={'member_id': reader['id'], 'book_id': book['id']}).json()
+
+    hold = client.post(f"/books/{book['id']}/holds", json={'member_id': waiting['id']})
+    client.post(f"/loans/{loan['id']}/return")
+    reserved = client.get(f"/books/{book['id']}").json()
+    borrowed = client.post('/loans/borrow', json={'member_id': waiting['id'], 'book_id': book['id']})
+
+    assert hold.status_code == 201
+    assert (hold.json()['status'], hold.json()['queue_position']) == ('waiting', 1)
+    assert reserved['available_copies'] == 0
+    assert borrowed.status_code == 201
+
+
+def test_create_hold_returns_404_for_missing_book(client):
+    _, waiting, _ = _setup(client)
+
+    response = client.post('/books/999/holds', json={'member_id': waiting['id']})
+
+    assert response.status_code == 404
+
+
+def test_cancel_hold_endpoint(client):
+    _, waiting, book = _setup(client)
+    hold = client.post(f"/books/{book['id']}/holds", json={'member_id': waiting['id']}).json()
+
+    cancelled = client.delete(f"/holds/{hold['id']}")
+    missing = client.delete('/holds/999')
+
+    assert (cancelled.status_code, cancelled.json()['status']) == (200, 'cancelled')
+    assert missing.status_code == 404
+    assert client.get(f"/books/{book['id']}").json()['available_copies'] == 1
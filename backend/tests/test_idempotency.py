@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app import idempotency
+from app.config import settings
+from app.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER, idempotency_cache
+from app.models import IdempotencyKey, Loan
+
+
+def _library(client, copies=1):
+    book = client.post(
+        '/books',
+        json={'title': 'Dune', 'author': 'Frank Herbert', 'isbn': '9780441172719', 'total_copies': copies},
+    ).json()
+    member = client.post('/members', json={'name': 'Alex', 'email': 'alex@example.com', 'phone': '1'}).json()
+    return member['id'], book['id']
+
+
+def _borrow(client, member_id, book_id, key):
+    return client.post(
+        '/loans/borrow', json={'member_id': member_id, 'book_id': book_id}, headers={IDEMPOTENCY_HEADER: key}
+    )
+
+
+def test_retried_borrow_replays_the_original_loan(client, db_session, query_budget):
+    member_id, book_id = _library(client, copies=2)
+
+    first = _borrow(client, member_id, book_id, 'kiosk-1')
+    retry = _borrow(client, member_id, book_id, 'kiosk-1')
+    idempotency_cache.clear()
+    retry_after_restart = _borrow(client, member_id, book_id, 'kiosk-1')
+
+    assert first.status_code == retry.status_code == retry_after_restart.status_code == 201
+    assert retry.json() == retry_after_restart.json() == first.json()
+    assert REPLAYED_HEADER not in first.headers
+    assert retry.headers[REPLAYED_HEADER] == 'true'
+    query_budget(retry, 0)
+    assert db_session.scalar(select(func.count()).select_from(Loan)) == 1
+    assert client.get(f'/books/{book_id}').json()['available_copies'] == 1
+
+
+def test_retried_return_replays_instead_of_conflicting(client):
+    member_id, book_id = _library(client)
+    loan_id = _borrow(client, member_id, book_id, 'borrow-1').json()['id']
+
+    returns = [
+        client.post(f'/loans/{loan_id}/return', headers={IDEMPOTENCY_HEADER: 'return-1'}) for _ in range(2)
+    ]
+    unkeyed = client.post(f'/loans/{loan_id}/return')
+
+    assert [response.status_code for response in returns] == [200, 200]
+    assert returns[0].json() == returns[1].json()
+    assert unkeyed.status_code == 409
+    assert client.get(f'/books/{book_id}').json()['available_copies'] == 1
+
+
+def test_response_is_stored_in_the_same_transaction_as_the_write(client, db_session, monkeypatch):
+    member_id, book_id = _library(client, copies=2)
+
+    def unreachable(*args):
+        raise AssertionError("successful writes store their response before committing")
+
+    monkeypatch.setattr(idempotency, 'complete_key', unreachable)
+    first = _borrow(client, member_id, book_id, 'kiosk-1')
+    loan_id = first.json()['id']
+    returned = client.post(f'/loans/{loan_id}/return', headers={IDEMPOTENCY_HEADER: 'return-1'})
+    idempotency_cache.clear()
+    stored = {row.key: row for row in db_session.scalars(select(IdempotencyKey))}
+
+    assert (first.status_code, returned.status_code) == (201, 200)
+    assert stored['kiosk-1'].response_body == first.content
+    assert stored['return-1'].response_body == returned.content
+    assert _borrow(client, member_id, book_id, 'kiosk-1').json() == first.json()
+
+
+def test_error_responses_are_replayed(client):
+    member_id, book_id = _library(client, copies=1)
+
+    failed = _borrow(client, 999, book_id, 'missing-member')
+    retried = _borrow(client, 999, book_id, 'missing-member')
+
+    assert failed.status_code == retried.status_code == 404
+    assert retried.json() == failed.json() == {'detail': 'Active member not found'}
+    assert retried.headers[REPLAYED_HEADER] == 'true'
+
+
+def test_key_reused_for_another_request_is_rejected(client):
+    member_id, book_id = _library(client, copies=2)
+    loan_id = _borrow(client, member_id, book_id, 'shared').json()['id']
+
+    reused = client.post(f'/loans/{loan_id}/return', headers={IDEMPOTENCY_HEADER: 'shared'})
+
+    assert reused.status_code == 422
+    assert reused.json()['detail'] == idempotency.KEY_REUSED_DETAIL
+
+
+def test_key_still_in_flight_returns_409(client, db_session):
+    member_id, book_id = _library(client)
+    body = f'{{"member_id":{member_id},"book_id":{book_id}}}'.encode()
+    db_session.add(
+        IdempotencyKey(
+            key='in-flight',
+            fingerprint=idempotency.request_fingerprint('POST', '/loans/borrow', body),
+            expires_at=datetime.utcnow() + timedelta(hours=1),
+        )
+    )
+    db_session.commit()
+
+    response = client.post(
+        '/loans/borrow', content=body, headers={IDEMPOTENCY_HEADER: 'in-flight', 'Content-Type': 'application/json'}
+    )
+
+    assert response.status_code == 409
+    assert response.json()['detail'] == idempotency.IN_PROGRESS_DETAIL
+
+
+def test_abandoned_claim_is_taken_over_after_the_lock_timeout(client, db_session):
+    member_id, book_id = _library(client)
+    body = f'{{"member_id":{member_id},"book_id":{book_id}}}'.encode()
+    claimed_at = datetime.utcnow() - timedelta(seconds=settings.idempotency_lock_timeout_seconds + 1)
+    db_session.add(
+        IdempotencyKey(
+            key='crashed-worker',
+            fingerprint=idempotency.request_fingerprint('POST', '/loans/borrow', body),
+            claimed_at=claimed_at,
+            expires_at=datetime.utcnow() + timedelta(hours=1),
+        )
+    )
+    db_session.commit()
+
+    headers = {IDEMPOTENCY_HEADER: 'crashed-worker', 'Content-Type': 'application/json'}
+    retried = client.post('/loans/borrow', content=body, headers=headers)
+    replayed = client.post('/loans/borrow', content=body, headers=headers)
+
+    assert retried.status_code == replayed.status_code == 201
+    assert replayed.headers[REPLAYED_HEADER] == 'true'
+    assert db_session.scalar(select(func.count()).select_from(Loan)) == 1
+
+
+def test_claim_is_taken_over_only_once(db_session):
+    now = datetime(2026, 3, 10, 12, 0)
+    lock_timeout = timedelta(seconds=settings.idempotency_lock_timeout_seconds)
+    assert idempotency.claim_key(db_session, 'slow', 'a' * 64, now=now) is None
+
+    assert idempotency.claim_key(db_session, 'slow', 'a' * 64, now=now + lock_timeout / 2).status_code is None
+    assert idempotency.claim_key(db_session, 'slow', 'b' * 64, now=now + 2 * lock_timeout).fingerprint == 'a' * 64
+    assert idempotency.claim_key(db_session, 'slow', 'a' * 64, now=now + 2 * lock_timeout) is None
+    assert idempotency.claim_key(db_session, 'slow', 'a' * 64, now=now + 2 * lock_timeout).status_code is None
+
+
+def test_expired_keys_are_reclaimed_and_purged(db_session):
+    now = datetime(2026, 3, 10, 12, 0)
+    assert idempotency.claim_key(db_session, 'old', 'a' * 64, now=now) is None
+    idempotency.complete_key(db_session, 'old', 201, b'{}')
+    assert idempotency.claim_key(db_session, 'old', 'a' * 64, now=now).status_code == 201
+
+    later = now + timedelta(seconds=settings.idempotency_ttl_seconds + 1)
+    assert idempotency.claim_key(db_session, 'old', 'b' * 64, now=later) is None
+    for key in ('stale-1', 'stale-2', 'stale-3'):
+        idempotency.claim_key(db_session, key, 'c' * 64, now=now)
+
+    assert idempotency.purge_expired_keys(db_session, now=later, batch_size=2) == 3
+    assert db_session.scalars(select(IdempotencyKey.key)).all() == ['old']
@@ -0,0 +1,65 @@
+import json
+import logging
+
+from app.instrumentation import capture_queries
+from app.models import Book
+
+
+def _seed(client):
+    book = client.post(
+        '/books',
+        json={'title': 'Clean Code', 'author': 'Robert C. Martin', 'isbn': '9780132350884', 'total_copies': 2},
+    ).json()
+    member = client.post(
+        '/members',
+        json={'name': 'Jane Doe', 'email': 'jane@example.com', 'phone': '1234567890'},
+    ).json()
+    return book, member
+
+
+def test_endpoints_stay_within_query_budget(client, query_budget):
+    book, member = _seed(client)
+
+    query_budget(client.get(f"/books/{book['id']}"), 1)
+    assert query_budget(client.get(f"/books/{book['id']}"), 0) == 0
+    books = client.get('/books')
+    query_budget(books, 2)
+    query_budget(client.get('/books', headers={'If-None-Match': books.headers['ETag']}), 1)
+    loan = client.post('/loans/borrow', json={'member_id': member['id'], 'book_id': book['id']})
+    query_budget(loan, 3)
+    query_budget(client.get(f"/members/{member['id']}/borrowed-books"), 2)
+    query_budget(client.get('/loans'), 1)
+    query_budget(client.post(f"/loans/{loan.json()['id']}/return"), 4)
+
+
+def test_server_timing_header_reports_database_time(client):
+    response = client.get('/books')
+
+    timing = response.headers['server-timing']
+    assert timing.startswith('db;dur=')
+    assert 'desc="queries=2"' in timing
+    assert 'db-slowest;dur=' in timing
+
+
+def test_request_queries_are_logged_as_json(client, caplog):
+    with caplog.at_level(logging.INFO, logger='app.queries'):
+        client.get('/books/999')
+
+    entry = json.loads(caplog.records[-1].getMessage())
+    assert entry['event'] == 'request_queries'
+    assert (entry['method'], entry['path'], entry['status']) == ('GET', '/books/999', 404)
+    assert entry['query_count'] == 1
+    assert entry['slowest_statement'].startswith('SELECT books.id')
+
+
+def test_capture_queries_tracks_count_and_slowest_statement(db_session):
+    db_session.add(Book(title='A', author='B', isbn='9780132350884', total_copies=1, available_copies=1))
+    db_session.commit()
+
+    with capture_queries() as stats:
+        db_session.query(Book).count()
+        db_session.query(Book).filter(Book.isbn == '9780132350884').first()
+
+    assert stats.count == 2
+    assert stats.total_seconds >= stats.slowest_seconds > 0
+    assert stats.slowest_statement.startswith('SELECT')
@@ -1,9 +1,17 @@
+import threading
 from datetime import date, datetime, timedelta, timezone
 
 import pytest
 from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
 
-from app.models import Book, Loan
+from app.config import settings
+from app.instrumentation import capture_queries
+from app.models import Base, Book, Loan, Member
+from app.pagination import encode_cursor
 from app.schemas import BorrowRequest, MemberCreate
 from app.services import loan_service, member_service
 
@@ -125,3 +133,412 @@ def test_list_overdue_loans_returns_only_active_past_due(db_session):
     assert results[0].id == overdue_active.id
     assert results[0].member_name == "Alex"
     assert results[0].book_title == "Refactoring"
+
+
+def test_list_loans_with_details_cursor_breaks_borrowed_at_ties_by_id(db_session):
+    member = member_service.create_member(
+        db_session,
+        MemberCreate(name="Alex", email="alex@example.com", phone="123"),
+    )
+    books = [
+        Book(
+            title=f"Book {idx}",
+            author="Author",
+            isbn=f"978020148567{idx}",
+            total_copies=1,
+            available_copies=1,
+        )
+        for idx in range(3)
+    ]
+    db_session.add_all(books)
+    db_session.commit()
+
+    borrowed_at = datetime(2024, 1, 1, 12, 0, 0)
+    db_session.add_all(
+        [
+            Loan(member_id=member.id, book_id=book.id, borrowed_at=borrowed_at, due_date=date.today())
+            for book in books
+        ]
+    )
+    db_session.commit()
+
+    first_page = loan_service.list_loans_with_details(db_session, limit=2)
+    cursor = encode_cursor(first_page[-1].borrowed_at, first_page[-1].id)
+    second_page = loan_service.list_loans_with_details(db_session, limit=2, after=cursor)
+
+    assert [loan.id for loan in first_page] == [3, 2]
+    assert [loan.id for loan in second_page] == [1]
+
+
+def test_list_overdue_loans_pages_longest_overdue_first(db_session):
+    member = member_service.create_member(
+        db_session,
+        MemberCreate(name="Alex", email="alex@example.com", phone="123"),
+    )
+    books = [
+        Book(title=f"Book {idx}", author="Author", isbn=f"978020148567{idx}", total_copies=1, available_copies=1)
+        for idx in range(5)
+    ]
+    db_session.add_all(books)
+    db_session.commit()
+    days_overdue = [1, 3, 3, 2, -1]
+    loans = [
+        Loan(member_id=member.id, book_id=book.id, due_date=date.today() - timedelta(days=days))
+        for book, days in zip(books, days_overdue)
+    ]
+    db_session.add_all(loans)
+    db_session.commit()
+
+    first_page = loan_service.list_overdue_loans_with_details(db_session, limit=2)
+    cursor = encode_cursor(first_page[-1].due_date, first_page[-1].id)
+    second_page = loan_service.list_overdue_loans_with_details(db_session, limit=2, after=cursor)
+    query = (
+        select(Loan.id)
+        .where(Loan.returned_at.is_(None), Loan.due_date < date.today())
+        .order_by(Loan.due_date, Loan.id)
+        .limit(20)
+    )
+    compiled = query.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True})
+    plan = " ".join(row[-1] for row in db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}"))
+
+    assert [loan.id for loan in first_page] == [loans[1].id, loans[2].id]
+    assert [loan.id for loan in second_page] == [loans[3].id, loans[0].id]
+    assert "ix_loans_open_due_date_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_borrow_books_batch_reports_per_item_results(db_session):
+    member = member_service.create_member(
+        db_session,
+        MemberCreate(name="Alex", email="alex@example.com", phone="123"),
+    )
+    book = Book(
+        title="Refactoring",
+        author="Martin Fowler",
+        isbn="9780201485677",
+        total_copies=1,
+        available_copies=1,
+    )
+    other_book = Book(
+        title="DDD",
+        author="Eric Evans",
+        isbn="9780321125217",
+        total_copies=2,
+        available_copies=2,
+    )
+    db_session.add_all([book, other_book])
+    db_session.commit()
+
+    results = loan_service.borrow_books_batch(
+        db_session,
+        [
+            BorrowRequest(member_id=member.id, book_id=book.id),
+            BorrowRequest(member_id=member.id, book_id=book.id),
+            BorrowRequest(member_id=member.id, book_id=other_book.id),
+            BorrowRequest(member_id=999, book_id=other_book.id),
+        ],
+    )
+
+    db_session.refresh(book)
+    db_session.refresh(other_book)
+    assert [result.status_code for result in results] == [201, 409, 201, 404]
+    assert results[0].loan.book_id == book.id
+    assert results[1].loan is None
+    assert book.available_copies == 0
+    assert other_book.available_copies == 1
+
+
+def test_return_books_batch_restores_copies_and_flags_closed_loans(db_session):
+    member = member_service.create_member(
+        db_session,
+        MemberCreate(name="Alex", email="alex@example.com", phone="123"),
+    )
+    book = Book(
+        title="Refactoring",
+        author="Martin Fowler",
+        isbn="9780201485677",
+        total_copies=2,
+        available_copies=2,
+    )
+    db_session.add(book)
+    db_session.commit()
+    loan = loan_service.borrow_book(db_session, BorrowRequest(member_id=member.id, book_id=book.id))
+
+    results = loan_service.return_books_batch(db_session, [loan.id, loan.id, 999])
+
+    db_session.refresh(book)
+    assert [result.status_code for result in results] == [200, 409, 404]
+    assert results[0].returned_at is not None
+    assert book.available_copies == 2
+
+
+def _member_with_books(db_session, count):
+    member = member_service.create_member(
+        db_session,
+        MemberCreate(name="Alex", email="alex@example.com", phone="123"),
+    )
+    books = [
+        Book(title=f"Book {idx}", author="Author", isbn=f"978000000000{idx}", total_copies=1, available_copies=1)
+        for idx in range(count)
+    ]
+    db_session.add_all(books)
+    db_session.commit()
+    return member, books
+
+
+def test_borrow_book_enforces_max_active_loans_from_member_counter(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "max_active_loans", 2)
+    member, books = _member_with_books(db_session, 3)
+    first = loan_service.borrow_book(db_session, BorrowRequest(member_id=member.id, book_id=books[0].id))
+    loan_service.borrow_book(db_session, BorrowRequest(member_id=member.id, book_id=books[1].id))
+
+    with pytest.raises(HTTPException) as exc:
+        loan_service.borrow_book(db_session, BorrowRequest(member_id=member.id, book_id=books[2].id))
+
+    assert exc.value.status_code == 409
+    assert exc.value.detail == loan_service.LOAN_LIMIT_DETAIL
+    db_session.refresh(books[2])
+    assert books[2].available_copies == 1
+
+    loan_service.return_book(db_session, first.id)
+    loan_service.borrow_book(db_session, BorrowRequest(member_id=member.id, book_id=books[2].id))
+    db_session.refresh(member)
+    assert member.active_loan_count == 2
+
+
+def test_member_counters_track_overdue_borrows_and_returns(db_session):
+    member, books = _member_with_books(db_session, 2)
+    loan_service.reconcile_member_counters(db_session)
+    overdue = loan_service.borrow_book(
+        db_session,
+        BorrowRequest(member_id=member.id, book_id=books[0].id, due_date=date.today() - timedelta(days=3)),
+    )
+    loan_service.borrow_book(db_session, BorrowRequest(member_id=member.id, book_id=books[1].id))
+
+    db_session.refresh(member)
+    assert (member.active_loan_count, member.overdue_loan_count) == (2, 1)
+
+    loan_service.return_books_batch(db_session, [overdue.id])
+
+    db_session.refresh(member)
+    assert (member.active_loan_count, member.overdue_loan_count) == (1, 0)
+
+
+def test_borrow_books_batch_enforces_max_active_loans(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "max_active_loans", 2)
+    member, books = _member_with_books(db_session, 3)
+
+    results = loan_service.borrow_books_batch(
+        db_session,
+        [BorrowRequest(member_id=member.id, book_id=book.id) for book in books],
+    )
+
+    assert [result.status_code for result in results] == [201, 201, 409]
+    assert results[2].detail == loan_service.LOAN_LIMIT_DETAIL
+    db_session.refresh(member)
+    assert member.active_loan_count == 2
+
+
+def test_reconcile_member_counters_repairs_drift_in_batches(db_session):
+    member, books = _member_with_books(db_session, 2)
+    other = member_service.create_member(db_session, MemberCreate(name="Sam", email="sam@example.com"))
+    loan_service.reconcile_member_counters(db_session)
+    loan_service.borrow_book(
+        db_session,
+        BorrowRequest(member_id=member.id, book_id=books[0].id, due_date=date.today() - timedelta(days=3)),
+    )
+    loan_service.borrow_book(db_session, BorrowRequest(member_id=member.id, book_id=books[1].id))
+    member.active_loan_count = 7
+    member.overdue_loan_count = 0
+    other.active_loan_count = 3
+    db_session.commit()
+
+    repaired = loan_service.reconcile_member_counters(db_session, batch_size=1)
+
+    db_session.refresh(member)
+    db_session.refresh(other)
+    assert repaired == {"active_loan_count": 2, "overdue_loan_count": 1}
+    assert (member.active_loan_count, member.overdue_loan_count) == (2, 1)
+    assert other.active_loan_count == 0
+    assert loan_service.reconcile_member_counters(db_session) == {"active_loan_count": 0, "overdue_loan_count": 0}
+
+
+@pytest.mark.parametrize("counter", ["active_loan_count", "overdue_loan_count"])
+def test_member_counters_cannot_go_negative(db_session, counter):
+    member = member_service.create_member(db_session, MemberCreate(name="Alex", email="alex@example.com"))
+    setattr(member, counter, -1)
+
+    with pytest.raises(IntegrityError):
+        db_session.commit()
+
+
+def test_borrow_book_sqlite_path_skips_lookups_and_refresh(db_session):
+    member, books = _member_with_books(db_session, 2)
+    member_id, book_ids = member.id, [book.id for book in books]
+
+    with capture_queries() as fast:
+        loan = loan_service.borrow_book(db_session, BorrowRequest(member_id=member_id, book_id=book_ids[0]))
+    with capture_queries() as stepwise:
+        loan_service.borrow_book_stepwise(db_session, BorrowRequest(member_id=member_id, book_id=book_ids[1]))
+
+    assert fast.count == 3
+    assert stepwise.count >= 6
+    stored = db_session.get(Loan, loan.id)
+    assert (stored.member_id, stored.book_id, stored.due_date) == (member.id, books[0].id, loan.due_date)
+    db_session.refresh(member)
+    db_session.refresh(books[0])
+    assert member.active_loan_count == 2
+    assert books[0].available_copies == 0
+
+
+@pytest.mark.parametrize(
+    "scenario",
+    ["missing_member", "inactive_member", "loan_limit", "missing_book", "inactive_book", "no_copies", "already_open"],
+)
+def test_borrow_book_maps_failures_like_stepwise_borrow(db_session, monkeypatch, scenario):
+    monkeypatch.setattr(settings, "max_active_loans", 2)
+    member, books = _member_with_books(db_session, 3)
+    book_id, member_id = books[0].id, member.id
+    if scenario == "missing_member":
+        member_id = 999
+    elif scenario == "inactive_member":
+        member.active = False
+    elif scenario == "loan_limit":
+        member.active_loan_count = 2
+    elif scenario == "missing_book":
+        book_id = 999
+    elif scenario == "inactive_book":
+        books[0].active = False
+    elif scenario == "no_copies":
+        books[0].available_copies = 0
+    db_session.commit()
+    if scenario == "already_open":
+        loan_service.borrow_book(db_session, BorrowRequest(member_id=member_id, book_id=book_id))
+
+    outcomes = []
+    for borrow in (loan_service.borrow_book, loan_service.borrow_book_stepwise):
+        with pytest.raises(HTTPException) as exc:
+            borrow(db_session, BorrowRequest(member_id=member_id, book_id=book_id))
+        outcomes.append((exc.value.status_code, exc.value.detail))
+
+    assert outcomes[0] == outcomes[1]
+    assert db_session.query(Loan).count() == (1 if scenario == "already_open" else 0)
+
+
+def test_borrow_cte_is_a_single_postgres_statement():
+    statement = loan_service.borrow_cte(
+        BorrowRequest(member_id=1, book_id=2), date.today(), datetime.now(timezone.utc)
+    )
+
+    sql = str(statement.compile(dialect=postgresql.psycopg2.dialect()))
+
+    assert sql.startswith("WITH decremented AS")
+    assert "counted AS" in sql
+    assert "INSERT INTO loans" in sql
+    assert sql.count("RETURNING") == 3
+
+
+def _run_concurrently(session_factory, calls):
+    barrier = threading.Barrier(len(calls))
+    outcomes = []
+    lock = threading.Lock()
+
+    def worker(call):
+        session = session_factory()
+        try:
+            barrier.wait()
+            call(session)
+            outcome = 200
+        except HTTPException as exc:
+            outcome = exc.status_code
+        finally:
+            session.close()
+        with lock:
+            outcomes.append(outcome)
+
+    threads = [threading.Thread(target=worker, args=(call,)) for call in calls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+@pytest.fixture
+def threaded_session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'concurrency.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    try:
+        yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    finally:
+        engine.dispose()
+
+
+def test_concurrent_borrows_never_oversell_last_copies(threaded_session_factory):
+    setup = threaded_session_factory()
+    members = [Member(name=f"Member {idx}", email=f"m{idx}@example.com") for idx in range(20)]
+    book = Book(title="Refactoring", author="Martin Fowler", isbn="9780201485677", total_copies=5, available_copies=5)
+    setup.add_all([*members, book])
+    setup.commit()
+    member_ids = [member.id for member in members]
+    book_id = book.id
+
+    outcomes = _run_concurrently(
+        threaded_session_factory,
+        [
+            lambda session, member_id=member_id: loan_service.borrow_book(
+                session, BorrowRequest(member_id=member_id, book_id=book_id)
+            )
+            for member_id in member_ids
+        ],
+    )
+
+    setup.expire_all()
+    assert sorted(outcomes) == [200] * 5 + [409] * 15
+    assert setup.get(Book, book_id).available_copies == 0
+    assert setup.query(Loan).count() == 5
+    setup.close()
+
+
+def test_concurrent_duplicate_borrows_by_same_member_return_409(threaded_session_factory):
+    setup = threaded_session_factory()
+    member = Member(name="Alex", email="alex@example.com")
+    book = Book(title="Refactoring", author="Martin Fowler", isbn="9780201485677", total_copies=10, available_copies=10)
+    setup.add_all([member, book])
+    setup.commit()
+    member_id, book_id = member.id, book.id
+
+    outcomes = _run_concurrently(
+        threaded_session_factory,
+        [lambda session: loan_service.borrow_book(session, BorrowRequest(member_id=member_id, book_id=book_id))] * 8,
+    )
+
+    setup.expire_all()
+    assert sorted(outcomes) == [200] + [409] * 7
+    assert setup.get(Book, book_id).available_copies == 9
+    setup.close()
+
+
+def test_concurrent_returns_restore_every_copy(threaded_session_factory):
+    setup = threaded_session_factory()
+    members = [Member(name=f"Member {idx}", email=f"m{idx}@example.com") for idx in range(5)]
+    book = Book(title="Refactoring", author="Martin Fowler", isbn="9780201485677", total_copies=5, available_copies=5)
+    setup.add_all([*members, book])
+    setup.commit()
+    loan_ids = [
+        loan_service.borrow_book(setup, BorrowRequest(member_id=member.id, book_id=book.id)).id for member in members
+    ]
+    book_id = book.id
+
+    outcomes = _run_concurrently(
+        threaded_session_factory,
+        [lambda session, loan_id=loan_id: loan_service.return_book(session, loan_id) for loan_id in loan_ids * 2],
+    )
+
+    setup.expire_all()
+    assert sorted(outcomes) == [200] * 5 + [409] * 5
+    assert setup.get(Book, book_id).available_copies == 5
+    setup.close()
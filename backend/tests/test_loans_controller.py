@@ -1,4 +1,7 @@
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+
+from app.models import Loan
+from app.services import archive_service
 
 
 def test_borrow_and_return_flow(client):
@@ -121,3 +124,100 @@ def test_overdue_loans_endpoint_supports_offset_and_limit(client):
     assert response.status_code == 200
     data = response.json()
     assert len(data) == 1
+
+
+def test_list_loans_cursor_pages_are_stable_across_concurrent_borrows(client):
+    book = client.post(
+        '/books',
+        json={
+            'title': 'Clean Code',
+            'author': 'Robert C. Martin',
+            'isbn': '9780132350884',
+            'total_copies': 5,
+        },
+    ).json()
+    members = [
+        client.post(
+            '/members',
+            json={'name': f'Member {idx}', 'email': f'm{idx}@example.com', 'phone': '1'},
+        ).json()
+        for idx in range(4)
+    ]
+    for member in members[:3]:
+        client.post('/loans/borrow', json={'member_id': member['id'], 'book_id': book['id']})
+
+    first_page = client.get('/loans?limit=2')
+    client.post('/loans/borrow', json={'member_id': members[3]['id'], 'book_id': book['id']})
+    second_page = client.get(f"/loans?limit=2&after={first_page.headers['X-Next-Cursor']}")
+
+    first_ids = [loan['id'] for loan in first_page.json()]
+    second_ids = [loan['id'] for loan in second_page.json()]
+    assert len(first_ids) == 2
+    assert len(second_ids) == 1
+    assert set(first_ids).isdisjoint(second_ids)
+    assert sorted(first_ids + second_ids) == [1, 2, 3]
+
+
+def test_batch_borrow_and_return_endpoints(client):
+    books = [
+        client.post(
+            '/books',
+            json={'title': f'Book {idx}', 'author': 'Author', 'isbn': f'978013235088{idx}', 'total_copies': 1},
+        ).json()
+        for idx in range(2)
+    ]
+    member = client.post(
+        '/members',
+        json={'name': 'Jane Doe', 'email': 'jane@example.com', 'phone': '1234567890'},
+    ).json()
+
+    borrow_response = client.post(
+        '/loans/borrow/batch',
+        json={'items': [{'member_id': member['id'], 'book_id': book['id']} for book in books]},
+    )
+
+    assert borrow_response.status_code == 200
+    borrowed = borrow_response.json()
+    assert [item['status_code'] for item in borrowed] == [201, 201]
+
+    return_response = client.post(
+        '/loans/return/batch',
+        json={'loan_ids': [item['loan']['id'] for item in borrowed]},
+    )
+
+    assert return_response.status_code == 200
+    assert [item['status_code'] for item in return_response.json()] == [200, 200]
+    assert all(book['available_copies'] == 1 for book in client.get('/books').json())
+
+
+def test_batch_borrow_rejects_empty_batch(client):
+    response = client.post('/loans/borrow/batch', json={'items': []})
+
+    assert response.status_code == 422
+
+
+def test_list_loans_includes_archived_loans_on_request(client, db_session):
+    book = client.post(
+        '/books',
+        json={'title': 'Dune', 'author': 'Frank Herbert', 'isbn': '9780441172719', 'total_copies': 2},
+    ).json()
+    member = client.post('/members', json={'name': 'Alex', 'email': 'alex@example.com', 'phone': '1'}).json()
+    archived = Loan(
+        member_id=member['id'],
+        book_id=book['id'],
+        borrowed_at=datetime(2020, 1, 1),
+        due_date=date(2020, 1, 15),
+        returned_at=datetime(2020, 1, 10),
+    )
+    db_session.add(archived)
+    db_session.commit()
+    archived_id = archived.id
+    active = client.post('/loans/borrow', json={'member_id': member['id'], 'book_id': book['id']}).json()
+    assert archive_service.archive_returned_loans(db_session, older_than_months=12) == 1
+
+    current = client.get('/loans').json()
+    with_history = client.get('/loans?include_history=true').json()
+
+    assert [loan['id'] for loan in current] == [active['id']]
+    assert [loan['id'] for loan in with_history] == [active['id'], archived_id]
+    assert with_history[1]['returned_at'].startswith('2020-01-10')
@@ -1,6 +1,8 @@
 import pytest
 from fastapi import HTTPException
+from sqlalchemy.exc import InvalidRequestError
 
+from app.instrumentation import capture_queries
 from app.schemas import MemberCreate, MemberUpdate
 from app.services import member_service
 
@@ -33,3 +35,23 @@ def test_update_member_fields(db_session):
     updated = member_service.update_member(db_session, member.id, MemberUpdate(name="Jane Smith"))
 
     assert updated.name == "Jane Smith"
+
+
+def test_member_loans_are_never_lazy_loaded(db_session):
+    member = member_service.create_member(db_session, MemberCreate(name="Jane Doe", email="jane@example.com"))
+    db_session.expire_all()
+
+    with pytest.raises(InvalidRequestError):
+        member_service.get_member_or_404(db_session, member.id, use_cache=False).loans
+
+
+def test_list_members_projects_only_requested_columns(db_session):
+    for idx in range(3):
+        member_service.create_member(db_session, MemberCreate(name=f"Member {idx}", email=f"m{idx}@example.com"))
+
+    with capture_queries() as stats:
+        rows = member_service.list_members(db_session, limit=2, fields=("id", "name"))
+
+    assert stats.count == 1
+    assert [tuple(row) for row in rows] == [(1, "Member 0"), (2, "Member 1")]
+    assert "email" not in stats.slowest_statement
@@ -1,3 +1,8 @@
+from datetime import date, timedelta
+
+from app.services import overdue_service
+
+
 def test_create_member_returns_201(client):
     response = client.post(
         '/members',
@@ -71,3 +76,114 @@ def test_member_borrowed_books_supports_offset_and_limit(client):
     assert response.status_code == 200
     data = response.json()
     assert len(data) == 1
+
+
+def test_list_members_cursor_pagination_omits_cursor_on_last_page(client):
+    client.post('/members', json={'name': 'A', 'email': 'a@example.com', 'phone': '1'})
+    client.post('/members', json={'name': 'B', 'email': 'b@example.com', 'phone': '2'})
+    client.post('/members', json={'name': 'C', 'email': 'c@example.com', 'phone': '3'})
+
+    first_page = client.get('/members?limit=2')
+    second_page = client.get(f"/members?limit=2&after={first_page.headers['X-Next-Cursor']}")
+
+    assert [member['name'] for member in first_page.json()] == ['A', 'B']
+    assert [member['name'] for member in second_page.json()] == ['C']
+    assert 'X-Next-Cursor' not in second_page.headers
+
+
+def test_member_overdue_count_counts_only_past_due_active_loans(client, db_session):
+    member = client.post('/members', json={'name': 'A', 'email': 'a@example.com', 'phone': '1'}).json()
+    book = client.post(
+        '/books',
+        json={'title': 'Clean Code', 'author': 'Robert C. Martin', 'isbn': '9780132350884', 'total_copies': 3},
+    ).json()
+    other = client.post(
+        '/books',
+        json={'title': 'Refactoring', 'author': 'Martin Fowler', 'isbn': '9780201485677', 'total_copies': 3},
+    ).json()
+    client.post(
+        '/loans/borrow',
+        json={
+            'member_id': member['id'],
+            'book_id': book['id'],
+            'due_date': (date.today() - timedelta(days=1)).isoformat(),
+        },
+    )
+    client.post(
+        '/loans/borrow',
+        json={
+            'member_id': member['id'],
+            'book_id': other['id'],
+            'due_date': (date.today() + timedelta(days=7)).isoformat(),
+        },
+    )
+
+    response = client.get(f"/members/{member['id']}/overdue-count")
+
+    assert response.status_code == 200
+    assert response.json() == {'member_id': member['id'], 'overdue_count': 1}
+    assert overdue_service.overdue_counts_as_of(db_session) is None
+
+
+def test_member_overdue_count_returns_404_for_missing_member(client):
+    response = client.get('/members/999/overdue-count')
+
+    assert response.status_code == 404
+
+
+def test_get_member_includes_active_loans_without_n_plus_one(client, query_budget):
+    member = client.post('/members', json={'name': 'Jane Doe', 'email': 'jane@example.com'}).json()
+    loan_ids = []
+    for idx in range(3):
+        book = client.post(
+            '/books',
+            json={'title': f'Book {idx}', 'author': 'Author', 'isbn': f'978013235088{idx}', 'total_copies': 1},
+        ).json()
+        loan = client.post('/loans/borrow', json={'member_id': member['id'], 'book_id': book['id']}).json()
+        loan_ids.append(loan['id'])
+    client.post(f'/loans/{loan_ids[0]}/return')
+
+    response = client.get(f"/members/{member['id']}?include=active_loans")
+
+    assert response.status_code == 200
+    query_budget(response, 3)
+    data = response.json()
+    assert data['active_loan_count'] == 2
+    assert [loan['id'] for loan in data['active_loans']] == [loan_ids[2], loan_ids[1]]
+    assert [loan['book']['title'] for loan in data['active_loans']] == ['Book 2', 'Book 1']
+
+
+def test_get_member_omits_includes_by_default(client):
+    member = client.post('/members', json={'name': 'Jane Doe', 'email': 'jane@example.com'}).json()
+
+    response = client.get(f"/members/{member['id']}")
+    missing = client.get('/members/999?include=active_loans')
+    unknown = client.get(f"/members/{member['id']}?include=fines")
+
+    assert response.json() == member
+    assert missing.status_code == 404
+    assert unknown.status_code == 400
+
+
+def test_list_members_sparse_fieldsets_run_one_page_query(client, query_budget):
+    for idx in range(3):
+        client.post('/members', json={'name': f'Member {idx}', 'email': f'm{idx}@example.com'})
+
+    response = client.get('/members?fields=email')
+
+    query_budget(response, 2)
+    assert response.json() == [{'id': idx + 1, 'email': f'm{idx}@example.com'} for idx in range(3)]
+
+
+def test_get_member_etag_changes_when_counters_change(client):
+    member = client.post('/members', json={'name': 'Jane Doe', 'email': 'jane@example.com'}).json()
+    book = client.post('/books', json={'title': 'Clean Code', 'author': 'Martin', 'isbn': '9780132350884'}).json()
+    etag = client.get(f"/members/{member['id']}").headers['ETag']
+
+    unchanged = client.get(f"/members/{member['id']}", headers={'If-None-Match': etag})
+    client.post('/loans/borrow', json={'member_id': member['id'], 'book_id': book['id']})
+    changed = client.get(f"/members/{member['id']}", headers={'If-None-Match': etag})
+
+    assert unchanged.status_code == 304
+    assert changed.status_code == 200
+    assert changed.json()['active_loan_count'] == 1
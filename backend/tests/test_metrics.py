@@ -0,0 +1,126 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.database import InstrumentedQueuePool
+from app.instrumentation import capture_queries
+from app.metrics import Histogram, domain_metrics, pool_metrics, request_metrics
+from app.services import metrics_service
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    for metrics in (pool_metrics, request_metrics, domain_metrics):
+        metrics.reset()
+    metrics_service.gauge_cache.clear()
+    yield
+    for metrics in (pool_metrics, request_metrics, domain_metrics):
+        metrics.reset()
+    metrics_service.gauge_cache.clear()
+
+
+def _samples(text):
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_histogram_snapshot_is_cumulative():
+    histogram = Histogram(buckets=(0.01, 0.1))
+
+    for value in (0.005, 0.05, 0.05, 5.0):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot['buckets'] == {'0.01': 1, '0.1': 3, '+Inf': 4}
+    assert snapshot['count'] == 4
+    assert snapshot['sum'] == pytest.approx(5.105)
+
+
+def test_instrumented_pool_records_checkouts_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    held = engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+
+    snapshot = pool_metrics.snapshot(engine.pool)
+    held.close()
+    engine.dispose()
+
+    assert snapshot['checkouts'] == 1
+    assert snapshot['timeouts'] == 1
+    assert snapshot['checked_out'] == 1
+    assert snapshot['max_wait_seconds'] >= 0.05
+    assert snapshot['checkout_latency_seconds']['count'] == 1
+
+
+def test_pool_metrics_endpoint_reports_pool_state(client):
+    response = client.get('/metrics/pool')
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['pool_class']
+    assert body['checkout_latency_seconds']['buckets']['+Inf'] == body['checkout_latency_seconds']['count']
+
+
+def test_prometheus_endpoint_reports_routes_errors_and_domain_counters(client):
+    book = client.post(
+        '/books',
+        json={'title': 'Clean Code', 'author': 'Robert C. Martin', 'isbn': '9780132350884', 'total_copies': 3},
+    ).json()
+    member = client.post('/members', json={'name': 'Jane Doe', 'email': 'jane@example.com'}).json()
+    client.get(f"/books/{book['id']}")
+    client.get('/books/999')
+    overdue = (date.today() - timedelta(days=1)).isoformat()
+    loan = client.post(
+        '/loans/borrow', json={'member_id': member['id'], 'book_id': book['id'], 'due_date': overdue}
+    ).json()
+    client.post('/loans/borrow', json={'member_id': member['id'], 'book_id': book['id']})
+    client.post(f"/loans/{loan['id']}/return")
+    client.post('/loans/borrow', json={'member_id': member['id'], 'book_id': book['id'], 'due_date': overdue})
+    client.get('/no-such-route')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert '# TYPE library_http_request_duration_seconds histogram' in response.text
+    samples = _samples(response.text)
+    assert samples['library_http_requests_total{method="GET",route="/books/{book_id}",status="200"}'] == 1
+    assert samples['library_http_requests_total{method="GET",route="/books/{book_id}",status="404"}'] == 1
+    assert samples['library_http_request_errors_total{method="GET",route="/books/{book_id}",status="404"}'] == 1
+    assert samples['library_http_request_errors_total{method="POST",route="/loans/borrow",status="409"}'] == 1
+    assert samples['library_http_request_errors_total{method="GET",route="unmatched",status="404"}'] == 1
+    assert samples['library_http_request_duration_seconds_count{method="POST",route="/loans/borrow"}'] == 3
+    assert samples['library_http_request_duration_seconds_bucket{method="POST",route="/loans/borrow",le="+Inf"}'] == 3
+    assert samples['library_http_requests_in_flight'] == 1
+    assert samples['library_borrows_total'] == 2
+    assert samples['library_returns_total'] == 1
+    assert samples['library_active_loans'] == 1
+    assert samples['library_overdue_loans'] == 1
+    assert samples['library_available_copies'] == 2
+    assert samples['library_total_copies'] == 3
+    assert samples['library_admission_active{route_class="write"}'] == 0
+    assert samples['library_admission_rejected_total{route_class="read",reason="queue_full"}'] == 0
+    assert samples['library_rate_limited_total'] == 0
+
+
+def test_domain_gauges_are_read_once_per_ttl(db_session):
+    with capture_queries() as first:
+        gauges = metrics_service.domain_gauges(db_session)
+    with capture_queries() as second:
+        cached = metrics_service.domain_gauges(db_session)
+
+    assert gauges == cached == {"active_loans": 0, "overdue_loans": 0, "available_copies": 0, "total_copies": 0}
+    assert (first.count, second.count) == (2, 0)
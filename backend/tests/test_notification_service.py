@@ -0,0 +1,94 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from app.instrumentation import capture_queries
+from app.models import Book, JobWatermark, Loan, LoanNotification, Member
+from app.services import notification_service
+from app.services.notification_service import DUE_SOON, OVERDUE
+
+TODAY = date(2026, 3, 10)
+
+
+def _seed(db_session, due_offsets, returned=()):
+    member = Member(name="Alex", email="alex@example.com")
+    books = [
+        Book(title=f"Book {idx}", author="Author", isbn=f"978000000000{idx}", total_copies=1, available_copies=1)
+        for idx in range(len(due_offsets))
+    ]
+    db_session.add_all([member, *books])
+    db_session.commit()
+    loans = [
+        Loan(
+            member_id=member.id,
+            book_id=book.id,
+            due_date=TODAY + timedelta(days=offset),
+            returned_at=datetime(2026, 3, 1) if idx in returned else None,
+        )
+        for idx, (book, offset) in enumerate(zip(books, due_offsets))
+    ]
+    db_session.add_all(loans)
+    db_session.commit()
+    return [loan.id for loan in loans]
+
+
+def _queued(db_session, kind):
+    rows = db_session.execute(
+        select(LoanNotification.loan_id).where(LoanNotification.kind == kind).order_by(LoanNotification.loan_id)
+    )
+    return rows.scalars().all()
+
+
+def test_scan_queues_due_soon_and_overdue_reminders_once(db_session):
+    loan_ids = _seed(db_session, [-3, -1, 0, 2, 3, -2], returned={5})
+
+    created = notification_service.scan_loan_notifications(db_session, today=TODAY)
+    again = notification_service.scan_loan_notifications(db_session, today=TODAY)
+
+    assert created == {DUE_SOON: 2, OVERDUE: 2}
+    assert again == {DUE_SOON: 0, OVERDUE: 0}
+    assert _queued(db_session, DUE_SOON) == [loan_ids[2], loan_ids[3]]
+    assert _queued(db_session, OVERDUE) == [loan_ids[0], loan_ids[1]]
+
+
+def test_next_day_scan_only_covers_newly_overdue_loans(db_session):
+    loan_ids = _seed(db_session, [-2, 0, 1, 5])
+    notification_service.scan_loan_notifications(db_session, today=TODAY)
+
+    with capture_queries() as stats:
+        created = notification_service.scan_notifications(db_session, OVERDUE, today=TODAY + timedelta(days=2))
+
+    assert created == 2
+    assert _queued(db_session, OVERDUE) == loan_ids[:3]
+    assert stats.count == 4
+
+
+def test_interrupted_scan_resumes_from_watermark_position(db_session):
+    loan_ids = _seed(db_session, [-7, -6, -5, -4, -3])
+
+    first = notification_service.scan_notifications(db_session, OVERDUE, today=TODAY, batch_size=2, max_batches=1)
+    watermark = db_session.get(JobWatermark, notification_service.watermark_name(OVERDUE))
+    assert (first, watermark.as_of, watermark.position) == (2, None, f"{TODAY - timedelta(days=6)}/{loan_ids[1]}")
+
+    rest = notification_service.scan_notifications(db_session, OVERDUE, today=TODAY, batch_size=2)
+
+    db_session.refresh(watermark)
+    assert rest == 3
+    assert (watermark.as_of, watermark.position) == (TODAY, None)
+    assert _queued(db_session, OVERDUE) == loan_ids
+
+
+def test_scan_query_uses_open_due_date_index(db_session):
+    _seed(db_session, [-1])
+    query = (
+        select(Loan.id, Loan.due_date)
+        .where(Loan.returned_at.is_(None), Loan.due_date < TODAY, Loan.due_date >= TODAY - timedelta(days=1))
+        .order_by(Loan.due_date, Loan.id)
+        .limit(1000)
+    )
+    compiled = query.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True})
+
+    plan = " ".join(row[-1] for row in db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}"))
+
+    assert "ix_loans_open_due_date_id" in plan
+    assert "TEMP B-TREE" not in plan
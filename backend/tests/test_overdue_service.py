@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from app.models import Book, Loan, Member
+from app.schemas import BorrowRequest
+from app.services import loan_service, overdue_service
+
+
+def _seed(db_session, due_offsets):
+    member = Member(name="Alex", email="alex@example.com")
+    book = Book(title="Refactoring", author="Martin Fowler", isbn="9780201485677", total_copies=10, available_copies=10)
+    db_session.add_all([member, book])
+    db_session.commit()
+    other_books = [
+        Book(title=f"Book {idx}", author="Author", isbn=f"978000000000{idx}", total_copies=1, available_copies=1)
+        for idx in range(len(due_offsets))
+    ]
+    db_session.add_all(other_books)
+    db_session.commit()
+    db_session.add_all(
+        [
+            Loan(member_id=member.id, book_id=other.id, due_date=date.today() + timedelta(days=offset))
+            for other, offset in zip(other_books, due_offsets)
+        ]
+    )
+    db_session.commit()
+    return member, book
+
+
+def test_refresh_overdue_counts_rolls_forward_incrementally(db_session):
+    member, _ = _seed(db_session, [-5, -1, 3])
+    today = date.today()
+
+    def stored_count():
+        db_session.expire_all()
+        return db_session.get(Member, member.id).overdue_loan_count
+
+    two_days_ago = today - timedelta(days=2)
+    assert overdue_service.refresh_overdue_counts(db_session, today=two_days_ago) == two_days_ago
+    assert stored_count() == 1
+    assert overdue_service.overdue_counts_as_of(db_session) == two_days_ago
+
+    assert overdue_service.refresh_overdue_counts(db_session, today=today) == today
+    assert stored_count() == 2
+
+    assert overdue_service.refresh_overdue_counts(db_session, today=today) == today
+    assert stored_count() == 2
+    assert overdue_service.member_overdue_count(db_session, member.id) == 2
+
+
+def test_member_overdue_count_reads_past_a_stale_watermark_without_writing(db_session):
+    member, _ = _seed(db_session, [-5, -1, 3])
+    today = date.today()
+    assert overdue_service.member_overdue_count(db_session, member.id) == 2
+
+    overdue_service.refresh_overdue_counts(db_session, today=today - timedelta(days=2))
+    db_session.expire_all()
+
+    assert overdue_service.member_overdue_count(db_session, member.id) == 2
+    assert overdue_service.overdue_counts_as_of(db_session) == today - timedelta(days=2)
+    assert db_session.get(Member, member.id).overdue_loan_count == 1
+    for as_of in (None, today - timedelta(days=2)):
+        assert db_session.scalar(select(overdue_service.total_overdue_count(as_of, today))) == 2
+
+
+def test_member_overdue_count_tracks_borrows_and_returns_after_refresh(db_session):
+    member, book = _seed(db_session, [-5])
+    overdue_service.refresh_overdue_counts(db_session)
+    assert overdue_service.member_overdue_count(db_session, member.id) == 1
+
+    loan = loan_service.borrow_book(
+        db_session,
+        BorrowRequest(member_id=member.id, book_id=book.id, due_date=date.today() - timedelta(days=1)),
+    )
+    assert overdue_service.member_overdue_count(db_session, member.id) == 2
+
+    loan_service.return_book(db_session, loan.id)
+    assert overdue_service.member_overdue_count(db_session, member.id) == 1
+
+
+def test_refresh_overdue_counts_rebuild_repairs_drift(db_session):
+    member, _ = _seed(db_session, [-5, -3])
+    overdue_service.refresh_overdue_counts(db_session)
+    db_session.get(Member, member.id).overdue_loan_count = 42
+    db_session.commit()
+
+    overdue_service.refresh_overdue_counts(db_session, rebuild=True)
+
+    assert overdue_service.member_overdue_count(db_session, member.id) == 2
@@ -0,0 +1,146 @@
+from collections.abc import Generator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+
+from app import database
+from app.config import settings
+from app.controllers import books, loans, members
+from app.database import PRIMARY_READS_COOKIE
+from app.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER
+from app.main import lifespan
+from app.models import Base, Book, Member
+
+SOURCES = ("primary", "replica-a", "replica-b")
+DML_PREFIXES = ("INSERT", "UPDATE", "DELETE")
+
+
+def _seed(url: str, source: str) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all(
+            [
+                Member(name=f"Alex ({source})", email="alex@example.com"),
+                Book(title=f"Dune ({source})", author="Frank Herbert", isbn="9780441172719", total_copies=2, available_copies=2),
+            ]
+        )
+        db.commit()
+    engine.dispose()
+
+
+@pytest.fixture(params=["sync", "async"])
+def replica_client(request, tmp_path, monkeypatch) -> Generator[TestClient, None, None]:
+    urls = {source: f"sqlite:///{tmp_path / f'{source}.db'}" for source in SOURCES}
+    for source, url in urls.items():
+        _seed(url, source)
+    monkeypatch.setattr(settings, "database_url", urls["primary"])
+    monkeypatch.setattr(settings, "read_replica_urls", [urls["replica-a"], urls["replica-b"]])
+    monkeypatch.setattr(database, "_replica_turn", iter(range(1000)))
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(books.router)
+    app.include_router(loans.router)
+    app.include_router(members.router)
+    if request.param == "async":
+        app.dependency_overrides[database.get_db] = database.get_async_db
+        app.dependency_overrides[database.get_read_db] = database.get_async_read_db
+    else:
+        app.dependency_overrides[database.get_db] = database.get_sync_db
+        app.dependency_overrides[database.get_read_db] = database.get_sync_read_db
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def replica_writes() -> Generator[list[str], None, None]:
+    replicas = {make_url(url).database for url in settings.read_replica_urls}
+    writes: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if conn.engine.url.database in replicas and statement.lstrip().upper().startswith(DML_PREFIXES):
+            writes.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    yield writes
+    event.remove(Engine, "before_cursor_execute", record)
+
+
+def _served_by(client: TestClient) -> str:
+    return client.get("/books").json()[0]["title"]
+
+
+def test_reads_round_robin_across_replicas(replica_client):
+    served = [_served_by(replica_client) for _ in range(4)]
+
+    assert served == ["Dune (replica-a)", "Dune (replica-b)", "Dune (replica-a)", "Dune (replica-b)"]
+
+
+def test_borrow_makes_the_client_read_its_writes_from_primary(replica_client):
+    response = replica_client.post("/loans/borrow", json={"member_id": 1, "book_id": 1})
+    assert response.status_code == 201
+    assert PRIMARY_READS_COOKIE in response.cookies
+
+    assert _served_by(replica_client) == "Dune (primary)"
+    assert [loan["book_title"] for loan in replica_client.get("/loans").json()] == ["Dune (primary)"]
+
+    replica_client.cookies.clear()
+    assert replica_client.get("/loans").json() == []
+
+
+def test_keyed_borrow_and_its_replay_pin_reads_to_primary(replica_client):
+    headers = {IDEMPOTENCY_HEADER: "kiosk-1"}
+    responses = [
+        replica_client.post("/loans/borrow", json={"member_id": 1, "book_id": 1}, headers=headers) for _ in range(2)
+    ]
+
+    assert [response.status_code for response in responses] == [201, 201]
+    assert responses[1].headers[REPLAYED_HEADER] == "true"
+    assert all(PRIMARY_READS_COOKIE in response.cookies for response in responses)
+    assert _served_by(replica_client) == "Dune (primary)"
+
+
+def test_expired_or_invalid_stickiness_reads_from_replicas(replica_client):
+    for value in ("0", "not-a-timestamp"):
+        replica_client.cookies.set(PRIMARY_READS_COOKIE, value)
+
+        assert _served_by(replica_client) != "Dune (primary)"
+
+
+def test_failed_write_does_not_pin_reads_to_primary(replica_client):
+    response = replica_client.post("/loans/borrow", json={"member_id": 99, "book_id": 1})
+
+    assert response.status_code == 404
+    assert PRIMARY_READS_COOKIE not in response.cookies
+
+
+def test_without_replicas_reads_go_to_primary(replica_client, monkeypatch):
+    monkeypatch.setattr(settings, "read_replica_urls", [])
+    monkeypatch.setattr(database, "_replica_engines", None)
+    monkeypatch.setattr(database, "_async_replica_engines", None)
+
+    response = replica_client.post("/loans/borrow", json={"member_id": 1, "book_id": 1})
+
+    assert PRIMARY_READS_COOKIE not in response.cookies
+    assert _served_by(replica_client) == "Dune (primary)"
+
+
+def test_list_endpoints_never_write_to_replicas(replica_client, replica_writes):
+    for path in ("/books", "/loans", "/loans/overdue", "/loans/overdue?member_id=1"):
+        response = replica_client.get(path)
+
+        assert response.status_code == 200, path
+
+    assert replica_writes == []
+
+
+def test_replica_rows_never_reach_the_entity_cache(replica_client):
+    assert replica_client.put("/members/1", json={"name": "Renamed"}).status_code == 200
+
+    assert replica_client.get("/members/1/borrowed-books").status_code == 200
+    assert replica_client.get("/members/1").json()["name"] == "Renamed"
@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.config import settings
+
+
+def _seed(client):
+    member = client.post('/members', json={'name': 'Jane Doe', 'email': 'jane@example.com'}).json()
+    for idx in range(3):
+        book = client.post(
+            '/books',
+            json={'title': f'Clean Code {idx}', 'author': 'Robert C. Martin', 'isbn': f'978013235088{idx}'},
+        ).json()
+        due_date = (date.today() - timedelta(days=idx)).isoformat()
+        client.post('/loans/borrow', json={'member_id': member['id'], 'book_id': book['id'], 'due_date': due_date})
+    return member
+
+
+def _paths(member):
+    return [
+        '/books?limit=2',
+        '/books?fields=title',
+        '/books/search?q=clean&limit=2',
+        '/members',
+        '/members?fields=email',
+        f"/members/{member['id']}/borrowed-books",
+        '/loans?limit=2',
+        '/loans/overdue',
+    ]
+
+
+def test_fast_json_mode_renders_the_same_documents(client, monkeypatch):
+    member = _seed(client)
+    default = {path: client.get(path) for path in _paths(member)}
+
+    monkeypatch.setattr(settings, 'fast_json', True)
+    fast = {path: client.get(path) for path in _paths(member)}
+
+    for path, response in default.items():
+        assert fast[path].status_code == response.status_code == 200, path
+        assert fast[path].json() == response.json(), path
+        assert fast[path].headers.get('X-Next-Cursor') == response.headers.get('X-Next-Cursor'), path
+        assert fast[path].headers['content-type'] == 'application/json'
+
+
+@pytest.mark.parametrize('fast_json', [False, True])
+def test_batch_results_serialize_in_both_modes(client, monkeypatch, fast_json):
+    monkeypatch.setattr(settings, 'fast_json', fast_json)
+    member = client.post('/members', json={'name': 'Jane Doe', 'email': 'jane@example.com'}).json()
+    book = client.post('/books', json={'title': 'Clean Code', 'author': 'Martin', 'isbn': '9780132350884'}).json()
+
+    response = client.post(
+        '/loans/borrow/batch',
+        json={'items': [{'member_id': member['id'], 'book_id': book['id']}, {'member_id': 999, 'book_id': book['id']}]},
+    )
+
+    results = response.json()
+    assert [result['status_code'] for result in results] == [201, 404]
+    assert results[0]['loan']['book_id'] == book['id']
+    assert results[1]['loan'] is None